@@ -5,6 +5,7 @@ from typing import List, Dict, Any, Optional
 from agno.agent import Agent
 from agno.models.deepseek import DeepSeek
 from models.common import EvaluationResult, ScannerOutput, CategoryEvaluation, Leaderboard
+from services.consensus import overview
 
 class ScannerEvaluator:
 # ... (rest of class)
@@ -63,19 +64,28 @@ class ScannerEvaluator:
                 
         return None
 
-    def evaluate(self, scan_results: Dict[str, Any], scan_type: str = "static") -> Dict[str, Any]:
+    def evaluate(self, scan_results: Dict[str, Any], scan_type: str = "static",
+                 consensus: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Evaluate the results from multiple scanners.
         Args:
              scan_results: Dict of scanner_name -> dict (serialized ScannerOutput)
              scan_type: "static" or "dynamic"
+             consensus: Precomputed cross-scanner clusters (services.consensus.build_consensus)
+        """
+        consensus_context = ""
+        if consensus:
+            consensus_context = f"""
+        CROSS-SCANNER CONSENSUS (findings clustered by file, line window and category;
+        "scanners" reported the issue, "missed_by" ran but did not):
+        {json.dumps(overview(consensus), indent=2)}
         """
         prompt_context = f"""
         You are evaluating {scan_type.upper()} security scan results.
         
         SCAN RESULTS:
         {json.dumps(scan_results, indent=2)}
-        
+        {consensus_context}
         Please perform a deep analysis of these findings and produce a scoring report.
         """
         
@@ -128,10 +138,14 @@ class LeaderboardAgent:
             output_schema=Leaderboard
         )
 
-    def update_leaderboard(self, current_leaderboard: Dict[str, Any], new_scores: Dict[str, float], scan_type: str) -> Dict[str, Any]:
+    def update_leaderboard(self, current_leaderboard: Dict[str, Any], new_scores: Dict[str, float], scan_type: str,
+                           consensus: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # Per-scanner agreement with the other scanners on this scan (agreed/unique/missed clusters)
+        consensus_line = f"Scanner Agreement: {json.dumps(consensus, indent=2)}" if consensus else ""
         prompt = f"""
         Current Leaderboard: {json.dumps(current_leaderboard, indent=2)}
         New Scan Scores ({scan_type}): {json.dumps(new_scores, indent=2)}
+        {consensus_line}
         
         Please provide the updated holistic leaderboard state.
         """
@@ -148,12 +162,14 @@ class LeaderboardAgent:
                 return content
             else:
                 # Basic fallback to manual math if agent fails or returns weirdness
-                return self._manual_update(current_leaderboard, new_scores, scan_type)
+                return self.merge_scores(current_leaderboard, new_scores, scan_type)
         except Exception as e:
             print(f"Leaderboard update failed: {e}", flush=True)
-            return self._manual_update(current_leaderboard, new_scores, scan_type)
+            return self.merge_scores(current_leaderboard, new_scores, scan_type)
 
-    def _manual_update(self, current: Dict[str, Any], new_scores: Dict[str, float], scan_type: str) -> Dict[str, Any]:
+    @staticmethod
+    def merge_scores(current: Dict[str, Any], new_scores: Dict[str, float], scan_type: str) -> Dict[str, Any]:
+        """Fold one scan's scores into the leaderboard as a running average (no agent call)."""
         lb = current.copy()
         total = lb.get("total_scans", 0)
         new_total = total + 1
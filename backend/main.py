@@ -1,5 +1,5 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Response
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, HTTPException, Response, Request
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
@@ -8,9 +8,9 @@ import uuid
 import json
 import os
 from datetime import datetime
+from email.utils import parsedate_to_datetime
 
-from scanners.registry import ScannerRegistry
-from agent.evaluator import ScannerEvaluator
+from models.common import Vulnerability, ScanSummary, ScanResult
 
 app = FastAPI(title="MCP Scanner Benchmark", description="Agentic evaluation of MCP scanners")
 
@@ -21,92 +21,64 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
-# Persistence
+# Persistence (shared with standalone workers, see worker.py)
+DB_FILE = os.getenv("SCAN_STORE_DB", "scan_store.db")
+# Legacy JSON layout, imported once into the store on first start
 DATA_FILE = "scan_index.json"
 RESULTS_DIR = "scan_results"
 
-if not os.path.exists(RESULTS_DIR):
-    os.makedirs(RESULTS_DIR)
-
-def load_data():
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "r") as f:
-            return json.load(f)
-    return {"scans": [], "leaderboard": {"static": {}, "dynamic": {}}}
-
-def save_data(data):
-    # Save index (without scanner_results to keep it light)
-    index_scans = []
-    for s in data["scans"]:
-        # Extract summary info
-        index_scans.append({
-            "id": s["id"],
-            "timestamp": s["timestamp"],
-            "target": s["target"],
-            "branch": s["branch"],
-            "scan_type": s.get("scan_type", "static"),
-            "status": s["status"],
-            "evaluation": s.get("evaluation"),
-            "error": s.get("error")
-        })
-    
-    index_data = {
-        "scans": index_scans,
-        "leaderboard": data.get("leaderboard", {"static": {}, "dynamic": {}})
-    }
-    
-    with open(DATA_FILE, "w") as f:
-        json.dump(index_data, f, indent=2)
-
-def save_scan_result(scan_id: str, full_result: Dict[str, Any]):
-    file_path = os.path.join(RESULTS_DIR, f"{scan_id}.json")
-    with open(file_path, "w") as f:
-        json.dump(full_result, f, indent=2)
-
-def load_scan_result(scan_id: str) -> Optional[Dict[str, Any]]:
-    file_path = os.path.join(RESULTS_DIR, f"{scan_id}.json")
-    if os.path.exists(file_path):
-        with open(file_path, "r") as f:
-            return json.load(f)
-    return None
-
 from services.github_service import GitHubService
+from services.scan_store import ScanStore
+from services.job_queue import JobQueue, scan_type_limits_from_env, scan_types_from_env
+from services.benchmark import BenchmarkRunner
+from services.findings_export import ExportUnavailable, query_findings
+from scanners.registry import ScannerRegistry
 
 # Models
 class ScanRequest(BaseModel):
     repo_url: str
     branch: str = "main"
     scan_type: str = "static" # "static" or "dynamic"
+    priority: int = 0 # Higher runs first
+    force_rescan: bool = False # Bypass the scanner result cache
 
-class ScanSummary(BaseModel):
-    id: str
-    timestamp: str
-    target: str # Repo URL
-    branch: str
-    scan_type: str = "static"
-    status: str = "pending"
-    evaluation: Optional[Dict[str, Any]] = None
-    error: Optional[str] = None
-
-class ScanResult(BaseModel):
-    id: str
-    timestamp: str
-    target: str # Repo URL
-    branch: str
-    scan_type: str = "static"
-    scanner_results: Dict[str, Any]
-    evaluation: Optional[Dict[str, Any]] = None
-    status: str = "pending"
-    error: Optional[str] = None
+class Finding(Vulnerability):
+    mode: str
+    category: str
+
+class FindingsPage(BaseModel):
+    items: List[Finding]
+    total: int
+    next_cursor: Optional[str] = None
 
 # Global data
-db = load_data()
+store = ScanStore(DB_FILE)
+store.migrate_from_json(DATA_FILE, RESULTS_DIR)
+store.gc_blobs()
 github_service = GitHubService()
+runner = BenchmarkRunner(store, github_service)
 
 # --- API Endpoints (Prefixed with /api) ---
 
+@app.on_event("startup")
+def start_workers():
+    # Load scanners and resolve their toolchains before the first scan instead of during it
+    if job_queue.workers:
+        for scan_type in job_queue.scan_types or ["static", "dynamic"]:
+            ScannerRegistry.get_scanners(scan_type)
+    job_queue.start()
+
+@app.on_event("shutdown")
+def close_store():
+    # Same grace as standalone workers; scans still running after it are handed back to the queue
+    job_queue.stop(wait=float(os.getenv("WORKER_SHUTDOWN_GRACE", "30")))
+    runner.close()
+    # Flush queued writes before the process exits
+    store.close()
+
 @app.get("/api")
 def read_root():
     return {"message": "MCP Scanner Benchmark API is running"}
@@ -115,148 +87,26 @@ def read_root():
 def health_check():
     return {"status": "ok"}
 
-def run_benchmark(scan_id: str, repo_url: str, branch: str, scan_type: str = "static"):
-    print(f"Starting benchmark {scan_id} for {repo_url} (type: {scan_type})", flush=True)
-    
-    try:
-        # 0. Clone Repo
-        target_path = github_service.clone_repo(repo_url, branch, scan_id)
-        print(f"Repository cloned to: {target_path}", flush=True)
-
-        all_scanners = ScannerRegistry.get_scanners()
-        
-        # Filter scanners based on capability
-        if scan_type == "static":
-            scanners = [s for s in all_scanners if s.supports_static]
-        else:
-            scanners = [s for s in all_scanners if s.supports_dynamic]
-
-        results = {}
-        
-        # 1. Run Scanners in Parallel
-        print(f"Running {len(scanners)} scanners in parallel (scan_type={scan_type})...", flush=True)
-        
-        from concurrent.futures import ThreadPoolExecutor, as_completed
-
-        def execute_single_scanner(scanner):
-            print(f"  > Starting {scanner.name}...", flush=True)
-            s_res = {}
-            
-            # Static Scan
-            if scan_type == "static":
-                try:
-                    res_static = scanner.scan_static(target_path)
-                    if hasattr(res_static, "model_dump"):
-                        s_res["static"] = res_static.model_dump()
-                    else:
-                        s_res["static"] = res_static
-                except Exception as e:
-                    s_res["static"] = {"error": str(e)}
-
-            # Dynamic Scan
-            if scan_type == "dynamic":
-                try:
-                    res_dynamic = scanner.scan_dynamic(target_path)
-                    if hasattr(res_dynamic, "model_dump"):
-                        s_res["dynamic"] = res_dynamic.model_dump()
-                    else:
-                        s_res["dynamic"] = res_dynamic
-                except Exception as e:
-                    s_res["dynamic"] = {"error": str(e)}
-                
-            print(f"  < Finished {scanner.name}", flush=True)
-            return scanner.name, s_res
-
-        # Execute in parallel
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            # We wrap the scanner execution in a timeout at the ThreadPool level if possible, 
-            # but per-scanner is better for logging.
-            future_to_scanner = {executor.submit(execute_single_scanner, s): s for s in scanners}
-            # Wait with a total timeout of 10 minutes for all scanners
-            for future in as_completed(future_to_scanner, timeout=600):
-                try:
-                    scanner_name, s_result = future.result()
-                except Exception as e:
-                    print(f"Scanner execution failed or timed out: {e}", flush=True)
-                    continue
-                
-                # Relativize paths here
-                for scan_mode in ["static", "dynamic"]:
-                    if scan_mode in s_result and "vulnerabilities" in s_result[scan_mode]:
-                        for vuln in s_result[scan_mode]["vulnerabilities"]:
-                            f_path = vuln.get("file_path", "")
-                            if f_path.startswith(target_path):
-                                # Make it relative, strip leading slash
-                                rel = os.path.relpath(f_path, target_path)
-                                vuln["file_path"] = rel
-                            elif f_path.startswith("/app/"): # Docker common path
-                                # Try to make it relative to app root then target path
-                                app_rel = os.path.relpath(f_path, "/app")
-                                # If it's inside target_path relative to app...
-                                inner_rel = os.path.relpath(target_path, "/app")
-                                if app_rel.startswith(inner_rel):
-                                    vuln["file_path"] = os.path.relpath(app_rel, inner_rel)
-
-                results[scanner_name] = s_result
-
-        # 2. Evaluate with Agent
-        deepseek_key = os.getenv("DEEPSEEK_API_KEY")
-        if deepseek_key:
-            from agent.evaluator import ScannerEvaluator, LeaderboardAgent
-            print(f"Evaluating {scan_type} results (results keys: {list(results.keys())})...", flush=True)
-            try:
-                evaluator = ScannerEvaluator()
-                # Categorized evaluation (returns CategoryEvaluation dict)
-                comp_evaluation = evaluator.evaluate(results, scan_type=scan_type)
-                print(f"Evaluation returned score: {comp_evaluation.get('scores')}", flush=True)
-
-                # Holistic Leaderboard Update
-                lb_agent = LeaderboardAgent()
-                current_lb = db.get("leaderboard", {"static": {}, "dynamic": {}, "total_scans": 0})
-                # Ensure it matches Leaderboard model structure
-                if "total_scans" not in current_lb: current_lb["total_scans"] = 0
-                
-                new_scores = comp_evaluation.get("scores", {})
-                updated_lb = lb_agent.update_leaderboard(current_lb, new_scores, scan_type)
-                db["leaderboard"] = updated_lb
-                
-                # Construct full EvaluationResult
-                if scan_type == "static":
-                    evaluation = {"static": comp_evaluation, "dynamic": None}
-                else:
-                    evaluation = {"static": None, "dynamic": comp_evaluation}
-
-            except Exception as e:
-                print(f"Evaluation failed: {e}", flush=True)
-                evaluation = {"error": f"Evaluation failed: {e}", "skipped": True}
-        else:
-            print("Skipping evaluation (DEEPSEEK_API_KEY not set)", flush=True)
-            evaluation = {"skipped": True, "reason": "No API key"}
-        
-        # 3. Update DB
-        for s in db["scans"]:
-            if s["id"] == scan_id:
-                s["status"] = "completed"
-                s["evaluation"] = evaluation
-                # Save full result to individual file
-                full_result = {**s, "scanner_results": results}
-                save_scan_result(scan_id, full_result)
-                break
-                
-    except Exception as e:
-        print(f"Benchmark failed: {e}")
-        for s in db["scans"]:
-            if s["id"] == scan_id:
-                s["status"] = "error"
-                s["error"] = str(e)
-                save_scan_result(scan_id, s)
-                break
-            
-    save_data(db)
-    print(f"Benchmark {scan_id} finished.")
+@app.get("/api/scanners")
+def list_scanners():
+    """Scanners of this process with their availability and resolved tool paths/versions."""
+    return ScannerRegistry.status()
+
+# Bounded pool of benchmark workers fed from the durable job queue.
+# BENCHMARK_WORKERS=0 leaves all scans to standalone `python -m worker` processes.
+job_queue = JobQueue(
+    store,
+    runner.run,
+    workers=int(os.getenv("BENCHMARK_WORKERS", "2")),
+    type_limits=scan_type_limits_from_env(),
+    lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", "60")),
+    on_cancel=runner.cancel,
+    scan_types=scan_types_from_env(),
+    on_lease_lost=runner.abandon
+)
 
 @app.post("/api/scan", response_model=ScanResult)
-async def trigger_scan(request: ScanRequest, background_tasks: BackgroundTasks):
+def trigger_scan(request: ScanRequest):
     scan_id = str(uuid.uuid4())
     new_scan = {
         "id": scan_id,
@@ -269,76 +119,215 @@ async def trigger_scan(request: ScanRequest, background_tasks: BackgroundTasks):
         "status": "pending"
     }
     
-    db["scans"].insert(0, new_scan)
-    save_data(db)
+    store.create_scan(new_scan)
     
-    background_tasks.add_task(run_benchmark, scan_id, request.repo_url, request.branch, request.scan_type)
+    job_queue.submit(scan_id, request.repo_url, request.branch, request.scan_type, priority=request.priority,
+                     force_rescan=request.force_rescan)
     
     return new_scan
 
 @app.get("/api/scans", response_model=List[ScanSummary])
-def list_scans(limit: int = 20, offset: int = 0, scan_type: Optional[str] = None):
-    scans = db["scans"]
-    
-    if scan_type:
-        # Filter by scan_type, handling legacy items without scan_type as "static"
-        filtered = [
-            s for s in scans 
-            if s.get("scan_type") == scan_type or (not s.get("scan_type") and scan_type == "static")
-        ]
-        return filtered[offset : offset + limit]
-        
-    return scans[offset : offset + limit]
+def list_scans(response: Response, limit: int = 20, offset: int = 0, scan_type: Optional[str] = None,
+               status: Optional[str] = None, target: Optional[str] = None,
+               since: Optional[str] = None, until: Optional[str] = None, cursor: Optional[str] = None):
+    # Legacy items without scan_type are stored as "static" by the migrator
+    try:
+        scans, next_cursor = store.list_scans(
+            limit=limit, offset=offset, scan_type=scan_type, status=status,
+            target=target, since=since, until=until, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # The body stays a plain list for existing clients; the next page is passed back as ?cursor=
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return scans
+
+@app.get("/api/scans/count")
+def count_scans(scan_type: Optional[str] = None, status: Optional[str] = None, target: Optional[str] = None,
+                since: Optional[str] = None, until: Optional[str] = None):
+    return {"total": store.count_scans(scan_type=scan_type, status=status, target=target, since=since, until=until)}
 
 @app.get("/api/scans/{scan_id}", response_model=ScanResult)
-def get_scan(scan_id: str):
-    res = load_scan_result(scan_id)
-    if res:
+def get_scan(scan_id: str, request: Request):
+    meta = store.get_document_meta(scan_id)
+    if not meta:
+        res = store.get_scan_result(scan_id)
+        if not res:
+            raise HTTPException(status_code=404, detail="Scan not found")
+        # In-progress scans (and documents invalidated under us) are served live
+        if not runner.publish_document(res):
+            return res
+        meta = store.get_document_meta(scan_id)
+        if not meta:
+            return res
+
+    headers = {
+        "ETag": meta["etag"],
+        "Last-Modified": meta["last_modified"],
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if is_not_modified(request, meta):
+        return Response(status_code=304, headers=headers)
+
+    doc = store.get_document(scan_id, preferred_encoding(request))
+    if not doc:
+        res = store.get_scan_result(scan_id)
+        if not res:
+            raise HTTPException(status_code=404, detail="Scan not found")
         return res
-    
-    # Fallback to index if full file not found (legacy or error)
-    for s in db["scans"]:
-        if s["id"] == scan_id:
-            return {**s, "scanner_results": {}}
-            
-    raise HTTPException(status_code=404, detail="Scan not found")
+    if doc["encoding"]:
+        headers["Content-Encoding"] = doc["encoding"]
+    return Response(content=doc["body"], media_type="application/json", headers={**headers, "ETag": doc["etag"]})
+
+def is_not_modified(request: Request, meta: Dict[str, Any]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return "*" in tags or meta["etag"] in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return parsedate_to_datetime(if_modified_since) >= parsedate_to_datetime(meta["last_modified"])
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def preferred_encoding(request: Request) -> Optional[str]:
+    accepted = set()
+    for part in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    if "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+@app.get("/api/scans/{scan_id}/findings", response_model=FindingsPage)
+def list_findings(scan_id: str, scanner: Optional[str] = None, mode: Optional[str] = None,
+                  severity: Optional[str] = None, rule_id: Optional[str] = None, category: Optional[str] = None,
+                  path_prefix: Optional[str] = None, limit: int = 100, cursor: Optional[str] = None):
+    if not store.get_scan(scan_id):
+        raise HTTPException(status_code=404, detail="Scan not found")
+    try:
+        return store.list_findings(
+            scan_id, scanner=scanner, mode=mode, severity=severity, rule_id=rule_id,
+            category=category, path_prefix=path_prefix, limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def parse_byte_range(header: str, size: int):
+    """
+    Parse a single-range `Range: bytes=...` header into an inclusive (start, end).
+    Returns None if the range is unsatisfiable; raises ValueError if it is malformed.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        raise ValueError("Unsupported range")
+    first, _, last = spec.strip().partition("-")
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length <= 0 or size == 0:
+            return None
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
+
+@app.get("/api/scans/{scan_id}/raw/{scanner}")
+def get_raw_output(scan_id: str, scanner: str, request: Request, mode: Optional[str] = None):
+    scan = store.get_scan(scan_id)
+    if not scan:
+        raise HTTPException(status_code=404, detail="Scan not found")
+
+    ref = store.get_raw_output_ref(scan_id, scanner, mode or scan["scan_type"])
+    if not ref or not store.blobs.exists(ref):
+        raise HTTPException(status_code=404, detail="Raw output not found")
+
+    size = store.blobs.size(ref)
+    media_type = "text/plain; charset=utf-8"
+    headers = {"Accept-Ranges": "bytes", "ETag": f'"{ref}"'}
+
+    range_header = request.headers.get("range")
+    if range_header:
+        try:
+            byte_range = parse_byte_range(range_header, size)
+        except ValueError:
+            byte_range = (0, size - 1) if size else None
+            range_header = None
+        if byte_range is None:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        if range_header:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(store.blobs.iter_range(ref, start, end), status_code=206, media_type=media_type, headers=headers)
+
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(store.blobs.iter_range(ref), media_type=media_type, headers=headers)
+
+@app.post("/api/scans/{scan_id}/cancel")
+def cancel_scan(scan_id: str):
+    if not store.get_scan(scan_id):
+        raise HTTPException(status_code=404, detail="Scan not found")
+    state = store.request_cancel(scan_id)
+    if state is None:
+        raise HTTPException(status_code=409, detail="Scan has already finished")
+    if state == "cancelling":
+        # Immediate if the scan runs in this process; other workers see the request on their next heartbeat
+        job_queue.cancel(scan_id)
+    return {"status": state, "id": scan_id}
 
 @app.get("/api/leaderboard")
 def get_leaderboard():
-    return db["leaderboard"]
+    return store.get_leaderboard()
+
+@app.get("/api/analytics/findings")
+def findings_analytics(group_by: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None,
+                       scan_type: Optional[str] = None, scanner: Optional[str] = None, severity: Optional[str] = None,
+                       rule_id: Optional[str] = None, category: Optional[str] = None, target: Optional[str] = None):
+    # Across all exported scans; group_by and the filters take comma-separated values
+    filters = {
+        column: value.split(",")
+        for column, value in (("scan_type", scan_type), ("scanner", scanner), ("severity", severity),
+                              ("rule_id", rule_id), ("category", category), ("target", target))
+        if value
+    }
+    if runner.exporter is None:
+        raise HTTPException(status_code=503, detail="Findings export is disabled (pyarrow not installed)")
+    try:
+        return query_findings([c for c in (group_by or "").split(",") if c], since=since, until=until,
+                              root=runner.exporter.root, **filters)
+    except ExportUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.delete("/api/scans/{scan_id}")
 def delete_scan(scan_id: str):
-    scan_to_delete = None
-    for s in db["scans"]:
-        if s["id"] == scan_id:
-            scan_to_delete = s
-            break
-    
-    if not scan_to_delete:
+    scan = store.get_scan(scan_id)
+    # Scanner results and findings are removed by cascade
+    if scan is None or not store.delete_scan(scan_id):
         raise HTTPException(status_code=404, detail="Scan not found")
-        
-    db["scans"].remove(scan_to_delete)
-    
-    # Remove file
-    file_path = os.path.join(RESULTS_DIR, f"{scan_id}.json")
-    if os.path.exists(file_path):
-        os.remove(file_path)
+    if runner.exporter is not None:
+        runner.exporter.remove_scan(scan_id, scan["scan_type"], scan["timestamp"])
     
-    save_data(db)
     return {"status": "deleted", "id": scan_id}
 
 @app.delete("/api/scans")
 def delete_all_scans():
-    db["scans"] = []
-    db["leaderboard"] = {"static": {}, "dynamic": {}}
-    
-    # Clear directory
-    for f in os.listdir(RESULTS_DIR):
-        if f.endswith(".json"):
-            os.remove(os.path.join(RESULTS_DIR, f))
-            
-    save_data(db)
+    store.delete_all()
+    if runner.exporter is not None:
+        runner.exporter.clear()
     return {"status": "all_deleted"}
 
 # --- Static Files / SPA Fallback ---
@@ -11,6 +11,37 @@ MCP_VULNERABILITY_TYPES = [
     "Denial of Service"
 ]
 
+# Canonical benchmark rule IDs emitted by the scanner wrappers -> vulnerability type
+RULE_CATEGORIES = {
+    "mcp-prompt-injection": "Prompt Injection",
+    "mcp-prompt-injection-weakness": "Prompt Injection",
+    "mcp-prompt-injection-markers": "Prompt Injection",
+    "mcp-dynamic-docstring": "Tool Poisoning",
+    "mcp-command-injection": "Tool Execution Abuse",
+    "mcp-shell-injection": "Tool Execution Abuse",
+    "mcp-subprocess-shell-true": "Tool Execution Abuse",
+    "mcp-eval-exec": "Tool Execution Abuse",
+    "mcp-os-system": "Tool Execution Abuse",
+    "mcp-hardcoded-secret": "Context Leakage",
+    "mcp-unsafe-file-read": "Context Leakage",
+    "mcp-unsafe-path-join": "Context Leakage",
+    "mcp-toxic-flow": "Context Leakage",
+    "mcp-access-control-violation": "Improper Access Control",
+    "mcp-insecure-transport": "Insecure Configuration",
+    "mcp-malicious-code": "Tool Poisoning",
+}
+
+def finding_category(rule_id: Optional[str], metadata: Optional[Dict[str, Any]] = None) -> str:
+    """Map a finding onto one of MCP_VULNERABILITY_TYPES ("Uncategorized" if nothing matches)."""
+    category = (metadata or {}).get("category")
+    if category in MCP_VULNERABILITY_TYPES:
+        return category
+    if rule_id in MCP_VULNERABILITY_TYPES:
+        return rule_id
+    # Semgrep prefixes check ids with the rules file namespace (e.g. "rules.mcp-eval-exec")
+    short_id = (rule_id or "").rsplit(".", 1)[-1]
+    return RULE_CATEGORIES.get(short_id, "Uncategorized")
+
 class Vulnerability(BaseModel):
     id: str
     rule_id: str
@@ -27,7 +58,24 @@ class ScannerOutput(BaseModel):
     scanner_name: str
     vulnerabilities: List[Vulnerability]
     raw_output: Optional[str] = None
+    # Set once raw_output has been moved to the blob store (fetch via /api/scans/{id}/raw/{scanner})
+    raw_output_ref: Optional[str] = None
+    raw_output_size: Optional[int] = None
+    # Raw output a scanner spilled to a local file instead of memory (RawSpill); the store moves it into the blob store
+    raw_output_file: Optional[str] = None
     error: Optional[str] = None
+    # Wall-clock seconds, and why the run was stopped early ("timeout", "scan_timeout", "cancelled")
+    duration: Optional[float] = None
+    kill_reason: Optional[str] = None
+    # Output served from the result cache (same scanner version, rules and repo tree) instead of a fresh run
+    cache_hit: Optional[bool] = None
+    # Incremental scans: the scan whose findings for unchanged files were carried forward
+    # (each such finding has metadata["carried_forward_from"])
+    base_scan_id: Optional[str] = None
+    # Version of the scanner's tool(s) as resolved by the toolchain
+    tool_version: Optional[str] = None
+    # The tool's own timing of the run (e.g. Semgrep's per-rule and slowest-file times)
+    profile: Optional[Dict[str, Any]] = None
 
 class AgentRanking(BaseModel):
     scanner: str
@@ -51,3 +99,29 @@ class Leaderboard(BaseModel):
     static: Dict[str, float] = Field(default_factory=dict, description="Scanner name -> holistic percentage score")
     dynamic: Dict[str, float] = Field(default_factory=dict, description="Scanner name -> holistic percentage score")
     total_scans: int = 0
+
+class ScanSummary(BaseModel):
+    id: str
+    timestamp: str
+    target: str # Repo URL
+    branch: str
+    scan_type: str = "static"
+    status: str = "pending"
+    evaluation: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+class ScanResult(BaseModel):
+    id: str
+    timestamp: str
+    target: str # Repo URL
+    branch: str
+    scan_type: str = "static"
+    scanner_results: Dict[str, Any]
+    evaluation: Optional[Dict[str, Any]] = None
+    status: str = "pending"
+    error: Optional[str] = None
+    commit_sha: Optional[str] = None # Scanned commit (git targets)
+    # RepoIndex.stats() of the scanned tree: file counts and how many JSON files the MCP config prefilter skipped, by reason
+    repo_index: Optional[Dict[str, Any]] = None
+    # Findings clustered across scanners: who agreed on each, who missed it (services/consensus.py)
+    consensus: Optional[Dict[str, Any]] = None
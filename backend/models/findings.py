@@ -0,0 +1,274 @@
+import sys
+import json
+import uuid
+import base64
+from array import array
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from models.common import Vulnerability, finding_category
+
+# Bumped when the to_columns() layout changes
+COLUMNS_VERSION = 1
+
+
+class StringTable:
+    """Distinct strings in first-seen order; a column stores indexes into it instead of the strings."""
+
+    __slots__ = ("strings", "_index", "_intern")
+
+    def __init__(self, strings: Iterable[str] = (), intern: bool = False):
+        self.strings: List[str] = []
+        self._index: Dict[str, int] = {}
+        # Short identifiers (rule ids, paths) are shared with the rest of the process via sys.intern
+        self._intern = intern
+        for s in strings:
+            self.add(s)
+
+    def add(self, s: str) -> int:
+        i = self._index.get(s)
+        if i is None:
+            if self._intern:
+                s = sys.intern(s)
+            i = len(self.strings)
+            self.strings.append(s)
+            self._index[s] = i
+        return i
+
+    def __getitem__(self, i: int) -> str:
+        return self.strings[i]
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+
+class Findings:
+    """
+    Many findings in columnar form, for the benchmark's path from scanner
+    output through path relativization, carry-forward, the result cache and
+    storage. Scanner, rule, severity and path are interned and dictionary
+    encoded, as are messages, snippets and metadata (as JSON text, which is
+    how the store keeps it anyway). Line numbers are machine-int arrays.
+    UUID ids take 16 bytes; other ids are kept as given. Vulnerability
+    models and dicts are produced only at the API boundary.
+    """
+
+    def __init__(self):
+        self.names = StringTable(intern=True)
+        self.texts = StringTable()
+        self.metas = StringTable()
+        self._ids = bytearray()
+        # Row -> id for ids that aren't UUIDs (their 16 bytes in _ids are zero)
+        self._other_ids: Dict[int, str] = {}
+        self._rule = array("I")
+        self._severity = array("I")
+        self._path = array("I")
+        self._scanner = array("I")
+        self._message = array("I")
+        self._snippet = array("I")
+        self._meta = array("I")
+        self._start = array("q")
+        self._end = array("q")
+
+    def __len__(self) -> int:
+        return len(self._rule)
+
+    def add(self, id: Optional[str], rule_id: str, message: str, severity: str, file_path: str,
+            start_line: int, end_line: int, code_snippet: str, scanner: str,
+            metadata: Optional[Dict[str, Any]] = None):
+        self._add_id(id or str(uuid.uuid4()))
+        self._rule.append(self.names.add(rule_id or ""))
+        self._severity.append(self.names.add(severity or ""))
+        self._path.append(self.names.add(file_path or ""))
+        self._scanner.append(self.names.add(scanner or ""))
+        self._message.append(self.texts.add(message or ""))
+        self._snippet.append(self.texts.add(code_snippet or ""))
+        self._meta.append(self.metas.add(json.dumps(metadata or {})))
+        self._start.append(start_line or 0)
+        self._end.append(end_line or 0)
+
+    def _add_id(self, id: str):
+        id = str(id)
+        hex_id = id.replace("-", "")
+        raw = None
+        if len(id) == 36 and id[8] == id[13] == id[18] == id[23] == "-" and len(hex_id) == 32:
+            try:
+                raw = bytes.fromhex(hex_id)
+            except ValueError:
+                pass
+        if raw is None or raw.hex() != hex_id:
+            # Not a canonical (lowercase, dashed) UUID: keep it verbatim
+            self._other_ids[len(self._ids) // 16] = id
+            raw = bytes(16)
+        self._ids += raw
+
+    def id(self, i: int) -> str:
+        other = self._other_ids.get(i)
+        if other is not None:
+            return other
+        h = self._ids[i * 16:i * 16 + 16].hex()
+        return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+    def file_path(self, i: int) -> str:
+        return self.names[self._path[i]]
+
+    def rule_id(self, i: int) -> str:
+        return self.names[self._rule[i]]
+
+    def severity(self, i: int) -> str:
+        return self.names[self._severity[i]]
+
+    def lines(self, i: int) -> Tuple[int, int]:
+        return self._start[i], self._end[i]
+
+    def categories(self) -> List[str]:
+        """finding_category of every finding, computed once per distinct rule and metadata."""
+        cache: Dict[Tuple[int, int], str] = {}
+        categories = []
+        for rule, meta in zip(self._rule, self._meta):
+            category = cache.get((rule, meta))
+            if category is None:
+                category = cache[(rule, meta)] = finding_category(self.names[rule], json.loads(self.metas[meta]))
+            categories.append(category)
+        return categories
+
+    # --- Conversion ---
+
+    @classmethod
+    def from_vulnerabilities(cls, vulns: Iterable[Vulnerability]) -> "Findings":
+        findings = cls()
+        for v in vulns:
+            findings.add(v.id, v.rule_id, v.message, v.severity, v.file_path, v.start_line, v.end_line,
+                         v.code_snippet, v.scanner, v.metadata)
+        return findings
+
+    @classmethod
+    def from_dicts(cls, vulns: Iterable[Dict[str, Any]]) -> "Findings":
+        findings = cls()
+        for v in vulns:
+            findings.add(v.get("id"), v.get("rule_id"), v.get("message"), v.get("severity"), v.get("file_path"),
+                         v.get("start_line"), v.get("end_line"), v.get("code_snippet"), v.get("scanner"),
+                         v.get("metadata"))
+        return findings
+
+    @classmethod
+    def coerce(cls, vulns: Any) -> "Findings":
+        """Findings as given, or built from a list of dicts / Vulnerability models."""
+        if isinstance(vulns, cls):
+            return vulns
+        vulns = list(vulns or [])
+        if vulns and isinstance(vulns[0], Vulnerability):
+            return cls.from_vulnerabilities(vulns)
+        return cls.from_dicts(vulns)
+
+    def row(self, i: int) -> Dict[str, Any]:
+        return {
+            "id": self.id(i),
+            "rule_id": self.names[self._rule[i]],
+            "message": self.texts[self._message[i]],
+            "severity": self.names[self._severity[i]],
+            "file_path": self.names[self._path[i]],
+            "start_line": self._start[i],
+            "end_line": self._end[i],
+            "code_snippet": self.texts[self._snippet[i]],
+            "scanner": self.names[self._scanner[i]],
+            "metadata": json.loads(self.metas[self._meta[i]]),
+        }
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self)):
+            yield self.row(i)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return list(self)
+
+    def to_vulnerabilities(self) -> List[Vulnerability]:
+        return [Vulnerability(**row) for row in self]
+
+    def storage_rows(self) -> Iterator[Tuple[Any, ...]]:
+        """(id, rule_id, message, severity, file_path, start_line, end_line, code_snippet, scanner, category, metadata JSON) per finding."""
+        for i, category in enumerate(self.categories()):
+            yield (
+                self.id(i), self.names[self._rule[i]], self.texts[self._message[i]], self.names[self._severity[i]],
+                self.names[self._path[i]], self._start[i], self._end[i], self.texts[self._snippet[i]],
+                self.names[self._scanner[i]], category, self.metas[self._meta[i]],
+            )
+
+    def to_columns(self) -> Dict[str, Any]:
+        """JSON-serializable columnar form (for the result cache); see from_columns."""
+        return {
+            "columns_version": COLUMNS_VERSION,
+            "names": self.names.strings,
+            "texts": self.texts.strings,
+            "metas": self.metas.strings,
+            "ids": base64.b64encode(bytes(self._ids)).decode(),
+            "other_ids": {str(i): id for i, id in self._other_ids.items()},
+            **{column: list(getattr(self, f"_{column}")) for column in
+               ("rule", "severity", "path", "scanner", "message", "snippet", "meta", "start", "end")},
+        }
+
+    @classmethod
+    def from_columns(cls, data: Dict[str, Any]) -> "Findings":
+        if data.get("columns_version") != COLUMNS_VERSION:
+            raise ValueError(f"Unsupported findings columns version: {data.get('columns_version')}")
+        findings = cls()
+        findings.names = StringTable(data["names"], intern=True)
+        findings.texts = StringTable(data["texts"])
+        findings.metas = StringTable(data["metas"])
+        findings._ids = bytearray(base64.b64decode(data["ids"]))
+        findings._other_ids = {int(i): id for i, id in data["other_ids"].items()}
+        for column in ("rule", "severity", "path", "scanner", "message", "snippet", "meta", "start", "end"):
+            getattr(findings, f"_{column}").extend(data[column])
+        return findings
+
+    # --- Column operations ---
+
+    def map_paths(self, fn: Callable[[str], str]):
+        """Rewrite every file path in place; `fn` runs once per distinct path."""
+        remap: Dict[int, int] = {}
+        for i, old in enumerate(self._path):
+            new = remap.get(old)
+            if new is None:
+                new = remap[old] = self.names.add(fn(self.names[old]))
+            self._path[i] = new
+
+    def set_metadata(self, key: str, value: Any, overwrite: bool = False):
+        """Set metadata[key] on every finding (keeping existing values unless `overwrite`); once per distinct metadata."""
+        remap: Dict[int, int] = {}
+        for i, old in enumerate(self._meta):
+            new = remap.get(old)
+            if new is None:
+                metadata = json.loads(self.metas[old])
+                if overwrite or key not in metadata:
+                    metadata[key] = value
+                new = remap[old] = self.metas.add(json.dumps(metadata))
+            self._meta[i] = new
+
+    def select(self, rows: Iterable[int]) -> "Findings":
+        """A new Findings with the given rows, in that order."""
+        out = Findings()
+        for i in rows:
+            out._append_row(self, i)
+        return out
+
+    def without_paths(self, paths: Iterable[str]) -> "Findings":
+        """The findings whose file path is not in `paths`."""
+        dropped = {self.names._index[p] for p in paths if p in self.names._index}
+        return self.select(i for i, p in enumerate(self._path) if p not in dropped)
+
+    def extend(self, other: "Findings"):
+        for i in range(len(other)):
+            self._append_row(other, i)
+
+    def _append_row(self, src: "Findings", i: int):
+        other = src._other_ids.get(i)
+        if other is not None:
+            self._other_ids[len(self)] = other
+        self._ids += src._ids[i * 16:i * 16 + 16]
+        self._rule.append(self.names.add(src.names[src._rule[i]]))
+        self._severity.append(self.names.add(src.names[src._severity[i]]))
+        self._path.append(self.names.add(src.names[src._path[i]]))
+        self._scanner.append(self.names.add(src.names[src._scanner[i]]))
+        self._message.append(self.texts.add(src.texts[src._message[i]]))
+        self._snippet.append(self.texts.add(src.texts[src._snippet[i]]))
+        self._meta.append(self.metas.add(src.metas[src._meta[i]]))
+        self._start.append(src._start[i])
+        self._end.append(src._end[i])
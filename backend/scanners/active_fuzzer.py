@@ -1,16 +1,22 @@
 
 import os
 import asyncio
+import importlib.metadata
 import json
 import uuid
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from .base import BaseScanner
+from .repo_index import RepoIndex
 from models.common import ScannerOutput, Vulnerability
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 import traceback
 
 class ActiveFuzzer(BaseScanner):
+    async def tool_version(self) -> Optional[str]:
+        # Fuzzes through the MCP Python SDK
+        return importlib.metadata.version("mcp")
+
     @property
     def name(self) -> str:
         return "ActiveFuzzer"
@@ -23,20 +29,16 @@ class ActiveFuzzer(BaseScanner):
     def supports_dynamic(self) -> bool:
         return True
 
-    def scan_static(self, target_path: str) -> ScannerOutput:
+    async def scan_static_async(self, target_path: str) -> ScannerOutput:
         # Fuzzer doesn't do static analysis
         return ScannerOutput(
             scanner_name=self.name,
             vulnerabilities=[]
         )
 
-    def scan_dynamic(self, target_path: str) -> ScannerOutput:
-        # Fuzzer runs in a new thread with a new event loop
+    async def scan_dynamic_async(self, target_path: str) -> ScannerOutput:
         try:
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-                future = executor.submit(asyncio.run, self._fuzz_server(target_path))
-                return future.result()
+            return await self._fuzz_server(target_path)
         except Exception as e:
             return ScannerOutput(
                 scanner_name=self.name,
@@ -50,85 +52,39 @@ class ActiveFuzzer(BaseScanner):
         logs = []
         logs.append(f"Starting fuzzing for target: {config_path}")
 
-        # 1. Resolve mcp.json
-        # 1. Resolve mcp.json (Recursive search)
+        # 1. Resolve mcp.json (first one in walk order, from the scan's shared index)
+        index = RepoIndex.for_path(config_path)
         mcp_config_path = None
         if os.path.isdir(config_path):
-            # Check root first
-            root_check = os.path.join(config_path, "mcp.json")
-            if os.path.exists(root_check):
-                mcp_config_path = root_check
-            else:
-                # Walk to find first mcp.json
-                for root, dirs, files in os.walk(config_path):
-                    if "mcp.json" in files:
-                        mcp_config_path = os.path.join(root, "mcp.json")
-                        break
+            found = index.files_named("mcp.json")
+            if found:
+                mcp_config_path = found[0]
             
         if not mcp_config_path:
              logs.append("No mcp.json found. Attempting heuristic detection...")
              
-             # Heuristic 1: Node.js (package.json)
-             # Walk to find package.json with "start" script or "main"
-             detected_config = None
-             for root, dirs, files in os.walk(config_path):
-                 if "package.json" in files:
-                     try:
-                         with open(os.path.join(root, "package.json")) as f:
-                             pkg = json.load(f)
-                             
-                         cmd = None
-                         args = []
-                         
-                         if "scripts" in pkg and "start" in pkg["scripts"]:
-                             # Use npm start
-                             cmd = "npm"
-                             args = ["start"]
-                         elif "main" in pkg:
-                             # Use node <main>
-                             cmd = "node"
-                             args = [pkg["main"]]
-                         elif os.path.exists(os.path.join(root, "build", "index.js")):
-                             cmd = "node"
-                             args = ["build/index.js"]
-                             
-                         if cmd:
-                             logs.append(f"Heuristic: Detected Node.js server at {root}")
-                             detected_config = {
-                                 "mcpServers": {
-                                     f"auto-node-{os.path.basename(root)}": {
-                                         "command": cmd,
-                                         "args": args,
-                                         "env": {}
-                                     }
-                                 }
-                             }
-                             # Write temp mcp.json to run context calculation correctly
-                             mcp_config_path = os.path.join(root, "mcp.json")
-                             with open(mcp_config_path, 'w') as f:
-                                 json.dump(detected_config, f)
-                             break
-                     except:
-                         pass
-                 
-                 # Heuristic 2: Python (server.py/main.py)
-                 if not detected_config and ("requirements.txt" in files or "pyproject.toml" in files):
-                     target_script = "server.py" if "server.py" in files else "main.py" if "main.py" in files else None
-                     if target_script:
-                         logs.append(f"Heuristic: Detected Python server at {root} ({target_script})")
-                         detected_config = {
-                                 "mcpServers": {
-                                     f"auto-python-{os.path.basename(root)}": {
-                                         "command": "python",
-                                         "args": [target_script],
-                                         "env": {}
-                                     }
-                                 }
-                             }
-                         mcp_config_path = os.path.join(root, "mcp.json")
-                         with open(mcp_config_path, 'w') as f:
-                                 json.dump(detected_config, f)
-                         break
+             # Heuristics: Node.js (package.json start/main) or Python (server.py/main.py next to requirements)
+             entry_points = index.server_entry_points
+             if entry_points:
+                 entry = entry_points[0]
+                 root = entry["dir"]
+                 if entry["runtime"] == "node":
+                     logs.append(f"Heuristic: Detected Node.js server at {root}")
+                 else:
+                     logs.append(f"Heuristic: Detected Python server at {root} ({entry['args'][0]})")
+                 detected_config = {
+                     "mcpServers": {
+                         f"auto-{entry['runtime']}-{os.path.basename(root)}": {
+                             "command": entry["command"],
+                             "args": entry["args"],
+                             "env": {}
+                         }
+                     }
+                 }
+                 # Write temp mcp.json to run context calculation correctly
+                 mcp_config_path = os.path.join(root, "mcp.json")
+                 with open(mcp_config_path, 'w') as f:
+                     json.dump(detected_config, f)
             
              if not mcp_config_path:
                  return ScannerOutput(scanner_name=self.name, vulnerabilities=[], raw_output="No mcp.json found and heuristics failed.", error="Config not found")
@@ -1,12 +1,204 @@
+import os
+import signal
+import asyncio
+import hashlib
+import inspect
+import tempfile
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from contextvars import ContextVar
+from typing import Dict, Any, AsyncIterator, FrozenSet, Iterable, List, NamedTuple, Optional, Union
 from models.common import ScannerOutput
+from .repo_index import RepoIndex
+from .toolchain import resolve_tool
+
+
+# File patterns (gitignore syntax) for BaseScanner.file_patterns
+CONFIG_PATTERNS = ["*.json"]
+SOURCE_PATTERNS = ["*.py", "*.pyi", "*.js", "*.jsx", "*.mjs", "*.cjs", "*.ts", "*.tsx"]
+
+
+# Raw tool output is written here as it arrives instead of being held in memory (see RawSpill)
+SPILL_DIR = os.getenv("SCANNER_SPILL_DIR") or None
+# Bytes per read from a streamed command's stdout
+STREAM_CHUNK_BYTES = 64 * 1024
+# stderr of a streamed command beyond this is dropped (it is only diagnostics)
+STREAM_STDERR_MAX_BYTES = 1024 * 1024
+
+# Repository-relative paths an incremental scan is limited to (None = the whole tree).
+# Set by the benchmark inside each scanner's task, so concurrent scans don't see each other's scope.
+scan_scope: ContextVar[Optional[FrozenSet[str]]] = ContextVar("scan_scope", default=None)
+
+class CommandResult(NamedTuple):
+    returncode: int
+    stdout: str
+    stderr: str
+
+
+def _signal_group(proc: asyncio.subprocess.Process, sig: int):
+    try:
+        os.killpg(proc.pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def _terminate(proc: asyncio.subprocess.Process, kill_grace: float):
+    """SIGTERM the process group, then SIGKILL it after `kill_grace` seconds."""
+    _signal_group(proc, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(proc.wait(), kill_grace)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        pass
+    _signal_group(proc, signal.SIGKILL)
+    if proc.returncode is None:
+        await proc.wait()
+
+
+async def run_command(cmd: List[str], cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None,
+                      timeout: Optional[float] = None, kill_grace: float = 2.0) -> CommandResult:
+    """
+    Async replacement for subprocess.run(capture_output=True, text=True).
+    Waiting on the process does not hold a thread. The command runs in its
+    own process group; on timeout (raised as asyncio.TimeoutError) or
+    cancellation the whole group, including anything the tool spawned
+    (npm, node, language servers), gets SIGTERM and then SIGKILL.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        cwd=cwd,
+        env=env,
+        start_new_session=True,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    except BaseException:
+        await _terminate(proc, kill_grace)
+        raise
+    return CommandResult(proc.returncode, stdout.decode("utf-8", errors="replace"), stderr.decode("utf-8", errors="replace"))
+
+
+class RawSpill:
+    """
+    A scanner's raw output, written to a temporary file as it arrives. The
+    file is deleted on exit unless `handover()` passed it on (as
+    ScannerOutput.raw_output_file, which the store moves into the blob store).
+    """
+
+    def __init__(self, prefix: str):
+        self.file = tempfile.NamedTemporaryFile(prefix=f"{prefix}-", suffix=".out", dir=SPILL_DIR, delete=False)
+        self.path = self.file.name
+        self._handed_over = False
+
+    def write(self, data: Union[str, bytes]):
+        self.file.write(data.encode("utf-8", errors="replace") if isinstance(data, str) else data)
+
+    def handover(self) -> str:
+        self.file.close()
+        self._handed_over = True
+        return self.path
+
+    def __enter__(self) -> "RawSpill":
+        return self
+
+    def __exit__(self, *exc):
+        self.file.close()
+        if not self._handed_over:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+class StreamedCommand:
+    """
+    A command whose stdout is consumed while it runs: `chunks()` yields it
+    piece by piece (e.g. into a JsonStreamParser), teeing each piece to
+    `spill`, so the output is never in memory whole. Use as an async
+    context manager. Like run_command, the command gets its own process
+    group, and leaving the block by an exception (a timeout, cancellation)
+    kills the whole group.
+    """
+
+    def __init__(self, cmd: List[str], cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None,
+                 spill: Optional[RawSpill] = None, kill_grace: float = 2.0):
+        self.cmd = cmd
+        self.cwd = cwd
+        self.env = env
+        self.spill = spill
+        self.kill_grace = kill_grace
+        self.proc: Optional[asyncio.subprocess.Process] = None
+        self._stderr = bytearray()
+        self._stderr_task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "StreamedCommand":
+        self.proc = await asyncio.create_subprocess_exec(
+            *self.cmd,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=self.cwd,
+            env=self.env,
+            start_new_session=True,
+        )
+        self._stderr_task = asyncio.ensure_future(self._read_stderr())
+        return self
+
+    async def _read_stderr(self):
+        while chunk := await self.proc.stderr.read(STREAM_CHUNK_BYTES):
+            self._stderr += chunk[:max(0, STREAM_STDERR_MAX_BYTES - len(self._stderr))]
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        while chunk := await self.proc.stdout.read(STREAM_CHUNK_BYTES):
+            if self.spill is not None:
+                self.spill.write(chunk)
+            yield chunk
+
+    @property
+    def returncode(self) -> Optional[int]:
+        return self.proc.returncode if self.proc else None
+
+    @property
+    def stderr(self) -> str:
+        return self._stderr.decode("utf-8", errors="replace")
+
+    async def wait(self) -> int:
+        """Read (and spill) whatever stdout is left, then wait for the exit status."""
+        async for _ in self.chunks():
+            pass
+        await self._stderr_task
+        return await self.proc.wait()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.wait()
+            return
+        await _terminate(self.proc, self.kill_grace)
+        self._stderr_task.cancel()
+
 
 class BaseScanner(ABC):
     """
     Abstract Base Class for MCP Scanners.
+
+    Scanners implement either the async interface (scan_static_async /
+    scan_dynamic_async, preferred: the benchmark drives every scanner of
+    every running scan on one event loop) or the legacy blocking one
+    (scan_static / scan_dynamic). Each side has a default adapter onto the
+    other, so callers can use whichever fits.
     """
 
+    # Upper bound on one scan_*_async call; the benchmark also caps it by the scan's remaining budget
+    timeout: float = float(os.getenv("SCANNER_TIMEOUT", "300"))
+    # Executables the scanner runs, resolved once per process by the toolchain (empty for in-process scanners)
+    tools: List[str] = []
+    # Rule/config files whose contents change the tool's output
+    config_files: List[str] = []
+    # Each finding depends only on the file it is reported in, so a rescan can be limited to
+    # changed files (see scan_scope) and the previous scan's other findings carried forward
+    incremental: bool = False
+
     @property
     @abstractmethod
     def name(self) -> str:
@@ -18,47 +210,99 @@ class BaseScanner(ABC):
         """Whether the scanner supports static code analysis"""
         return True
 
+    @property
+    def file_patterns(self) -> Optional[List[str]]:
+        """
+        Files a static scan reads, as gitignore-style patterns. The repository
+        is sparsely checked out to the union over all scanners; None means the
+        scanner needs the whole tree.
+        """
+        return None
+
     @property
     def supports_dynamic(self) -> bool:
         """Whether the scanner supports dynamic runtime analysis"""
         return True
 
-    @abstractmethod
     def scan_static(self, target_path: str) -> ScannerOutput:
-        pass
+        if type(self).scan_static_async is BaseScanner.scan_static_async:
+            raise NotImplementedError(f"{self.name} implements neither scan_static nor scan_static_async")
+        return asyncio.run(self.scan_static_async(target_path))
 
-    @abstractmethod
     def scan_dynamic(self, target_url: str) -> ScannerOutput:
-        pass
+        if type(self).scan_dynamic_async is BaseScanner.scan_dynamic_async:
+            raise NotImplementedError(f"{self.name} implements neither scan_dynamic nor scan_dynamic_async")
+        return asyncio.run(self.scan_dynamic_async(target_url))
+
+    async def scan_static_async(self, target_path: str) -> ScannerOutput:
+        # Legacy blocking wrappers run on the loop's bounded thread pool
+        return await asyncio.to_thread(self.scan_static, target_path)
+
+    async def scan_dynamic_async(self, target_url: str) -> ScannerOutput:
+        return await asyncio.to_thread(self.scan_dynamic, target_url)
+
+    async def close(self):
+        """Release long-lived state (worker processes) when the process shuts down."""
+
+    def unavailable_reason(self) -> Optional[str]:
+        """Why this scanner can't run in this process (a missing tool or file), or None if it can."""
+        for name in self.tools:
+            if not resolve_tool(name).available:
+                return f"{name} not found"
+        for path in self.config_files:
+            if not os.path.exists(path):
+                return f"{path} not found"
+        return None
+
+    def executable(self, name: str) -> str:
+        """Absolute path of one of self.tools."""
+        tool = resolve_tool(name)
+        if not tool.available:
+            raise FileNotFoundError(f"{name} not found")
+        return tool.path
+
+    async def tool_version(self) -> Optional[str]:
+        if not self.tools:
+            return ""
+        versions = []
+        for name in self.tools:
+            # Only the first lookup runs anything; it stays off the event loop
+            tool = await asyncio.to_thread(resolve_tool, name)
+            if tool.version is None:
+                return None
+            versions.append(tool.version if len(self.tools) == 1 else f"{name} {tool.version}")
+        return "; ".join(versions)
+
+    async def cache_identity(self) -> Optional[str]:
+        """
+        Everything besides the repository that determines this scanner's output:
+        tool version, rule/config file contents and the wrapper's own source.
+        None (no caching) if the tool version can't be determined.
+        """
+        version = await self.tool_version()
+        if version is None:
+            return None
+        try:
+            wrapper = inspect.getfile(type(self))
+        except TypeError:
+            # Defined outside any file (e.g. interactively): nothing to hash, so don't cache
+            return None
+        digest = hashlib.sha256(version.encode())
+        for path in [wrapper, *self.config_files]:
+            try:
+                with open(path, "rb") as f:
+                    digest.update(hashlib.sha256(f.read()).digest())
+            except OSError:
+                digest.update(b"missing:" + path.encode())
+        return digest.hexdigest()
+
+    def in_scope(self, target_path: str, paths: Iterable[str]) -> List[str]:
+        """`paths` (absolute) limited to the current scan scope."""
+        scope = scan_scope.get()
+        if scope is None:
+            return list(paths)
+        return [p for p in paths if os.path.relpath(p, target_path) in scope]
 
     def find_mcp_configs(self, target_path: str) -> List[str]:
-        import json
-        import os
-        configs = []
-        if not os.path.exists(target_path):
-            return []
-            
-        if os.path.isfile(target_path):
-            if target_path.endswith(".json"):
-                try:
-                    with open(target_path, 'r') as f:
-                        data = json.load(f)
-                        if "mcpServers" in data or ("command" in data and "args" in data):
-                            return [os.path.abspath(target_path)]
-                except:
-                    pass
-            return []
-
-        for root, dirs, files in os.walk(target_path):
-            for file in files:
-                if file.endswith(".json"):
-                    full_path = os.path.join(root, file)
-                    try:
-                        with open(full_path, 'r') as f:
-                            data = json.load(f)
-                            # Check if it looks like an MCP config
-                            if "mcpServers" in data or ("command" in data and "args" in data):
-                                configs.append(os.path.abspath(full_path))
-                    except:
-                        continue
-        return configs
+        # Shared per scan, so the tree is walked and its JSON files parsed once for all scanners
+        return self.in_scope(target_path, RepoIndex.for_path(target_path).mcp_configs)
@@ -0,0 +1,199 @@
+import re
+import json
+import codecs
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Path component for the elements of an array (object members use their key)
+ITEM = None
+# Pattern component matching any key or array element
+ANY = "*"
+
+Path = Tuple[Optional[str], ...]
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# A complete string, an unterminated one (need more input), or a bracket
+_SKIP_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|"|[\[\]{}]')
+_SCALAR = re.compile(r"[^ \t\n\r,:\[\]{}\"]+")
+# Consumed input is dropped from the buffer once it gets this long
+_COMPACT_CHARS = 1 << 20
+
+
+def _matches(pattern: Sequence[Optional[str]], path: Path) -> bool:
+    return len(pattern) == len(path) and all(p == ANY or p == c for p, c in zip(pattern, path))
+
+
+class JsonStreamParser:
+    """
+    Push parser for one JSON document arriving in chunks. Values at the
+    `patterns` paths (tuples of keys, ITEM for array elements, ANY for
+    either) are decoded one at a time and returned as (path, value) events
+    as soon as they are complete; everything else is skipped without being
+    built. Memory is bounded by the largest selected value plus one chunk,
+    not by the document.
+    """
+
+    def __init__(self, patterns: Iterable[Sequence[Optional[str]]]):
+        self.patterns = [tuple(p) for p in patterns]
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._buf = ""
+        self._pos = 0
+        # Open containers: (kind "{" or "[", path)
+        self._stack: List[Tuple[str, Path]] = []
+        self._state = "value"
+        self._path: Path = ()
+        self._skip_depth = 0
+        # Undecodable remainder length at the last attempt; retried once the buffer doubles
+        self._pending = 0
+
+    def feed(self, data: bytes) -> List[Tuple[Path, Any]]:
+        self._buf += self._utf8.decode(data)
+        return self._run(final=False)
+
+    def close(self) -> List[Tuple[Path, Any]]:
+        """Events for the end of the input; ValueError if the document is incomplete or malformed."""
+        self._buf += self._utf8.decode(b"", final=True)
+        events = self._run(final=True)
+        if self._state != "done":
+            raise ValueError(f"Incomplete JSON document (at char {self._pos} of the remaining input)")
+        return events
+
+    def _selected(self, path: Path) -> bool:
+        return any(_matches(p, path) for p in self.patterns)
+
+    def _descends(self, path: Path) -> bool:
+        return any(len(p) > len(path) and _matches(p[:len(path)], path) for p in self.patterns)
+
+    def _child_path(self) -> Path:
+        kind, path = self._stack[-1]
+        return path + (ITEM,) if kind == "[" else path
+
+    def _end_value(self):
+        self._state = "after" if self._stack else "done"
+
+    def _run(self, final: bool) -> List[Tuple[Path, Any]]:
+        events: List[Tuple[Path, Any]] = []
+        buf = self._buf
+        while True:
+            self._pos = _WHITESPACE.match(buf, self._pos).end()
+            if self._pos >= len(buf):
+                break
+            char = buf[self._pos]
+            state = self._state
+
+            if state == "done":
+                raise ValueError(f"Extra data after the JSON document: {buf[self._pos:self._pos + 40]!r}")
+
+            if state == "skip":
+                if not self._skip(buf):
+                    break
+                self._end_value()
+
+            elif state in ("after", "first"):
+                kind, _ = self._stack[-1]
+                closer = "}" if kind == "{" else "]"
+                if char == closer:
+                    self._stack.pop()
+                    self._pos += 1
+                    self._end_value()
+                elif state == "after" and char == ",":
+                    self._pos += 1
+                    self._state = "key" if kind == "{" else "value"
+                    self._path = self._child_path()
+                elif state == "first":
+                    self._state = "key" if kind == "{" else "value"
+                    self._path = self._child_path()
+                else:
+                    raise ValueError(f"Expected ',' or {closer!r} at {buf[self._pos:self._pos + 40]!r}")
+
+            elif state == "key":
+                if char != '"':
+                    raise ValueError(f"Expected an object key at {buf[self._pos:self._pos + 40]!r}")
+                try:
+                    key, end = json.decoder.scanstring(buf, self._pos + 1)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    break
+                self._pos = end
+                self._path = self._stack[-1][1] + (key,)
+                self._state = "colon"
+
+            elif state == "colon":
+                if char != ":":
+                    raise ValueError(f"Expected ':' at {buf[self._pos:self._pos + 40]!r}")
+                self._pos += 1
+                self._state = "value"
+
+            else:  # value
+                path = self._path
+                if char not in '{["':
+                    # Scalar: complete only once something follows it
+                    match = _SCALAR.match(buf, self._pos)
+                    if match is None:
+                        raise ValueError(f"Unexpected {char!r} in JSON")
+                    if match.end() >= len(buf) and not final:
+                        break
+                    self._pos = match.end()
+                    if self._selected(path):
+                        events.append((path, json.loads(match.group())))
+                    self._end_value()
+                elif self._selected(path):
+                    remaining = len(buf) - self._pos
+                    if not final and remaining < 2 * self._pending:
+                        break
+                    try:
+                        value, end = self._decoder.raw_decode(buf, self._pos)
+                    except json.JSONDecodeError:
+                        if final:
+                            raise
+                        self._pending = remaining
+                        break
+                    self._pending = 0
+                    self._pos = end
+                    events.append((path, value))
+                    self._end_value()
+                elif char in "{[" and self._descends(path):
+                    self._stack.append((char, path))
+                    self._pos += 1
+                    self._state = "first"
+                else:
+                    self._skip_depth = 0
+                    self._state = "skip"
+
+        if self._pos > _COMPACT_CHARS or self._pos >= len(buf):
+            self._buf = buf[self._pos:]
+            self._pos = 0
+        return events
+
+    def _skip(self, buf: str) -> bool:
+        """Advance past the container or string being skipped; False if it continues beyond the buffer."""
+        while True:
+            match = _SKIP_TOKEN.search(buf, self._pos)
+            if match is None:
+                # Only scalars and punctuation left in the buffer
+                self._pos = len(buf)
+                return False
+            token = match.group()
+            if token == '"':
+                # Unterminated string: resume from its start
+                self._pos = match.start()
+                return False
+            self._pos = match.end()
+            if token[0] == '"':
+                if self._skip_depth == 0:
+                    return True
+            elif token in "[{":
+                self._skip_depth += 1
+            else:
+                self._skip_depth -= 1
+                if self._skip_depth == 0:
+                    return True
+
+
+def iter_json(chunks: Iterable[bytes], patterns: Iterable[Sequence[Optional[str]]]) -> Iterator[Tuple[Path, Any]]:
+    """(path, value) events of a JSON document read in chunks, e.g. from a file."""
+    parser = JsonStreamParser(patterns)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
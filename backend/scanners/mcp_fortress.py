@@ -1,12 +1,16 @@
 import os
 import json
-import subprocess
+import asyncio
 import uuid
 from typing import Dict, Any, List
-from .base import BaseScanner
+from .base import BaseScanner, run_command, CONFIG_PATTERNS
 from models.common import ScannerOutput, Vulnerability
 
 class MCPFortressWrapper(BaseScanner):
+    tools = ["mcp-fortress"]
+    # Not incremental: findings come from the registry package named in the package.json next to
+    # each config, so they change with that file and with the registry, not with the config itself
+
     @property
     def name(self) -> str:
         return "mcp-fortress"
@@ -15,18 +19,22 @@ class MCPFortressWrapper(BaseScanner):
     def supports_static(self) -> bool:
         return True
 
+    @property
+    def file_patterns(self) -> List[str]:
+        return CONFIG_PATTERNS
+
     @property
     def supports_dynamic(self) -> bool:
         return False
 
-    def scan_static(self, target_path: str) -> ScannerOutput:
+    async def scan_static_async(self, target_path: str) -> ScannerOutput:
         try:
             # mcp-fortress scan <package>
             # For local projects, we need to see if it supports directory scanning.
             # Based on docs, it primarily scans npm/pypi packages.
             # However, we can try to scan the local directory if it has a package.json.
             
-            configs = self.find_mcp_configs(target_path)
+            configs = await asyncio.to_thread(self.find_mcp_configs, target_path)
             if not configs:
                 return ScannerOutput(
                     scanner_name=self.name,
@@ -57,15 +65,15 @@ class MCPFortressWrapper(BaseScanner):
                     continue
 
                 # Run mcp-fortress scan <package-name>
-                cmd = ["mcp-fortress", "scan", scan_target]
-                result = subprocess.run(cmd, capture_output=True, text=True, check=False)
+                cmd = [self.executable("mcp-fortress"), "scan", scan_target]
+                result = await run_command(cmd)
                 
                 # If it failed because it tried to download a path@latest, we'll note it
                 if "Scan failed" in result.stdout or result.returncode != 0:
                     all_raw.append(f"--- Failed for {config} (package: {scan_target}) ---\n{result.stdout}\n{result.stderr}")
                     continue
 
-                vulns = self._parse_fortress_output(result.stdout, os.path.basename(config))
+                vulns = self._parse_fortress_output(result.stdout, config)
                 all_vulns.extend(vulns)
                 all_raw.append(f"--- Result for {config} (package: {scan_target}) ---\n{result.stdout}")
 
@@ -124,5 +132,5 @@ class MCPFortressWrapper(BaseScanner):
         
         return vulns
 
-    def scan_dynamic(self, target_url: str) -> ScannerOutput:
+    async def scan_dynamic_async(self, target_url: str) -> ScannerOutput:
         return ScannerOutput(scanner_name=self.name, vulnerabilities=[], raw_output="mcp-fortress dynamic scanning not yet implemented in wrapper.")
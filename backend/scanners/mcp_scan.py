@@ -1,12 +1,19 @@
 import os
-import json
-import subprocess
+import asyncio
 import uuid
-from typing import Dict, Any, List
-from .base import BaseScanner
+from typing import Dict, Any, List, Optional, Tuple
+from .base import BaseScanner, RawSpill, StreamedCommand, CONFIG_PATTERNS
+from .json_stream import ANY, ITEM, JsonStreamParser
 from models.common import ScannerOutput, Vulnerability
 
+# Keys of an mcp-scan issue that become Vulnerability fields
+ISSUE_FIELDS = {"message", "severity", "file", "path", "line", "evidence"}
+
+
 class MCPScanWrapper(BaseScanner):
+    tools = ["mcp-scan"]
+    # Not incremental: the servers each config names are started, so findings depend on their code too
+
     @property
     def name(self) -> str:
         return "mcp-scan"
@@ -15,15 +22,18 @@ class MCPScanWrapper(BaseScanner):
     def supports_static(self) -> bool:
         return True
 
+    @property
+    def file_patterns(self) -> List[str]:
+        return CONFIG_PATTERNS
+
     @property
     def supports_dynamic(self) -> bool:
         # mcp-scan run/check can be considered dynamic or at least deeper inspection
         return True
 
-    def _parse_mcp_scan_output(self, output: str) -> List[Vulnerability]:
+    def _parse_mcp_scan_data(self, data: Any, config: str = "mcp.json") -> List[Vulnerability]:
         vulns = []
         try:
-            data = json.loads(output)
             # mcp-scan output can be a list of issues or a dict keyed by file path
             items = []
             if isinstance(data, list):
@@ -58,20 +68,21 @@ class MCPScanWrapper(BaseScanner):
                     rule_id=rule_id,
                     message=message,
                     severity=(item.get("severity") or "MEDIUM").upper(),
-                    file_path=item.get("file") or item.get("path") or "mcp.json",
+                    file_path=item.get("file") or item.get("path") or config,
                     start_line=item.get("line") or 0,
                     end_line=item.get("line") or 0,
                     code_snippet=item.get("evidence") or "",
                     scanner=self.name,
-                    metadata={**item, "original_rule": raw_rule}
+                    # The item minus what is already in the finding's own fields
+                    metadata={**{k: v for k, v in item.items() if k not in ISSUE_FIELDS}, "original_rule": raw_rule}
                 ))
         except Exception as e:
             print(f"Error parsing mcp-scan output: {e}")
         return vulns
 
-    def scan_static(self, target_path: str) -> ScannerOutput:
+    async def scan_static_async(self, target_path: str) -> ScannerOutput:
         try:
-            configs = self.find_mcp_configs(target_path)
+            configs = await asyncio.to_thread(self.find_mcp_configs, target_path)
             
             if not configs:
                 return ScannerOutput(
@@ -81,26 +92,92 @@ class MCPScanWrapper(BaseScanner):
                 )
 
             all_vulns = []
-            all_raw = []
-            
-            for config in configs:
-                # Correct command: mcp-scan <path> --json --opt-out
-                # --opt-out helps skip Invariant platform pushing which might 403
-                cmd = ["uv", "run", "mcp-scan", config, "--json", "--opt-out"]
-                result = subprocess.run(cmd, capture_output=True, text=True, check=False, cwd=os.path.dirname(config), env=os.environ)
-                
-                vulns = self._parse_mcp_scan_output(result.stdout)
-                all_vulns.extend(vulns)
-                all_raw.append(f"--- Result for {config} ---\n{result.stdout}\n{result.stderr}")
-            
-            return ScannerOutput(
-                scanner_name=self.name,
-                vulnerabilities=all_vulns,
-                raw_output="\n".join(all_raw)
-            )
+
+            with RawSpill(self.name) as raw:
+                # One mcp-scan process for all configs; its JSON is keyed by config path
+                remaining = list(configs)
+                if len(configs) > 1:
+                    cmd = [self.executable("mcp-scan"), *configs, "--json", "--opt-out"]
+                    raw.write(f"--- Batch of {len(configs)} configs ---\n")
+                    by_config, returncode = await self._run_batch(cmd, configs, target_path, raw)
+                    if by_config is None:
+                        print(f"mcp-scan batch of {len(configs)} configs failed (exit {returncode}); "
+                              f"scanning them one by one", flush=True)
+                    else:
+                        for vulns in by_config.values():
+                            all_vulns.extend(vulns)
+                        remaining = [c for c in configs if c not in by_config]
+
+                # Single configs, and the fallback when a config crashes the batch
+                for config in remaining:
+                    # Correct command: mcp-scan <path> --json --opt-out
+                    # --opt-out helps skip Invariant platform pushing which might 403
+                    cmd = [self.executable("mcp-scan"), config, "--json", "--opt-out"]
+                    raw.write(f"--- Result for {config} ---\n")
+                    all_vulns.extend(await self._run_single(cmd, config, raw))
+
+                return ScannerOutput(
+                    scanner_name=self.name,
+                    vulnerabilities=all_vulns,
+                    raw_output_file=raw.handover()
+                )
         except Exception as e:
             return ScannerOutput(scanner_name=self.name, vulnerabilities=[], error=str(e))
 
-    def scan_dynamic(self, target_url: str) -> ScannerOutput:
+    async def _run_single(self, cmd: List[str], config: str, raw: RawSpill) -> List[Vulnerability]:
+        """One config's findings, parsed from mcp-scan's stdout as it streams in (a list, or a dict of results)."""
+        vulns = []
+        parser = JsonStreamParser([(ANY,)])
+        async with StreamedCommand(cmd, cwd=os.path.dirname(config), env=dict(os.environ), spill=raw) as command:
+            try:
+                async for chunk in command.chunks():
+                    for (key,), value in parser.feed(chunk):
+                        vulns.extend(self._parse_mcp_scan_data([value] if key is ITEM else {key: value}, config))
+                for (key,), value in parser.close():
+                    vulns.extend(self._parse_mcp_scan_data([value] if key is ITEM else {key: value}, config))
+            except ValueError as e:
+                print(f"Error parsing mcp-scan output: {e}")
+            await command.wait()
+        raw.write(f"\n{command.stderr}\n")
+        return vulns
+
+    async def _run_batch(self, cmd: List[str], configs: List[str], cwd: str,
+                         raw: RawSpill) -> Tuple[Optional[Dict[str, List[Vulnerability]]], Optional[int]]:
+        """
+        Findings of a multi-config run by config, demultiplexed as mcp-scan's
+        per-path results stream in, and its exit status. Configs the output
+        has no entry for are left out; None if the run failed or its output
+        isn't a per-path result at all.
+        """
+        # mcp-scan keys results by the path as given (possibly normalized)
+        wanted = {os.path.realpath(c): c for c in configs}
+        by_config: Dict[str, List[Vulnerability]] = {}
+        per_path = True
+
+        def demux(events: List[Tuple[Tuple, Any]]):
+            nonlocal per_path
+            for (path,), entry in events:
+                if path is ITEM:
+                    per_path = False
+                    continue
+                config = wanted.get(os.path.realpath(os.path.join(cwd, os.path.expanduser(path))))
+                if config and isinstance(entry, dict):
+                    by_config[config] = self._parse_mcp_scan_data(entry, config)
+
+        parser = JsonStreamParser([(ANY,)])
+        async with StreamedCommand(cmd, cwd=cwd, env=dict(os.environ), spill=raw) as command:
+            try:
+                async for chunk in command.chunks():
+                    demux(parser.feed(chunk))
+                demux(parser.close())
+            except ValueError:
+                per_path = False
+            returncode = await command.wait()
+        raw.write(f"\n{command.stderr}\n")
+        if returncode != 0 or not per_path or not by_config:
+            return None, returncode
+        return by_config, returncode
+
+    async def scan_dynamic_async(self, target_url: str) -> ScannerOutput:
         # For mcp-scan, dynamic means running the scan on the same local configs
-        return self.scan_static(target_url)
+        return await self.scan_static_async(target_url)
@@ -1,12 +1,15 @@
 import os
 import json
-import subprocess
+import asyncio
 import uuid
 from typing import Dict, Any, List
-from .base import BaseScanner
+from .base import BaseScanner, run_command, CONFIG_PATTERNS
 from models.common import ScannerOutput, Vulnerability
 
 class MCPShieldWrapper(BaseScanner):
+    tools = ["mcp-shield"]
+    # Not incremental: the servers each config names are started, so findings depend on their code too
+
     @property
     def name(self) -> str:
         return "mcp-shield"
@@ -15,13 +18,17 @@ class MCPShieldWrapper(BaseScanner):
     def supports_static(self) -> bool:
         return True
 
+    @property
+    def file_patterns(self) -> List[str]:
+        return CONFIG_PATTERNS
+
     @property
     def supports_dynamic(self) -> bool:
         return False
 
-    def scan_static(self, target_path: str) -> ScannerOutput:
+    async def scan_static_async(self, target_path: str) -> ScannerOutput:
         try:
-            configs = self.find_mcp_configs(target_path)
+            configs = await asyncio.to_thread(self.find_mcp_configs, target_path)
             
             if not configs:
                 return ScannerOutput(
@@ -35,14 +42,14 @@ class MCPShieldWrapper(BaseScanner):
             
             for config in configs:
                 try:
-                    cmd = ["mcp-shield", "--path", config]
-                    result = subprocess.run(cmd, capture_output=True, text=True, check=False, cwd=os.path.dirname(config), timeout=60)
+                    cmd = [self.executable("mcp-shield"), "--path", config]
+                    result = await run_command(cmd, cwd=os.path.dirname(config), timeout=60)
                     
                     # Parse text output (basic implementation)
-                    vulns = self._parse_shield_output(result.stdout, config_name=os.path.basename(config))
+                    vulns = self._parse_shield_output(result.stdout, config_name=config)
                     all_vulns.extend(vulns)
                     all_raw.append(f"--- Result for {config} ---\n{result.stdout}\n{result.stderr}")
-                except subprocess.TimeoutExpired:
+                except asyncio.TimeoutError:
                     all_raw.append(f"--- Result for {config} (Timed Out after 60s) ---")
 
             return ScannerOutput(
@@ -115,11 +122,11 @@ class MCPShieldWrapper(BaseScanner):
                            end_line=0,
                            code_snippet="",
                            scanner=self.name,
-                           metadata={"server": current_server, "tool": current_tool, "config": config_name}
+                           metadata={"server": current_server, "tool": current_tool, "config": os.path.basename(config_name)}
                         ))
         except Exception:
             pass
         return vulns
 
-    def scan_dynamic(self, target_url: str) -> ScannerOutput:
+    async def scan_dynamic_async(self, target_url: str) -> ScannerOutput:
         return ScannerOutput(scanner_name=self.name, vulnerabilities=[], raw_output="mcp-shield is a static analysis tool.", error="Not Supported")
@@ -1,12 +1,37 @@
 import os
 import json
-import subprocess
+import asyncio
 import uuid
-from typing import Dict, Any, List
-from .base import BaseScanner
+from typing import Dict, Any, List, Optional, Tuple
+from .base import BaseScanner, CONFIG_PATTERNS, SOURCE_PATTERNS
+from .worker_pool import NdjsonWorkerPool
 from models.common import ScannerOutput, Vulnerability
 
+SCRIPT_PATH = "/app/scanners/mcp_watch_tool/dist/main.js"
+# Long-lived `main.js serve` processes shared by all scans of the process
+POOL_SIZE = int(os.getenv("MCP_WATCH_WORKERS", "2"))
+REQUEST_TIMEOUT = 60
+# Keys of an mcp-watch result that become Vulnerability fields
+RESULT_FIELDS = {"id", "message", "severity", "file", "line", "evidence"}
+
 class MCPWatchWrapper(BaseScanner):
+    tools = ["node"]
+    # Vendored build; its bundle is the version (and the scanner is unavailable without it)
+    config_files = [SCRIPT_PATH]
+
+    def __init__(self):
+        self._pool: Optional[NdjsonWorkerPool] = None
+
+    @property
+    def pool(self) -> NdjsonWorkerPool:
+        if self._pool is None:
+            self._pool = NdjsonWorkerPool(self.name, [self.executable("node"), SCRIPT_PATH, "serve"], POOL_SIZE)
+        return self._pool
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+
     @property
     def name(self) -> str:
         return "mcp-watch"
@@ -15,13 +40,18 @@ class MCPWatchWrapper(BaseScanner):
     def supports_static(self) -> bool:
         return True
 
+    @property
+    def file_patterns(self) -> List[str]:
+        # Analyzes the server code next to each config
+        return CONFIG_PATTERNS + SOURCE_PATTERNS
+
     @property
     def supports_dynamic(self) -> bool:
         return False
 
-    def scan_static(self, target_path: str) -> ScannerOutput:
+    async def scan_static_async(self, target_path: str) -> ScannerOutput:
         try:
-            configs = self.find_mcp_configs(target_path)
+            configs = await asyncio.to_thread(self.find_mcp_configs, target_path)
             
             if not configs:
                 return ScannerOutput(
@@ -32,24 +62,13 @@ class MCPWatchWrapper(BaseScanner):
 
             all_vulns = []
             all_raw = []
-            script_path = "/app/scanners/mcp_watch_tool/dist/main.js"
-            
-            if not os.path.exists(script_path):
-                 return ScannerOutput(scanner_name=self.name, vulnerabilities=[], error=f"Tool not found at {script_path}")
+            # Configs are spread over the pool's workers
+            responses = await asyncio.gather(*(self._scan_config(config) for config in configs))
+            for config, (response, raw) in zip(configs, responses):
+                if response is not None:
+                    all_vulns.extend(self._parse_watch_data(response, os.path.basename(config)))
+                all_raw.append(f"--- Result for {config} ---\n{raw}")
 
-            for config in configs:
-                # mcp-watch needs the directory containing the config, not the config itself
-                target_dir = os.path.dirname(config)
-                try:
-                    # Invoke directly with node since it's not in global path
-                    cmd = ["node", script_path, target_dir]
-                    result = subprocess.run(cmd, capture_output=True, text=True, check=False, timeout=60)
-                    vulns = self._parse_watch_output(result.stdout, os.path.basename(config))
-                    all_vulns.extend(vulns)
-                    all_raw.append(f"--- Result for {config} ---\n{result.stdout}\n{result.stderr}")
-                except subprocess.TimeoutExpired:
-                    all_raw.append(f"--- Result for {config} (Timed Out after 60s) ---")
-                
             return ScannerOutput(
                 scanner_name=self.name,
                 vulnerabilities=all_vulns,
@@ -59,17 +78,23 @@ class MCPWatchWrapper(BaseScanner):
         except Exception as e:
             return ScannerOutput(scanner_name=self.name, vulnerabilities=[], error=str(e))
 
-    def _parse_watch_output(self, stdout: str, config_name: str) -> List[Vulnerability]:
-        vulns = []
+    async def _scan_config(self, config: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """One config through the worker pool: (response or None on failure, raw output section)."""
+        # mcp-watch needs the directory containing the config, not the config itself
+        target_dir = os.path.dirname(config)
         try:
-            json_start = stdout.find('{')
-            json_end = stdout.rfind('}')
-            if json_start != -1 and json_end != -1:
-                json_str = stdout[json_start:json_end+1]
-                data = json.loads(json_str)
-            else:
-                data = {}
+            response = await self.pool.request({"path": target_dir}, timeout=REQUEST_TIMEOUT)
+        except asyncio.TimeoutError:
+            return None, f"(Timed Out after {REQUEST_TIMEOUT}s)"
+        except Exception as e:
+            return None, f"(Worker failed: {e})"
+        if response.get("error"):
+            return None, f"(Error: {response['error']})"
+        return response, json.dumps(response, indent=2)
 
+    def _parse_watch_data(self, data: Dict[str, Any], config_name: str) -> List[Vulnerability]:
+        vulns = []
+        try:
             results = data.get("vulnerabilities", []) if isinstance(data, dict) else []
             for res in results:
                 try:
@@ -101,7 +126,9 @@ class MCPWatchWrapper(BaseScanner):
                         end_line=res.get("line") or 0,
                         code_snippet=res.get("evidence", ""),
                         scanner=self.name,
-                        metadata={**res, "original_category": original_cat, "config": config_name}
+                        # The result minus what is already in the finding's own fields
+                        metadata={**{k: v for k, v in res.items() if k not in RESULT_FIELDS},
+                                  "original_category": original_cat, "config": config_name}
                     ))
                 except Exception:
                     pass
@@ -109,7 +136,7 @@ class MCPWatchWrapper(BaseScanner):
             pass
         return vulns
 
-    def scan_dynamic(self, target_url: str) -> ScannerOutput:
+    async def scan_dynamic_async(self, target_url: str) -> ScannerOutput:
         # mcp-watch scan <repo>
         # We can implement similarly if we pass the URL.
         # But for now we are using cloned local path, so scan_static logic applies mainly.
@@ -1,5 +1,6 @@
 #!/usr/bin/env node
 
+import * as readline from "readline";
 import { Command } from "commander";
 import { MCPScanner } from "./scanner/McpScanner";
 import { formatReport } from "./utils/reportFormatter";
@@ -223,4 +224,41 @@ program
     }
   );
 
+program
+  .command("serve")
+  .description(
+    "Worker mode: read scan requests ({\"id\", \"path\"}) as newline-delimited JSON on stdin and write one JSON result line per request to stdout"
+  )
+  .action(async () => {
+    // stdout carries the protocol; the scanners' progress logging goes to stderr
+    console.log = (...args: unknown[]) => console.error(...args);
+
+    const lines = readline.createInterface({ input: process.stdin, terminal: false });
+    // Requests are handled one at a time; the caller runs several workers for parallelism.
+    // The loop ends, and the worker exits, when stdin is closed.
+    for await (const line of lines) {
+      if (!line.trim()) {
+        continue;
+      }
+      let id: unknown = null;
+      try {
+        const request = JSON.parse(line) as { id?: unknown; path?: unknown };
+        id = request.id ?? null;
+        if (typeof request.path !== "string") {
+          throw new Error("Request has no path");
+        }
+        const scanner = new MCPScanner();
+        const vulnerabilities = await scanner.scanLocalProject(request.path);
+        process.stdout.write(JSON.stringify({ id, vulnerabilities }) + "\n");
+      } catch (error) {
+        process.stdout.write(
+          JSON.stringify({
+            id,
+            error: error instanceof Error ? error.message : String(error),
+          }) + "\n"
+        );
+      }
+    }
+  });
+
 program.parse();
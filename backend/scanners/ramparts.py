@@ -1,11 +1,14 @@
 import json
-import subprocess
+import asyncio
 import uuid
 from typing import Dict, Any, List
-from .base import BaseScanner
+from .base import BaseScanner, run_command, CONFIG_PATTERNS
 from models.common import ScannerOutput, Vulnerability
 
 class RampartsWrapper(BaseScanner):
+    tools = ["ramparts"]
+    # Not incremental: the servers each config names are started, so findings depend on their code too
+
     @property
     def name(self) -> str:
         return "ramparts"
@@ -14,13 +17,17 @@ class RampartsWrapper(BaseScanner):
     def supports_static(self) -> bool:
         return True
 
+    @property
+    def file_patterns(self) -> List[str]:
+        return CONFIG_PATTERNS
+
     @property
     def supports_dynamic(self) -> bool:
         return False
 
-    def scan_static(self, target_path: str) -> ScannerOutput:
+    async def scan_static_async(self, target_path: str) -> ScannerOutput:
         try:
-            configs = self.find_mcp_configs(target_path)
+            configs = await asyncio.to_thread(self.find_mcp_configs, target_path)
             
             if not configs:
                 return ScannerOutput(
@@ -33,8 +40,8 @@ class RampartsWrapper(BaseScanner):
             all_raw = []
             
             for config in configs:
-                cmd = ["ramparts", "scan", config]
-                result = subprocess.run(cmd, capture_output=True, text=True, check=False)
+                cmd = [self.executable("ramparts"), "scan", config]
+                result = await run_command(cmd)
                 
                 # ramparts output parsing (placeholder if needed, but currently returns raw)
                 all_raw.append(f"--- Result for {config} ---\n{result.stdout}\n{result.stderr}")
@@ -48,5 +55,5 @@ class RampartsWrapper(BaseScanner):
         except Exception as e:
             return ScannerOutput(scanner_name=self.name, vulnerabilities=[], error=str(e))
 
-    def scan_dynamic(self, target_url: str) -> ScannerOutput:
-        return self.scan_static(target_url)
+    async def scan_dynamic_async(self, target_url: str) -> ScannerOutput:
+        return await self.scan_static_async(target_url)
@@ -1,22 +1,154 @@
-from typing import List, Type
+import os
+import threading
+import importlib
+from importlib.metadata import entry_points
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 from .base import BaseScanner
-from .mcp_scan import MCPScanWrapper
-from .semgrep_scan import SemgrepScanner
-from .mcp_shield import MCPShieldWrapper
-from .ramparts import RampartsWrapper
-from .mcp_watch import MCPWatchWrapper
-from .mcp_fortress import MCPFortressWrapper
-from .active_fuzzer import ActiveFuzzer
+from .toolchain import resolved_tools
+
+# Third-party scanners register a "module:Class" entry point in this group
+ENTRY_POINT_GROUP = "mcp_benchmark.scanners"
+
+
+class ScannerSpec(NamedTuple):
+    name: str
+    # "module:Class", imported on first use
+    target: str
+    # Scan types it supports, so choosing the scanners for a scan imports none of the others.
+    # None (entry point plugins) = import it to find out.
+    modes: Optional[Tuple[str, ...]] = ("static",)
+    enabled_by_default: bool = True
+
+
+# Built-in scanners, in run order
+MANIFEST = [
+    ScannerSpec("mcp-scan", "scanners.mcp_scan:MCPScanWrapper", ("static", "dynamic")),
+    ScannerSpec("Semgrep", "scanners.semgrep_scan:SemgrepScanner"),
+    ScannerSpec("mcp-shield", "scanners.mcp_shield:MCPShieldWrapper"),
+    ScannerSpec("mcp-watch", "scanners.mcp_watch:MCPWatchWrapper"),
+    ScannerSpec("mcp-fortress", "scanners.mcp_fortress:MCPFortressWrapper"),
+    ScannerSpec("ramparts", "scanners.ramparts:RampartsWrapper", enabled_by_default=False),
+    # Pulls in the MCP client stack; only imported by processes that run dynamic scans
+    ScannerSpec("ActiveFuzzer", "scanners.active_fuzzer:ActiveFuzzer", ("dynamic",)),
+]
+
+
+def _names_from_env(var: str) -> Optional[List[str]]:
+    value = os.getenv(var)
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(",") if name.strip()]
+
 
 class ScannerRegistry:
-    @staticmethod
-    def get_scanners():
-        return [
-            MCPScanWrapper(),
-            SemgrepScanner(),
-            MCPShieldWrapper(),
-            MCPWatchWrapper(),
-            MCPFortressWrapper(),
-            # RampartsWrapper(), # Skipping ramparts for now or keep it
-            ActiveFuzzer()
-        ]
+    """
+    Scanners known to this process: the built-in MANIFEST plus entry point
+    plugins. Modules are imported on first use and each scanner is a
+    long-lived singleton, so warm state (resolved tools, worker processes)
+    survives across scans. SCANNERS_ENABLED (comma-separated names) replaces
+    the default set; SCANNERS_DISABLED removes scanners from it.
+    """
+
+    _specs: Optional[List[ScannerSpec]] = None
+    _instances: Dict[str, BaseScanner] = {}
+    # Scanner name -> why it can't run here (None = available); checked once per process
+    _unavailable: Dict[str, Optional[str]] = {}
+    _lock = threading.RLock()
+
+    @classmethod
+    def specs(cls) -> List[ScannerSpec]:
+        with cls._lock:
+            if cls._specs is None:
+                specs = list(MANIFEST)
+                known = {spec.name for spec in specs}
+                for ep in entry_points(group=ENTRY_POINT_GROUP):
+                    if ep.name not in known:
+                        specs.append(ScannerSpec(ep.name, ep.value, None))
+                        known.add(ep.name)
+                cls._specs = specs
+            return cls._specs
+
+    @classmethod
+    def is_enabled(cls, spec: ScannerSpec) -> bool:
+        enabled = _names_from_env("SCANNERS_ENABLED")
+        if spec.name in (_names_from_env("SCANNERS_DISABLED") or []):
+            return False
+        return spec.name in enabled if enabled is not None else spec.enabled_by_default
+
+    @classmethod
+    def get(cls, name: str) -> BaseScanner:
+        """The singleton instance of scanner `name`, importing its module on first use."""
+        with cls._lock:
+            scanner = cls._instances.get(name)
+            if scanner is None:
+                spec = next((s for s in cls.specs() if s.name == name), None)
+                if spec is None:
+                    raise KeyError(f"Unknown scanner: {name}")
+                module_name, _, class_name = spec.target.partition(":")
+                scanner = getattr(importlib.import_module(module_name), class_name)()
+                cls._instances[name] = scanner
+            return scanner
+
+    @classmethod
+    def unavailable_reason(cls, scanner: BaseScanner) -> Optional[str]:
+        with cls._lock:
+            if scanner.name not in cls._unavailable:
+                reason = scanner.unavailable_reason()
+                cls._unavailable[scanner.name] = reason
+                if reason:
+                    print(f"Scanner {scanner.name} unavailable: {reason}", flush=True)
+            return cls._unavailable[scanner.name]
+
+    @classmethod
+    def get_scanners(cls, scan_type: Optional[str] = None) -> List[BaseScanner]:
+        """
+        Enabled scanners whose tools are installed, limited to those supporting
+        `scan_type` when given. The rest are skipped without importing or
+        spawning anything.
+        """
+        scanners = []
+        for spec in cls.specs():
+            if not cls.is_enabled(spec):
+                continue
+            if scan_type and spec.modes is not None and scan_type not in spec.modes:
+                continue
+            try:
+                scanner = cls.get(spec.name)
+            except Exception as e:
+                print(f"Failed to load scanner {spec.name}: {e}", flush=True)
+                continue
+            if scan_type == "static" and not scanner.supports_static:
+                continue
+            if scan_type == "dynamic" and not scanner.supports_dynamic:
+                continue
+            if cls.unavailable_reason(scanner) is None:
+                scanners.append(scanner)
+        return scanners
+
+    @classmethod
+    async def close(cls):
+        """Shut down the loaded scanners' long-lived state. Runs on the scanner event loop."""
+        with cls._lock:
+            scanners = list(cls._instances.values())
+        for scanner in scanners:
+            try:
+                await scanner.close()
+            except Exception as e:
+                print(f"Failed to close scanner {scanner.name}: {e}", flush=True)
+
+    @classmethod
+    def status(cls) -> List[Dict[str, Any]]:
+        """Every known scanner: enabled, loaded (imported) and available, with its resolved tools. For the API."""
+        entries = []
+        for spec in cls.specs():
+            with cls._lock:
+                scanner = cls._instances.get(spec.name)
+            entry = {"name": spec.name, "enabled": cls.is_enabled(spec), "loaded": scanner is not None,
+                     "available": None, "reason": None, "tools": {}}
+            if scanner is not None:
+                entry["reason"] = cls.unavailable_reason(scanner)
+                entry["available"] = entry["reason"] is None
+                tools = resolved_tools()
+                entry["tools"] = {name: tools[name]._asdict() for name in scanner.tools if name in tools}
+            entries.append(entry)
+        return entries
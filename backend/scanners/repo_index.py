@@ -0,0 +1,291 @@
+import os
+import json
+import mmap
+import hashlib
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Dependency, VCS and build directories never hold the MCP configs or server code under test
+PRUNED_DIRS = {
+    ".git", ".hg", ".svn", "node_modules", "bower_components", "vendor", "third_party",
+    ".venv", "venv", "site-packages", "__pycache__", ".tox", ".mypy_cache", ".pytest_cache",
+}
+
+FILE_KINDS = {
+    ".json": "json",
+    ".py": "python", ".pyi": "python",
+    ".js": "javascript", ".jsx": "javascript", ".mjs": "javascript", ".cjs": "javascript",
+    ".ts": "typescript", ".tsx": "typescript",
+    ".yaml": "yaml", ".yml": "yaml", ".toml": "toml",
+}
+
+
+# MCP configs are a few KiB; anything this big is a lockfile, fixture or dataset
+MCP_CONFIG_MAX_BYTES = int(os.getenv("MCP_CONFIG_MAX_BYTES", str(2 * 1024 * 1024)))
+# Candidates are parsed in a process pool once they add up to this much JSON; below it, spawning costs more than it saves
+PARALLEL_PARSE_MIN_BYTES = 32 * 1024 * 1024
+
+
+def is_mcp_config(data: Any) -> bool:
+    return isinstance(data, dict) and ("mcpServers" in data or ("command" in data and "args" in data))
+
+
+def _prefilter(path: str, max_bytes: int) -> Tuple[Optional[str], int]:
+    """Cheap rejection before parsing. Returns (skip reason or None if the file is a candidate, size)."""
+    try:
+        size = os.path.getsize(path)
+        if size == 0:
+            return "empty", 0
+        if size > max_bytes:
+            return "too_large", size
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data.find(b'"mcpServers"') != -1:
+                return None, size
+            if data.find(b'"command"') != -1 and data.find(b'"args"') != -1:
+                return None, size
+            return "no_marker", size
+    except (OSError, ValueError):
+        return "unreadable", 0
+
+
+def _parse_candidate(path: str) -> Optional[str]:
+    """Full check of a prefiltered file. Returns the skip reason, or None if it is an MCP config."""
+    try:
+        with open(path, "rb") as f:
+            data = json.loads(f.read())
+    except OSError:
+        return "unreadable"
+    except ValueError:
+        # JSONDecodeError and UnicodeDecodeError
+        return "invalid_json"
+    return None if is_mcp_config(data) else "not_config"
+
+
+def detect_mcp_configs(paths: List[str], max_bytes: int = MCP_CONFIG_MAX_BYTES,
+                       parallel_min_bytes: int = PARALLEL_PARSE_MIN_BYTES) -> Tuple[List[str], Dict[str, int]]:
+    """
+    Find the MCP configs among `paths` (JSON files). Files are first screened
+    with a substring search over an mmap of their bytes for the marker keys,
+    and only the survivors are parsed. Returns the configs (in input order)
+    and a count of skipped files per reason.
+    """
+    skipped: Dict[str, int] = {}
+    candidates = []
+    candidate_bytes = 0
+    for path in paths:
+        reason, size = _prefilter(path, max_bytes)
+        if reason:
+            skipped[reason] = skipped.get(reason, 0) + 1
+        else:
+            candidates.append(path)
+            candidate_bytes += size
+
+    workers = min(8, os.cpu_count() or 1)
+    if workers > 1 and len(candidates) > 1 and candidate_bytes >= parallel_min_bytes:
+        # spawn, not fork: the benchmark process is full of threads
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            reasons = list(pool.map(_parse_candidate, candidates, chunksize=max(1, len(candidates) // (workers * 4))))
+    else:
+        reasons = [_parse_candidate(path) for path in candidates]
+
+    configs = []
+    for path, reason in zip(candidates, reasons):
+        if reason:
+            skipped[reason] = skipped.get(reason, 0) + 1
+        else:
+            configs.append(path)
+    return configs, skipped
+
+
+class RepoIndex:
+    """
+    One walk over a checked-out repository, shared by every scanner of a scan.
+
+    The walk prunes dependency/VCS directories and records each directory's
+    files in walk order, classified by kind. MCP configs are detected once,
+    on first use. The benchmark registers the index for the scan's path
+    with `share()`; scanners get it through `for_path()`, which falls back
+    to a private index when nothing is shared (e.g. a scanner used
+    standalone).
+    """
+
+    _shared: Dict[str, Tuple["RepoIndex", int]] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        # Directory -> file names, top-down in os.walk order
+        self.dirs: Dict[str, List[str]] = {}
+        self.pruned_dirs = 0
+        self._mcp_configs: Optional[List[str]] = None
+        self.mcp_config_skipped: Dict[str, int] = {}
+        self._entry_points: Optional[List[Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+
+        started = time.monotonic()
+        if os.path.isfile(self.root):
+            self.dirs[os.path.dirname(self.root)] = [os.path.basename(self.root)]
+        else:
+            for dirpath, dirnames, filenames in os.walk(self.root):
+                kept = [d for d in dirnames if d not in PRUNED_DIRS]
+                self.pruned_dirs += len(dirnames) - len(kept)
+                dirnames[:] = kept
+                self.dirs[dirpath] = filenames
+        self.build_seconds = time.monotonic() - started
+
+        self.by_kind: Dict[str, List[str]] = {}
+        self.by_name: Dict[str, List[str]] = {}
+        for path in self.files():
+            name = os.path.basename(path)
+            kind = FILE_KINDS.get(os.path.splitext(name)[1].lower(), "other")
+            self.by_kind.setdefault(kind, []).append(path)
+            self.by_name.setdefault(name, []).append(path)
+
+    # --- Sharing ---
+
+    @classmethod
+    def share(cls, root: str) -> "RepoIndex":
+        """Build (or reuse) the index of `root` and make it visible to for_path() until unshare()."""
+        key = os.path.abspath(root)
+        with cls._shared_lock:
+            entry = cls._shared.get(key)
+            if entry:
+                cls._shared[key] = (entry[0], entry[1] + 1)
+                return entry[0]
+        index = cls(key)
+        with cls._shared_lock:
+            entry = cls._shared.get(key)
+            if entry:
+                # Another scan of the same path won the race
+                index = entry[0]
+            cls._shared[key] = (index, (entry[1] if entry else 0) + 1)
+        return index
+
+    @classmethod
+    def unshare(cls, root: str):
+        key = os.path.abspath(root)
+        with cls._shared_lock:
+            entry = cls._shared.get(key)
+            if not entry:
+                return
+            if entry[1] <= 1:
+                del cls._shared[key]
+            else:
+                cls._shared[key] = (entry[0], entry[1] - 1)
+
+    @classmethod
+    def for_path(cls, root: str) -> "RepoIndex":
+        with cls._shared_lock:
+            entry = cls._shared.get(os.path.abspath(root))
+        return entry[0] if entry else cls(root)
+
+    # --- Lookups ---
+
+    def walk(self) -> Iterator[Tuple[str, List[str]]]:
+        """(directory, file names) pairs in os.walk order, without touching the disk."""
+        return iter(self.dirs.items())
+
+    def files(self) -> Iterator[str]:
+        for dirpath, filenames in self.dirs.items():
+            for name in filenames:
+                yield os.path.join(dirpath, name)
+
+    def files_of_kind(self, kind: str) -> List[str]:
+        return self.by_kind.get(kind, [])
+
+    def files_named(self, name: str) -> List[str]:
+        """Absolute paths of files called `name`, in walk order (repository root first)."""
+        return self.by_name.get(name, [])
+
+    def fingerprint(self) -> str:
+        """Content identity for trees that aren't git checkouts (local:// paths): paths, sizes and mtimes."""
+        digest = hashlib.sha256()
+        for path in sorted(self.files()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            digest.update(f"{os.path.relpath(path, self.root)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+        return digest.hexdigest()
+
+    @property
+    def file_count(self) -> int:
+        return sum(len(names) for names in self.dirs.values())
+
+    @property
+    def mcp_configs(self) -> List[str]:
+        """JSON files that look like MCP configs, detected once per index (see detect_mcp_configs)."""
+        with self._lock:
+            if self._mcp_configs is None:
+                started = time.monotonic()
+                json_files = self.files_of_kind("json")
+                self._mcp_configs, self.mcp_config_skipped = detect_mcp_configs(json_files)
+                print(
+                    f"Found {len(self._mcp_configs)} MCP configs among {len(json_files)} JSON files "
+                    f"in {time.monotonic() - started:.2f}s (skipped: {self.mcp_config_skipped or 'none'})",
+                    flush=True
+                )
+            return self._mcp_configs
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        What indexing and MCP config detection did, for the scan record.
+        The MCP config counts are None if no scanner asked for configs.
+        """
+        with self._lock:
+            detected = self._mcp_configs is not None
+            return {
+                "files": self.file_count,
+                "build_seconds": round(self.build_seconds, 3),
+                "pruned_dirs": self.pruned_dirs,
+                "json_files": len(self.files_of_kind("json")),
+                "mcp_configs": len(self._mcp_configs) if detected else None,
+                "mcp_config_skipped": dict(self.mcp_config_skipped) if detected else None,
+            }
+
+    @property
+    def server_entry_points(self) -> List[Dict[str, Any]]:
+        """
+        Directories that look like a runnable MCP server, in walk order:
+        a package.json with a start script / main / build/index.js (node),
+        or requirements.txt / pyproject.toml next to server.py / main.py (python).
+        """
+        with self._lock:
+            if self._entry_points is None:
+                self._entry_points = []
+                for dirpath, filenames in self.walk():
+                    entry = self._node_entry_point(dirpath, filenames) or self._python_entry_point(dirpath, filenames)
+                    if entry:
+                        self._entry_points.append(entry)
+            return self._entry_points
+
+    @staticmethod
+    def _node_entry_point(dirpath: str, filenames: List[str]) -> Optional[Dict[str, Any]]:
+        if "package.json" not in filenames:
+            return None
+        try:
+            with open(os.path.join(dirpath, "package.json")) as f:
+                pkg = json.load(f)
+        except Exception:
+            return None
+        if "scripts" in pkg and "start" in pkg["scripts"]:
+            command, args = "npm", ["start"]
+        elif "main" in pkg:
+            command, args = "node", [pkg["main"]]
+        elif os.path.exists(os.path.join(dirpath, "build", "index.js")):
+            command, args = "node", ["build/index.js"]
+        else:
+            return None
+        return {"dir": dirpath, "runtime": "node", "command": command, "args": args}
+
+    @staticmethod
+    def _python_entry_point(dirpath: str, filenames: List[str]) -> Optional[Dict[str, Any]]:
+        if "requirements.txt" not in filenames and "pyproject.toml" not in filenames:
+            return None
+        script = "server.py" if "server.py" in filenames else "main.py" if "main.py" in filenames else None
+        if not script:
+            return None
+        return {"dir": dirpath, "runtime": "python", "command": "python", "args": [script]}
@@ -1,11 +1,195 @@
-import json
-import subprocess
+import os
+import re
+import math
 import uuid
-from typing import Dict, Any, List
-from .base import BaseScanner
+import heapq
+import asyncio
+from typing import Dict, Any, List, Optional, Tuple
+from .base import BaseScanner, RawSpill, StreamedCommand, scan_scope, SOURCE_PATTERNS
+from .json_stream import ITEM, JsonStreamParser
+from .repo_index import RepoIndex
 from models.common import ScannerOutput, Vulnerability
 
+RULES_PATH = "rules/mcp_security.yaml"
+# Semgrep rule language -> RepoIndex file kind
+LANGUAGE_KINDS = {
+    "python": "python", "py": "python",
+    "javascript": "javascript", "js": "javascript",
+    "typescript": "typescript", "ts": "typescript",
+}
+# Generated code rather than the server under test (dependency directories are already pruned by RepoIndex)
+BUILD_DIRS = {"dist", "build", "out", ".next", ".nuxt", "coverage"}
+MINIFIED_SUFFIXES = (".min.js", ".min.mjs", ".bundle.js")
+# A file with no line break this far in is a minified bundle
+MINIFIED_PROBE_BYTES = 4096
+MAX_TARGET_BYTES = int(os.getenv("SEMGREP_MAX_TARGET_BYTES", str(1024 * 1024)))
+# Seconds per rule on one file, and rule timeouts on one file before semgrep skips the rest of its rules
+RULE_TIMEOUT = int(os.getenv("SEMGREP_RULE_TIMEOUT", "10"))
+TIMEOUT_THRESHOLD = int(os.getenv("SEMGREP_TIMEOUT_THRESHOLD", "3"))
+# Targets go on the command line; longer lists are split over several runs to stay clear of ARG_MAX
+MAX_ARGS_BYTES = 512 * 1024
+# Entries kept in each list of the stored profile
+PROFILE_TOP = 20
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on: its affinity mask, capped by a cgroup v2 CPU quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def rule_kinds(rules_path: str = RULES_PATH) -> Optional[List[str]]:
+    """File kinds the rules can match, from their `languages:`; None if any rule needs other files."""
+    kinds: List[str] = []
+    with open(rules_path) as f:
+        for match in re.finditer(r"^\s*languages:\s*\[([^\]]*)\]", f.read(), re.MULTILINE):
+            for language in match.group(1).split(","):
+                kind = LANGUAGE_KINDS.get(language.strip().strip("\"'").lower())
+                if kind is None:
+                    return None
+                if kind not in kinds:
+                    kinds.append(kind)
+    return kinds or None
+
+
+def _is_minified(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            head = f.read(MINIFIED_PROBE_BYTES)
+    except OSError:
+        return False
+    return len(head) == MINIFIED_PROBE_BYTES and b"\n" not in head
+
+
+def _batches(targets: List[str]) -> List[List[str]]:
+    batches: List[List[str]] = [[]]
+    size = 0
+    for target in targets:
+        if batches[-1] and size + len(target) + 1 > MAX_ARGS_BYTES:
+            batches.append([])
+            size = 0
+        batches[-1].append(target)
+        size += len(target) + 1
+    return batches
+
+
+# Parts of semgrep's --json --time output that are read; the rest is skipped unparsed
+STREAMED_PATHS = [
+    ("results", ITEM),
+    ("errors", ITEM),
+    ("paths", "skipped", ITEM),
+    ("time", "rules", ITEM),
+    ("time", "targets", ITEM),
+    ("time", "total_time"),
+]
+
+
+class SemgrepProfile:
+    """
+    Semgrep's --time output, accumulated per streamed event into per-rule
+    totals, the slowest files and timeouts; memory doesn't grow with the
+    number of targets.
+    """
+
+    def __init__(self, target_path: str):
+        self.target_path = target_path
+        self.rule_ids: List[str] = []
+        # Match seconds by rule index (targets may arrive before the rule list)
+        self.rule_times: List[float] = []
+        # Min-heap of the slowest files: (run_time, seq, entry)
+        self.slowest: List[Tuple[float, int, Dict[str, Any]]] = []
+        self.files = 0
+        self.errors: Dict[str, int] = {}
+        self.timeouts: List[Dict[str, Any]] = []
+        self.skipped: Dict[str, int] = {}
+        self.total_time = 0.0
+        self._rules_seen = 0
+
+    def add(self, path: Tuple, value: Any):
+        if path[0] == "errors":
+            kind = value.get("type")
+            kind = kind[0] if isinstance(kind, list) and kind else str(kind)
+            self.errors[kind] = self.errors.get(kind, 0) + 1
+            if "Timeout" in kind and value.get("path") and len(self.timeouts) < PROFILE_TOP:
+                self.timeouts.append({"path": os.path.relpath(value["path"], self.target_path),
+                                      "rule_id": value.get("rule_id")})
+        elif path[0] == "paths":
+            reason = value.get("reason", "unknown")
+            self.skipped[reason] = self.skipped.get(reason, 0) + 1
+        elif path == ("time", "total_time"):
+            self.total_time += value or 0
+        elif path[1] == "rules":
+            # Every batch lists the same rules, in the same order
+            if self._rules_seen == len(self.rule_ids):
+                self.rule_ids.append(value.get("id"))
+            self._rules_seen += 1
+        else:
+            self._add_target(value)
+
+    def start_run(self):
+        self._rules_seen = 0
+
+    def _add_target(self, target: Dict[str, Any]):
+        match_times = target.get("match_times") or []
+        if len(self.rule_times) < len(match_times):
+            self.rule_times.extend([0.0] * (len(match_times) - len(self.rule_times)))
+        for i, seconds in enumerate(match_times):
+            self.rule_times[i] += max(0.0, seconds or 0)
+        run_time = round(target.get("run_time") or 0, 3)
+        entry = {
+            "path": os.path.relpath(target.get("path", ""), self.target_path),
+            "bytes": target.get("num_bytes"),
+            "run_time": run_time,
+            "parse_time": round(sum(max(0.0, t or 0) for t in target.get("parse_times") or []), 3),
+        }
+        self.files += 1
+        if len(self.slowest) < PROFILE_TOP:
+            heapq.heappush(self.slowest, (run_time, self.files, entry))
+        elif run_time > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (run_time, self.files, entry))
+
+    def summary(self, jobs: int, targets: Optional[int], prefiltered: Dict[str, int]) -> Dict[str, Any]:
+        rules = [
+            {"id": self.rule_ids[i] if i < len(self.rule_ids) else f"#{i}", "match_time": round(seconds, 3)}
+            for i, seconds in enumerate(self.rule_times)
+        ]
+        return {
+            "jobs": jobs,
+            "targets": targets,
+            "prefiltered": prefiltered,
+            "max_target_bytes": MAX_TARGET_BYTES,
+            "rule_timeout": RULE_TIMEOUT,
+            "total_time": round(self.total_time, 3),
+            "rules": sorted(rules, key=lambda r: r["match_time"], reverse=True),
+            "slowest_files": [entry for _, _, entry in sorted(self.slowest, key=lambda e: (-e[0], e[1]))],
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "semgrep_skipped": self.skipped,
+        }
+
+
 class SemgrepScanner(BaseScanner):
+    """
+    Runs rules/mcp_security.yaml over an explicit list of the files its
+    rules can match (no build output, minified bundles or oversized files),
+    with --jobs sized to the CPUs this process has, per-file limits, and
+    semgrep's own timing summarized into ScannerOutput.profile.
+    """
+
+    tools = ["semgrep"]
+    config_files = [RULES_PATH]
+    incremental = True
+
     @property
     def name(self) -> str:
         return "Semgrep"
@@ -14,66 +198,128 @@ class SemgrepScanner(BaseScanner):
     def supports_static(self) -> bool:
         return True
 
+    @property
+    def file_patterns(self) -> List[str]:
+        # rules/mcp_security.yaml only targets Python, JavaScript and TypeScript
+        return SOURCE_PATTERNS
+
     @property
     def supports_dynamic(self) -> bool:
         return False
 
-    def scan_static(self, target_path: str) -> ScannerOutput:
-        config_path = "rules/mcp_security.yaml"
+    def _select_targets(self, target_path: str) -> Tuple[Optional[List[str]], Dict[str, int]]:
+        """Files to hand to semgrep (None = the whole tree) and how many were left out, by reason."""
+        skipped = {"build_output": 0, "minified": 0, "too_large": 0}
+        kinds = rule_kinds()
+        if kinds is None:
+            return None, skipped
+        index = RepoIndex.for_path(target_path)
+        # Incremental scans are limited to the changed files
+        candidates = self.in_scope(target_path, [p for kind in kinds for p in index.files_of_kind(kind)])
+        targets = []
+        for path in candidates:
+            parts = os.path.relpath(path, target_path).split(os.sep)
+            if BUILD_DIRS.intersection(parts[:-1]):
+                skipped["build_output"] += 1
+                continue
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            if size > MAX_TARGET_BYTES:
+                skipped["too_large"] += 1
+            elif path.endswith(MINIFIED_SUFFIXES) or _is_minified(path):
+                skipped["minified"] += 1
+            else:
+                targets.append(path)
+        return targets, skipped
+
+    def _to_vulnerability(self, item: Dict[str, Any]) -> Vulnerability:
+        check_id = item.get("check_id")
+
+        # Track category for internal metrics (optional)
+        category = "Insecure Configuration"
+        check_id_lower = check_id.lower()
+        if "injection" in check_id_lower or "exec" in check_id_lower:
+             category = "Tool Execution Abuse"
+        elif "prompt" in check_id_lower or "context" in check_id_lower:
+             category = "Prompt Injection"
+
+        return Vulnerability(
+            id=str(uuid.uuid4()),
+            rule_id=check_id,  # Use the specific check_id
+            message=item.get("extra", {}).get("message", ""),
+            severity=item.get("extra", {}).get("severity", "UNKNOWN"),
+            file_path=item.get("path", ""),
+            start_line=item.get("start", {}).get("line", 0),
+            end_line=item.get("end", {}).get("line", 0),
+            code_snippet=item.get("extra", {}).get("lines", ""),
+            scanner="Semgrep",
+            metadata={**item.get("extra", {}).get("metadata", {}), "category": category}
+        )
+
+    def _collect(self, events, vulns: List[Vulnerability], profile: SemgrepProfile):
+        for path, value in events:
+            if path[0] == "results":
+                vulns.append(self._to_vulnerability(value))
+            else:
+                profile.add(path, value)
+
+    async def scan_static_async(self, target_path: str) -> ScannerOutput:
+        config_path = RULES_PATH
         # If running from backend root, rules is in ./rules
         
         try:
-            cmd = [
-                "uv", "run", "semgrep", 
-                "scan", 
+            targets, skipped = await asyncio.to_thread(self._select_targets, target_path)
+            if targets is not None and not targets:
+                message = "No changed source files." if scan_scope.get() is not None else "No source files to scan."
+                return ScannerOutput(scanner_name=self.name, vulnerabilities=[], raw_output=message)
+
+            jobs = int(os.getenv("SEMGREP_JOBS") or 0) or available_cpus()
+            base_cmd = [
+                self.executable("semgrep"),
+                "scan",
                 "--config", config_path, 
                 "--json", 
+                "--time",
                 "--disable-version-check",
                 "--metrics=off",
-                target_path
+                "--jobs", str(jobs),
+                "--max-target-bytes", str(MAX_TARGET_BYTES),
+                "--timeout", str(RULE_TIMEOUT),
+                "--timeout-threshold", str(TIMEOUT_THRESHOLD),
             ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, check=False)
-            
+
             vulns = []
-            try:
-                data = json.loads(result.stdout)
-                for item in data.get("results", []):
-                    check_id = item.get("check_id")
-                    
-                    # Track category for internal metrics (optional)
-                    category = "Insecure Configuration"
-                    check_id_lower = check_id.lower()
-                    if "injection" in check_id_lower or "exec" in check_id_lower:
-                         category = "Tool Execution Abuse"
-                    elif "prompt" in check_id_lower or "context" in check_id_lower:
-                         category = "Prompt Injection"
-                    
-                    vulns.append(Vulnerability(
-                        id=str(uuid.uuid4()),
-                        rule_id=check_id,  # Use the specific check_id
-                        message=item.get("extra", {}).get("message", ""),
-                        severity=item.get("extra", {}).get("severity", "UNKNOWN"),
-                        file_path=item.get("path", ""),
-                        start_line=item.get("start", {}).get("line", 0),
-                        end_line=item.get("end", {}).get("line", 0),
-                        code_snippet=item.get("extra", {}).get("lines", ""),
-                        scanner="Semgrep",
-                        metadata={**item.get("extra", {}).get("metadata", {}), "category": category}
-                    ))
-            except json.JSONDecodeError:
+            profile = SemgrepProfile(target_path)
+            # stdout goes to disk and through the parser as it arrives; only findings are kept
+            with RawSpill(self.name) as raw:
+                for batch in _batches(targets) if targets is not None else [[target_path]]:
+                    parser = JsonStreamParser(STREAMED_PATHS)
+                    profile.start_run()
+                    async with StreamedCommand([*base_cmd, *batch], spill=raw) as command:
+                        try:
+                            async for chunk in command.chunks():
+                                self._collect(parser.feed(chunk), vulns, profile)
+                            # Large values are only decoded once enough input follows, so the last result can come from close()
+                            self._collect(parser.close(), vulns, profile)
+                        except ValueError:
+                            await command.wait()
+                            raw.write(f"\n--- stderr (exit {command.returncode}) ---\n{command.stderr}")
+                            return ScannerOutput(
+                                scanner_name=self.name,
+                                vulnerabilities=[],
+                                raw_output_file=raw.handover(),
+                                error="Failed to parse JSON"
+                            )
+
                 return ScannerOutput(
                     scanner_name=self.name,
-                    vulnerabilities=[],
-                    raw_output=result.stdout,
-                    error="Failed to parse JSON"
+                    vulnerabilities=vulns,
+                    raw_output_file=raw.handover(),
+                    profile=profile.summary(jobs, len(targets) if targets is not None else None, skipped)
                 )
 
-            return ScannerOutput(
-                scanner_name=self.name,
-                vulnerabilities=vulns
-            )
-
         except Exception as e:
             return ScannerOutput(
                 scanner_name=self.name,
@@ -81,7 +327,7 @@ class SemgrepScanner(BaseScanner):
                 error=str(e)
             )
 
-    def scan_dynamic(self, target_url: str) -> ScannerOutput:
+    async def scan_dynamic_async(self, target_url: str) -> ScannerOutput:
         return ScannerOutput(
             scanner_name=self.name,
             vulnerabilities=[],
@@ -0,0 +1,81 @@
+import os
+import sys
+import shutil
+import threading
+import subprocess
+from typing import Dict, List, NamedTuple, Optional
+
+# Where `uv sync` installs the backend's Python tools (semgrep, mcp-scan), for when they aren't on PATH
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXTRA_BIN_DIRS = [os.path.dirname(sys.executable), os.path.join(BACKEND_DIR, ".venv", "bin")]
+
+
+class Tool(NamedTuple):
+    name: str
+    # Absolute path of the executable; None if it isn't installed
+    path: Optional[str]
+    version: Optional[str]
+
+    @property
+    def available(self) -> bool:
+        return self.path is not None
+
+
+# Resolved once per process: executables don't appear or change version under a running worker
+_tools: Dict[str, Tool] = {}
+# Guards _tools and _resolving; the --version probes run under the per-name locks only
+_lock = threading.Lock()
+# Per-name locks, so concurrent first uses of one tool probe it once and other tools aren't held up
+_resolving: Dict[str, threading.Lock] = {}
+
+
+def find_executable(name: str) -> Optional[str]:
+    found = shutil.which(name)
+    if found:
+        return os.path.abspath(found)
+    for directory in EXTRA_BIN_DIRS:
+        candidate = os.path.join(directory, name)
+        if os.path.isfile(candidate) and os.access(candidate, os.X_OK):
+            return candidate
+    return None
+
+
+def _version(path: str, version_args: List[str]) -> Optional[str]:
+    try:
+        result = subprocess.run([path, *version_args], capture_output=True, text=True, timeout=60)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    # Some tools print their version to stderr
+    lines = (result.stdout.strip() or result.stderr.strip()).splitlines()
+    return lines[0].strip() if lines else ""
+
+
+def resolve_tool(name: str, version_args: Optional[List[str]] = None) -> Tool:
+    """Path and version of executable `name`, looked up on first use and cached for the process."""
+    with _lock:
+        tool = _tools.get(name)
+        if tool is not None:
+            return tool
+        name_lock = _resolving.setdefault(name, threading.Lock())
+    with name_lock:
+        with _lock:
+            tool = _tools.get(name)
+        if tool is not None:
+            return tool
+        path = find_executable(name)
+        version = _version(path, version_args or ["--version"]) if path else None
+        tool = Tool(name, path, version)
+        with _lock:
+            _tools[name] = tool
+        if path:
+            print(f"Resolved {name}: {path} ({version or 'unknown version'})", flush=True)
+        else:
+            print(f"Tool {name} not found", flush=True)
+        return tool
+
+
+def resolved_tools() -> Dict[str, Tool]:
+    with _lock:
+        return dict(_tools)
@@ -0,0 +1,151 @@
+import os
+import json
+import signal
+import asyncio
+import itertools
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+# Upper bound on one response line (a scan result with all its findings)
+MAX_LINE_BYTES = 64 * 1024 * 1024
+
+
+class WorkerCrashed(Exception):
+    pass
+
+
+class NdjsonWorker:
+    """
+    One long-lived tool process speaking newline-delimited JSON on stdin/stdout:
+    one request line in, one response line out, one request at a time.
+    """
+
+    def __init__(self, cmd: List[str]):
+        self.cmd = cmd
+        self.proc: Optional[asyncio.subprocess.Process] = None
+        # Last lines the tool logged, for crash reports
+        self.stderr_tail: Deque[str] = deque(maxlen=50)
+        self._stderr_task: Optional[asyncio.Task] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.returncode is None
+
+    async def start(self):
+        self.proc = await asyncio.create_subprocess_exec(
+            *self.cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+            limit=MAX_LINE_BYTES,
+        )
+        self._stderr_task = asyncio.ensure_future(self._drain_stderr())
+
+    async def _drain_stderr(self):
+        try:
+            async for line in self.proc.stderr:
+                self.stderr_tail.append(line.decode("utf-8", errors="replace").rstrip())
+        except (ValueError, ConnectionError):
+            pass
+
+    def _crash_report(self) -> str:
+        return f"worker exited with {self.proc.returncode}: " + " | ".join(list(self.stderr_tail)[-5:])
+
+    async def request(self, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        try:
+            self.proc.stdin.write(json.dumps(payload).encode() + b"\n")
+            await self.proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            await self.proc.wait()
+            raise WorkerCrashed(self._crash_report())
+        line = await asyncio.wait_for(self.proc.stdout.readline(), timeout)
+        if not line:
+            await self.proc.wait()
+            raise WorkerCrashed(self._crash_report())
+        response = json.loads(line)
+        if not isinstance(response, dict) or response.get("id") != payload.get("id"):
+            raise WorkerCrashed(f"worker answered out of turn: {line[:200]!r}")
+        return response
+
+    def kill_nowait(self):
+        if self.alive:
+            try:
+                os.killpg(self.proc.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+        if self._stderr_task:
+            self._stderr_task.cancel()
+
+    async def kill(self):
+        self.kill_nowait()
+        if self.proc is not None and self.proc.returncode is None:
+            await self.proc.wait()
+
+
+class NdjsonWorkerPool:
+    """
+    Up to `size` NdjsonWorkers running `cmd`, shared by every scan of the
+    process so the tool's startup is paid once per worker rather than once
+    per request. Workers are started on demand and reused; one that crashes,
+    times out or is interrupted mid-request is killed and replaced by a fresh
+    process on the next request. Requests that crash a worker are retried
+    once on a new one.
+    """
+
+    def __init__(self, name: str, cmd: List[str], size: int = 2):
+        self.name = name
+        self.cmd = cmd
+        self.size = max(1, size)
+        self._idle: List[NdjsonWorker] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ids = itertools.count(1)
+        self.started = 0
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Pipes belong to the loop that created them; the blocking scan_* adapters run a loop per call
+            for worker in self._idle:
+                worker.kill_nowait()
+            self._idle = []
+            self._slots = asyncio.Semaphore(self.size)
+            self._loop = loop
+
+    async def _acquire(self) -> NdjsonWorker:
+        while self._idle:
+            worker = self._idle.pop()
+            if worker.alive:
+                return worker
+            print(f"{self.name} worker {worker.proc.pid} exited while idle ({worker.proc.returncode}); replacing it", flush=True)
+            await worker.kill()
+        worker = NdjsonWorker(self.cmd)
+        await worker.start()
+        self.started += 1
+        return worker
+
+    async def request(self, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        self._bind_loop()
+        async with self._slots:
+            for attempt in range(2):
+                worker = await self._acquire()
+                try:
+                    response = await worker.request({**payload, "id": next(self._ids)}, timeout)
+                except WorkerCrashed as e:
+                    await worker.kill()
+                    print(f"{self.name} worker crashed: {e}", flush=True)
+                    if attempt:
+                        raise
+                    continue
+                except BaseException:
+                    # Timed out or cancelled mid-request: its next stdout line would answer this request
+                    await worker.kill()
+                    raise
+                self._idle.append(worker)
+                return response
+
+    async def close(self):
+        workers, self._idle = self._idle, []
+        for worker in workers:
+            await worker.kill()
@@ -0,0 +1,422 @@
+import os
+import json
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import CancelledError
+from typing import Dict, Any, FrozenSet, List, NamedTuple, Optional, Set
+
+from scanners.base import BaseScanner, scan_scope
+from scanners.registry import ScannerRegistry
+from scanners.repo_index import RepoIndex
+from models.common import ScanResult
+from models.findings import Findings
+from services.consensus import build_consensus
+from services.findings_export import FindingsExporter
+from services.github_service import GitHubService
+from services.scan_store import ScanStore, FINAL_STATUSES
+from services.scanner_loop import ScannerLoop
+
+# Wall-clock budget for all scanners of one scan; each scanner is also capped by BaseScanner.timeout
+SCANNERS_TIMEOUT = float(os.getenv("SCAN_TIMEOUT", "600"))
+# Size bound of the scanner result cache (stored output plus raw output), least recently used evicted first
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_MB", "1024")) * 1024 * 1024
+# Incremental scans fall back to a full scan when more paths than this changed
+INCREMENTAL_MAX_CHANGED = int(os.getenv("INCREMENTAL_MAX_CHANGED", "500"))
+
+
+class ScanCancelled(Exception):
+    pass
+
+
+class IncrementalBase(NamedTuple):
+    """A previous completed scan of the same target, and what changed since."""
+    scan_id: str
+    changed: FrozenSet[str]
+    results: Dict[str, Any]
+    identities: Dict[str, Dict[str, str]]
+
+
+class BenchmarkRunner:
+    """
+    Runs one benchmark end to end (clone, scanners, evaluation) and records
+    every state change through the ScanStore. Used by the API process's
+    embedded workers and by standalone `python -m worker` processes alike.
+    """
+
+    def __init__(self, store: ScanStore, github_service: GitHubService, loop: Optional[ScannerLoop] = None,
+                 exporter: Optional[FindingsExporter] = None):
+        self.store = store
+        self.github_service = github_service
+        self.loop = loop or ScannerLoop()
+        # Parquet export of completed scans for analytics; None without pyarrow
+        self.exporter = exporter or FindingsExporter.from_env()
+        self._lock = threading.Lock()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._cancelled: Set[str] = set()
+        # Cancelled because this process no longer holds the job; another worker owns the scan's records now
+        self._abandoned: Set[str] = set()
+
+    def publish_document(self, result: Optional[Dict[str, Any]]) -> bool:
+        """Validate and serialize a finished scan once so get_scan can serve the stored bytes."""
+        # None: the scan was deleted while it ran
+        if result is None or result["status"] not in FINAL_STATUSES:
+            return False
+        body = ScanResult(**result).model_dump_json().encode()
+        return self.store.save_document(result["id"], body)
+
+    @staticmethod
+    def _sparse_patterns(scanners: List[BaseScanner]) -> Optional[List[str]]:
+        """Union of the scanners' file patterns, or None if any of them needs the full tree."""
+        patterns: List[str] = []
+        for scanner in scanners:
+            if scanner.file_patterns is None:
+                return None
+            patterns.extend(p for p in scanner.file_patterns if p not in patterns)
+        return patterns or None
+
+    def _incremental_base(self, scan_id: str, repo_url: str, branch: str, scan_type: str,
+                          commit: Optional[str]) -> Optional[IncrementalBase]:
+        """The latest completed scan of this repo/branch to scan incrementally against, or None for a full scan."""
+        if not commit:
+            return None
+        previous = self.store.find_base_scan(repo_url, branch, scan_type, exclude_id=scan_id)
+        if not previous:
+            return None
+        changed = self.github_service.changed_paths(repo_url, previous["commit_sha"], commit)
+        if changed is None or len(changed) > INCREMENTAL_MAX_CHANGED:
+            reason = "base commit unavailable" if changed is None else f"{len(changed)} paths changed"
+            print(f"Full scan instead of incremental against {previous['id']} ({reason})", flush=True)
+            return None
+        print(f"Incremental scan against {previous['id']} ({previous['commit_sha'][:12]}..{commit[:12]}, "
+              f"{len(changed)} paths changed)", flush=True)
+        return IncrementalBase(
+            previous["id"], frozenset(changed),
+            self.store.get_scanner_results(previous["id"]), self.store.get_scanner_identities(previous["id"])
+        )
+
+    def cancel(self, scan_id: str):
+        """Stop a scan running in this process: its scanners are cancelled and their process groups killed."""
+        with self._lock:
+            self._cancelled.add(scan_id)
+            task = self._tasks.get(scan_id)
+        if task:
+            self.loop.call_soon(task.cancel)
+
+    def _export(self, scan_id: str):
+        if self.exporter is None:
+            return
+        try:
+            self.exporter.export_scan(self.store, scan_id)
+        except Exception as e:
+            # The scan itself is stored; `python -m services.findings_export backfill` catches up
+            print(f"Findings export of {scan_id} failed: {e}", flush=True)
+
+    def abandon(self, scan_id: str):
+        """
+        Stop a scan whose job lease this process lost: like cancel(), but
+        nothing more is written for it, so the new lease holder's run isn't
+        overwritten.
+        """
+        with self._lock:
+            self._abandoned.add(scan_id)
+        self.cancel(scan_id)
+
+    def _is_abandoned(self, scan_id: str) -> bool:
+        with self._lock:
+            return scan_id in self._abandoned
+
+    def close(self):
+        """Stop the scanners' long-lived worker processes. Call once no scan is running any more."""
+        try:
+            self.loop.run(ScannerRegistry.close(), timeout=30)
+        except Exception as e:
+            print(f"Failed to close scanners: {e}", flush=True)
+
+    def _raise_if_cancelled(self, scan_id: str):
+        with self._lock:
+            if scan_id in self._cancelled:
+                raise ScanCancelled()
+
+    @staticmethod
+    def _cache_key(scanner: BaseScanner, scan_type: str, identity: Optional[str], tree: Optional[str]) -> Optional[str]:
+        """Result cache key: (scanner, mode, tool version + wrapper/rules hash, repo tree). None = don't cache."""
+        if not tree or identity is None:
+            return None
+        return hashlib.sha256(json.dumps([scanner.name, scan_type, identity, tree]).encode()).hexdigest()
+
+    @staticmethod
+    def _base_output(base: Optional[IncrementalBase], scanner: BaseScanner, scan_type: str,
+                     identity: Optional[str]) -> Optional[Dict[str, Any]]:
+        """The previous scan's output to build on, if this scanner can run incrementally against it."""
+        if base is None or not scanner.incremental or identity is None:
+            return None
+        if base.identities.get(scanner.name, {}).get(scan_type) != identity:
+            # Different tool version or rules: the old findings don't carry over
+            return None
+        output = base.results.get(scanner.name, {}).get(scan_type)
+        if not output or output.get("error") or output.get("kill_reason"):
+            return None
+        return output
+
+    @staticmethod
+    def _carry_forward(output: Dict[str, Any], base_output: Dict[str, Any], base: IncrementalBase):
+        """Add the base scan's findings for unchanged files to an output scanned with the changed files in scope."""
+        carried = Findings.coerce(base_output.get("vulnerabilities")).without_paths(base.changed)
+        # Keep pointing at the scan that actually produced the finding
+        carried.set_metadata("carried_forward_from", base.scan_id)
+        carried.extend(output["vulnerabilities"])
+        output["vulnerabilities"] = carried
+        output["base_scan_id"] = base.scan_id
+
+    async def _execute_scanner(self, scanner: BaseScanner, scan_type: str, target_path: str, deadline: float,
+                               tree: Optional[str] = None, force_rescan: bool = False,
+                               base: Optional[IncrementalBase] = None):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        identity = await scanner.cache_identity()
+        tool_version = await scanner.tool_version()
+        cache_key = self._cache_key(scanner, scan_type, identity, tree)
+        if cache_key and not force_rescan:
+            cached = await asyncio.to_thread(self.store.get_cached_result, cache_key)
+            if cached is not None:
+                cached["cache_hit"] = True
+                cached["tool_version"] = tool_version
+                cached["duration"] = round(loop.time() - started, 3)
+                print(f"  = {scanner.name}: cached result for this tree", flush=True)
+                return scanner.name, {scan_type: cached}, identity
+
+        base_output = self._base_output(base, scanner, scan_type, identity)
+        if base_output is not None:
+            # Seen by the scanner through scan_scope; this task has its own context
+            scan_scope.set(base.changed)
+            print(f"  > Starting {scanner.name} on {len(base.changed)} changed paths...", flush=True)
+        else:
+            print(f"  > Starting {scanner.name}...", flush=True)
+        budget = deadline - started
+        timeout = max(0.0, min(scanner.timeout, budget))
+        kill_reason = None
+        try:
+            if scan_type == "static":
+                res = await asyncio.wait_for(scanner.scan_static_async(target_path), timeout)
+            else:
+                res = await asyncio.wait_for(scanner.scan_dynamic_async(target_path), timeout)
+            if hasattr(res, "model_dump"):
+                # Findings go straight into columnar form; the rest of the output is small
+                output = res.model_dump(exclude={"vulnerabilities"})
+                output["vulnerabilities"] = Findings.from_vulnerabilities(res.vulnerabilities)
+            else:
+                output = res
+        except asyncio.TimeoutError:
+            kill_reason = "timeout" if scanner.timeout <= budget else "scan_timeout"
+            output = {"scanner_name": scanner.name, "vulnerabilities": [], "error": f"Timed out after {timeout:.0f}s"}
+        except asyncio.CancelledError:
+            # The scan is being cancelled; record this scanner as such and let _run_scanners re-raise
+            kill_reason = "cancelled"
+            output = {"scanner_name": scanner.name, "vulnerabilities": [], "error": "Cancelled"}
+        except Exception as e:
+            output = {"error": str(e)}
+
+        output["vulnerabilities"] = Findings.coerce(output.get("vulnerabilities"))
+        output["duration"] = round(loop.time() - started, 3)
+        output["tool_version"] = tool_version
+        if kill_reason:
+            output["kill_reason"] = kill_reason
+        print(f"  < Finished {scanner.name} in {output['duration']:.1f}s{f' ({kill_reason})' if kill_reason else ''}", flush=True)
+        s_result = {scan_type: output}
+        # Stored and cached outputs must not mention this scan's worktree
+        self._relativize_paths(s_result, target_path)
+        if kill_reason or output.get("error"):
+            return scanner.name, s_result, identity
+
+        if base_output is not None:
+            self._carry_forward(output, base_output, base)
+        if cache_key:
+            s_result[scan_type] = await asyncio.to_thread(
+                self.store.put_cached_result, cache_key, scanner.name, scan_type, output, RESULT_CACHE_MAX_BYTES
+            )
+        return scanner.name, s_result, identity
+
+    @staticmethod
+    def _relative_path(f_path: str, target_path: str) -> str:
+        if f_path.startswith(target_path):
+            # Make it relative, strip leading slash
+            return os.path.relpath(f_path, target_path)
+        elif f_path.startswith("/app/"): # Docker common path
+            # Try to make it relative to app root then target path
+            app_rel = os.path.relpath(f_path, "/app")
+            # If it's inside target_path relative to app...
+            inner_rel = os.path.relpath(target_path, "/app")
+            if app_rel.startswith(inner_rel):
+                return os.path.relpath(app_rel, inner_rel)
+        return f_path
+
+    @classmethod
+    def _relativize_paths(cls, s_result: Dict[str, Any], target_path: str):
+        for scan_mode in ["static", "dynamic"]:
+            if scan_mode in s_result and "vulnerabilities" in s_result[scan_mode]:
+                # Once per distinct path, not per finding
+                s_result[scan_mode]["vulnerabilities"].map_paths(lambda f_path: cls._relative_path(f_path, target_path))
+
+    @staticmethod
+    def _serializable(results: Dict[str, Any]) -> Dict[str, Any]:
+        """Scanner results with their findings as plain dicts (for JSON, e.g. the evaluator's prompt)."""
+        return {
+            name: {mode: {**output, "vulnerabilities": Findings.coerce(output.get("vulnerabilities")).to_dicts()}
+                   for mode, output in s_result.items()}
+            for name, s_result in results.items()
+        }
+
+    async def _save_result(self, scan_id: str, scanner_name: str, s_result: Dict[str, Any], identity: Optional[str],
+                           results: Dict[str, Any]):
+        results[scanner_name] = s_result
+        # Blob writes and the group commit wait happen off the loop
+        await asyncio.to_thread(self.store.save_scanner_result, scan_id, scanner_name, s_result, identity)
+
+    async def _run_scanners(self, scan_id: str, scanners: List[BaseScanner], scan_type: str, target_path: str,
+                            tree: Optional[str] = None, force_rescan: bool = False,
+                            base: Optional[IncrementalBase] = None) -> Dict[str, Any]:
+        with self._lock:
+            if scan_id in self._cancelled:
+                raise asyncio.CancelledError()
+            self._tasks[scan_id] = asyncio.current_task()
+
+        results = {}
+        deadline = asyncio.get_running_loop().time() + SCANNERS_TIMEOUT
+        tasks = [
+            asyncio.ensure_future(self._execute_scanner(s, scan_type, target_path, deadline, tree, force_rescan, base))
+            for s in scanners
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                scanner_name, s_result, identity = await next_done
+                await self._save_result(scan_id, scanner_name, s_result, identity, results)
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+            if self._is_abandoned(scan_id):
+                raise
+            for outcome in outcomes:
+                if isinstance(outcome, BaseException) or outcome[0] in results:
+                    continue
+                await self._save_result(scan_id, *outcome, results)
+            raise
+        finally:
+            with self._lock:
+                self._tasks.pop(scan_id, None)
+        return results
+
+    def run(self, scan_id: str, repo_url: str, branch: str, scan_type: str = "static", force_rescan: bool = False):
+        print(f"Starting benchmark {scan_id} for {repo_url} (type: {scan_type})", flush=True)
+
+        indexed_path = None
+        try:
+            if not self.store.update_scan(scan_id, status="running"):
+                # Cancelled (or deleted) while the job waited for this worker
+                raise ScanCancelled()
+
+            # Enabled, installed scanners capable of this scan type (long-lived instances)
+            scanners = ScannerRegistry.get_scanners(scan_type)
+
+            # 0. Clone Repo (static scans only need the files their scanners read)
+            patterns = self._sparse_patterns(scanners) if scan_type == "static" else None
+            checkout = self.github_service.checkout(repo_url, branch, scan_id, patterns)
+            target_path = checkout.path
+            print(f"Repository cloned to: {target_path}", flush=True)
+            if checkout.commit:
+                self.store.update_scan(scan_id, commit_sha=checkout.commit)
+            # Only static findings are tied to files; force_rescan means a full, uncached scan
+            base = None
+            if scan_type == "static" and not force_rescan:
+                base = self._incremental_base(scan_id, repo_url, branch, scan_type, checkout.commit)
+            self._raise_if_cancelled(scan_id)
+
+            # One walk of the tree, shared by every scanner (see BaseScanner.find_mcp_configs)
+            index = RepoIndex.share(target_path)
+            indexed_path = target_path
+            print(f"Indexed {index.file_count} files in {index.build_seconds:.2f}s ({index.pruned_dirs} dependency dirs skipped)", flush=True)
+            # Identity of the scanned content for the result cache; local paths have no git tree to go by
+            tree = checkout.tree or index.fingerprint()
+
+            # 1. Run Scanners concurrently on the shared event loop
+            print(f"Running {len(scanners)} scanners concurrently (scan_type={scan_type})...", flush=True)
+            results = self.loop.run(self._run_scanners(scan_id, scanners, scan_type, target_path, tree, force_rescan, base))
+            self._raise_if_cancelled(scan_id)
+            # MCP config detection ran (if at all) during the scanners
+            self.store.update_scan(scan_id, repo_index=index.stats())
+
+            # Overlap between the scanners, computed once for the evaluator, leaderboard and UI
+            consensus = build_consensus(results, scan_type)
+            self.store.save_consensus(scan_id, consensus)
+            print(f"Consensus: {consensus['summary']['clusters']} clusters from {consensus['summary']['findings']} findings, "
+                  f"{consensus['summary']['agreed']} reported by several scanners", flush=True)
+
+            # 2. Evaluate with Agent
+            deepseek_key = os.getenv("DEEPSEEK_API_KEY")
+            if deepseek_key:
+                from agent.evaluator import ScannerEvaluator, LeaderboardAgent
+                print(f"Evaluating {scan_type} results (results keys: {list(results.keys())})...", flush=True)
+                try:
+                    evaluator = ScannerEvaluator()
+                    # Categorized evaluation (returns CategoryEvaluation dict)
+                    comp_evaluation = evaluator.evaluate(self._serializable(results), scan_type=scan_type, consensus=consensus)
+                    print(f"Evaluation returned score: {comp_evaluation.get('scores')}", flush=True)
+
+                    # Holistic Leaderboard Update
+                    lb_agent = LeaderboardAgent()
+                    new_scores = comp_evaluation.get("scores", {})
+                    current_lb, lb_version = self.store.get_leaderboard_versioned()
+                    # Ensure it matches Leaderboard model structure
+                    if "total_scans" not in current_lb: current_lb["total_scans"] = 0
+
+                    updated_lb = lb_agent.update_leaderboard(current_lb, new_scores, scan_type,
+                                                             consensus=consensus["summary"]["by_scanner"])
+                    # Compare-and-set so a concurrent scan's update isn't overwritten. If one landed while the
+                    # agent ran, merge these scores onto it instead of asking the agent again.
+                    if not self.store.set_leaderboard(updated_lb, expected_version=lb_version):
+                        print("Leaderboard changed during the update; merging scores onto the latest version", flush=True)
+                        self.store.update_leaderboard(
+                            lambda lb: LeaderboardAgent.merge_scores({"total_scans": 0, **lb}, new_scores, scan_type)
+                        )
+                
+                    # Construct full EvaluationResult
+                    if scan_type == "static":
+                        evaluation = {"static": comp_evaluation, "dynamic": None}
+                    else:
+                        evaluation = {"static": None, "dynamic": comp_evaluation}
+
+                except Exception as e:
+                    print(f"Evaluation failed: {e}", flush=True)
+                    evaluation = {"error": f"Evaluation failed: {e}", "skipped": True}
+            else:
+                print("Skipping evaluation (DEEPSEEK_API_KEY not set)", flush=True)
+                evaluation = {"skipped": True, "reason": "No API key"}
+        
+            # 3. Update DB (scanner results were stored as each scanner finished)
+            self._raise_if_cancelled(scan_id)
+            if not self.store.update_scan(scan_id, status="completed", evaluation=evaluation):
+                print(f"Benchmark {scan_id} was cancelled while it ran; keeping the cancellation", flush=True)
+            self.publish_document(self.store.get_scan_result(scan_id))
+            self._export(scan_id)
+                
+        except (ScanCancelled, CancelledError):
+            if self._is_abandoned(scan_id):
+                print(f"Benchmark {scan_id} abandoned (lease lost)", flush=True)
+                return
+            print(f"Benchmark {scan_id} cancelled", flush=True)
+            self.store.update_scan(scan_id, status="cancelled", error="Cancelled by user")
+            self.publish_document(self.store.get_scan_result(scan_id))
+        except Exception as e:
+            print(f"Benchmark failed: {e}")
+            self.store.update_scan(scan_id, status="error", error=str(e))
+            self.publish_document(self.store.get_scan_result(scan_id))
+        finally:
+            with self._lock:
+                self._cancelled.discard(scan_id)
+                self._abandoned.discard(scan_id)
+            if indexed_path:
+                RepoIndex.unshare(indexed_path)
+            self.github_service.release_repo(scan_id)
+            
+        print(f"Benchmark {scan_id} finished.")
@@ -0,0 +1,117 @@
+import os
+import gzip
+import time
+import shutil
+import hashlib
+import tempfile
+from typing import Iterator, Optional, Union, Iterable
+
+
+class BlobStore:
+    """
+    Content-addressed, gzip-compressed storage for large text blobs such as
+    scanner raw output. A blob's ID is the SHA-256 of its uncompressed bytes,
+    so identical outputs (e.g. "No MCP configurations found") are stored once.
+    """
+
+    def __init__(self, root: str = "scan_blobs", compresslevel: int = 6):
+        self.root = root
+        self.compresslevel = compresslevel
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, blob_id: str) -> str:
+        if len(blob_id) != 64 or not all(c in "0123456789abcdef" for c in blob_id):
+            raise ValueError(f"Invalid blob id: {blob_id}")
+        return os.path.join(self.root, blob_id[:2], f"{blob_id}.gz")
+
+    def exists(self, blob_id: str) -> bool:
+        return os.path.exists(self._path(blob_id))
+
+    def put(self, data: Union[str, bytes]) -> str:
+        if isinstance(data, str):
+            data = data.encode("utf-8", errors="replace")
+        return self.put_chunks([data])
+
+    def put_file(self, path: str, chunk_size: int = 1024 * 1024) -> str:
+        """Store a file's contents without reading it into memory at once."""
+        def chunks():
+            with open(path, "rb") as f:
+                while chunk := f.read(chunk_size):
+                    yield chunk
+        return self.put_chunks(chunks())
+
+    def put_chunks(self, chunks: Iterable[bytes]) -> str:
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=self.compresslevel, mtime=0) as gz:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    gz.write(chunk)
+
+            blob_id = digest.hexdigest()
+            path = self._path(blob_id)
+            if os.path.exists(path):
+                # Already stored; refresh mtime so a concurrent GC sees it as in use
+                os.utime(path)
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+            return blob_id
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def size(self, blob_id: str) -> int:
+        """Uncompressed size, read from the gzip ISIZE trailer (blobs are far below 4 GiB)."""
+        with open(self._path(blob_id), "rb") as f:
+            f.seek(-4, os.SEEK_END)
+            return int.from_bytes(f.read(4), "little")
+
+    def get(self, blob_id: str) -> bytes:
+        with gzip.open(self._path(blob_id), "rb") as gz:
+            return gz.read()
+
+    def iter_range(self, blob_id: str, start: int = 0, end: Optional[int] = None, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """Yield uncompressed bytes [start, end] (inclusive) without materializing the blob."""
+        with gzip.open(self._path(blob_id), "rb") as gz:
+            if start:
+                gz.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = gz.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def list_ids(self) -> Iterator[str]:
+        for prefix in os.listdir(self.root):
+            prefix_dir = os.path.join(self.root, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for name in os.listdir(prefix_dir):
+                if name.endswith(".gz"):
+                    yield name[:-3]
+
+    def delete_if_stale(self, blob_id: str, grace_seconds: float = 60.0) -> bool:
+        """
+        Delete a blob the caller has found to be unreferenced. Blobs written or
+        re-put within the grace period are kept, since a scan may be about to
+        reference them.
+        """
+        path = self._path(blob_id)
+        try:
+            if time.time() - os.path.getmtime(path) < grace_seconds:
+                return False
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.makedirs(self.root, exist_ok=True)
@@ -0,0 +1,166 @@
+"""
+Cross-scanner consensus for one scan.
+
+Every finding is fingerprinted by (normalized file path, line window,
+category) and clustered with the other scanners' findings in a single
+hash-based pass: a finding joins a cluster of the same file and category
+whose first line is at most LINE_WINDOW lines away, looked up in its own
+and the two neighbouring windows. Each cluster records which scanners
+reported it and which of the scanners that ran missed it, so the
+evaluator, leaderboard and UI get the overlap precomputed instead of
+comparing findings pairwise.
+"""
+import hashlib
+import posixpath
+from typing import Any, Dict, List, Optional, Tuple
+
+from models.findings import Findings
+
+# Findings of one category in one file starting at most this many lines apart are the same issue
+LINE_WINDOW = 5
+# Scanners that must agree on a cluster for the others to have "missed" it
+CONSENSUS_MIN = 2
+SEVERITY_RANK = {"CRITICAL": 4, "HIGH": 3, "MEDIUM": 2, "LOW": 1, "INFO": 0}
+
+
+def normalize_path(file_path: str) -> str:
+    """Repo-relative POSIX form, so "./src/a.py" and "src\\a.py" fingerprint alike."""
+    if not file_path:
+        return ""
+    path = posixpath.normpath(file_path.replace("\\", "/"))
+    return "" if path == "." else path
+
+
+def category_key(category: str, rule_id: str) -> str:
+    # Uncategorized findings only match findings of the same rule
+    if category != "Uncategorized":
+        return category
+    return "rule:" + (rule_id or "").rsplit(".", 1)[-1]
+
+
+def fingerprint(file_path: str, category: str, start_line: int) -> str:
+    """Stable across scans for the same file, category and line window."""
+    window = start_line // LINE_WINDOW if start_line > 0 else ""
+    return hashlib.sha256(f"{file_path}\0{category}\0{window}".encode()).hexdigest()[:16]
+
+
+class _Cluster:
+    __slots__ = ("file_path", "category", "anchor", "start_line", "end_line", "severity", "finding_ids")
+
+    def __init__(self, file_path: str, category: str, start_line: int, end_line: int, severity: str):
+        self.file_path = file_path
+        self.category = category
+        # Line the cluster was opened at; later findings match against it, not against each other
+        self.anchor = start_line
+        self.start_line = start_line
+        self.end_line = end_line
+        self.severity = severity
+        # Scanner -> ids of its findings in this cluster
+        self.finding_ids: Dict[str, List[str]] = {}
+
+    def add(self, scanner: str, finding_id: str, start_line: int, end_line: int, severity: str):
+        self.finding_ids.setdefault(scanner, []).append(finding_id)
+        if start_line > 0:
+            self.start_line = min(self.start_line, start_line) if self.start_line > 0 else start_line
+        self.end_line = max(self.end_line, end_line)
+        if SEVERITY_RANK.get(severity, -1) > SEVERITY_RANK.get(self.severity, -1):
+            self.severity = severity
+
+
+def build_consensus(results: Dict[str, Any], scan_type: str) -> Dict[str, Any]:
+    """
+    Cluster the findings of `results` (scanner -> {mode: output}) for
+    `scan_type`. Scanners whose output has an error are listed as skipped
+    and count neither as agreeing nor as missing anything.
+    """
+    roster: List[str] = []
+    skipped: List[str] = []
+    clusters: List[_Cluster] = []
+    # (path, category, window) -> indexes into clusters opened in that window; window None for findings without lines
+    index: Dict[Tuple[str, str, Optional[int]], List[int]] = {}
+    paths: Dict[str, str] = {}
+    total = 0
+
+    for scanner in sorted(results):
+        output = results[scanner].get(scan_type)
+        if not output:
+            continue
+        if output.get("error"):
+            skipped.append(scanner)
+            continue
+        roster.append(scanner)
+        findings = Findings.coerce(output.get("vulnerabilities"))
+        total += len(findings)
+        for i, category in enumerate(findings.categories()):
+            raw_path = findings.file_path(i)
+            path = paths.get(raw_path)
+            if path is None:
+                path = paths[raw_path] = normalize_path(raw_path)
+            key = category_key(category, findings.rule_id(i))
+            start, end = findings.lines(i)
+            window = start // LINE_WINDOW if start > 0 else None
+
+            match = None
+            neighbours = (window,) if window is None else (window, window - 1, window + 1)
+            for w in neighbours:
+                for c in index.get((path, key, w), ()):
+                    if window is None or abs(clusters[c].anchor - start) <= LINE_WINDOW:
+                        match = c
+                        break
+                if match is not None:
+                    break
+            if match is None:
+                match = len(clusters)
+                clusters.append(_Cluster(path, key, start, end, findings.severity(i)))
+                index.setdefault((path, key, window), []).append(match)
+            clusters[match].add(scanner, findings.id(i), start, end, findings.severity(i))
+
+    by_scanner = {
+        scanner: {"findings": 0, "clusters": 0, "agreed": 0, "unique": 0, "missed": 0} for scanner in roster
+    }
+    out = []
+    for cluster in clusters:
+        found_by = sorted(cluster.finding_ids)
+        for scanner, ids in cluster.finding_ids.items():
+            stats = by_scanner[scanner]
+            stats["findings"] += len(ids)
+            stats["clusters"] += 1
+            stats["agreed" if len(found_by) > 1 else "unique"] += 1
+        missed_by = [s for s in roster if s not in cluster.finding_ids]
+        if len(found_by) >= CONSENSUS_MIN:
+            for scanner in missed_by:
+                by_scanner[scanner]["missed"] += 1
+        out.append({
+            "fingerprint": fingerprint(cluster.file_path, cluster.category, cluster.anchor),
+            "file_path": cluster.file_path,
+            "start_line": cluster.start_line,
+            "end_line": cluster.end_line,
+            "category": cluster.category,
+            "severity": cluster.severity,
+            "scanners": found_by,
+            "missed_by": missed_by,
+            "finding_ids": cluster.finding_ids,
+        })
+    # Broadest agreement first
+    out.sort(key=lambda c: (-len(c["scanners"]), -SEVERITY_RANK.get(c["severity"], -1), c["file_path"], c["start_line"]))
+
+    return {
+        "line_window": LINE_WINDOW,
+        "scanners": roster,
+        "skipped": skipped,
+        "summary": {
+            "findings": total,
+            "clusters": len(out),
+            "agreed": sum(1 for c in out if len(c["scanners"]) >= CONSENSUS_MIN),
+            "by_scanner": by_scanner,
+        },
+        "clusters": out,
+    }
+
+
+def overview(consensus: Dict[str, Any]) -> Dict[str, Any]:
+    """The consensus without finding ids, for prompts where the ids are noise."""
+    return {
+        **consensus,
+        "clusters": [{k: v for k, v in c.items() if k != "finding_ids"} for c in consensus.get("clusters", [])],
+    }
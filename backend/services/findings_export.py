@@ -0,0 +1,295 @@
+"""
+Columnar export of completed scans' findings for cross-scan analytics.
+
+Findings are written as Parquet under a hive-partitioned tree,
+
+    <root>/scan_type=<static|dynamic>/date=<YYYY-MM-DD>/<scan_id>.parquet
+
+one file per scan, appended as each scan completes. Scanner, rule,
+severity, category and the other low-cardinality columns are dictionary
+encoded. `python -m services.findings_export compact` merges each
+partition's per-scan files into one, and `query_findings` runs grouped
+counts over the whole tree with partition pruning and Arrow's vectorized
+group-by.
+
+Requires pyarrow (optional: without it the export is disabled and queries
+raise ExportUnavailable).
+"""
+import os
+import sys
+import json
+import glob
+import argparse
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: without it findings are only in the store
+    pa = None
+
+EXPORT_DIR = os.getenv("FINDINGS_EXPORT_DIR", "findings_export")
+# Per-scan files in one partition before `compact` merges them
+COMPACT_MIN_FILES = 16
+COMPACTED_FILE = "compacted.parquet"
+
+# Exported columns (besides the scan_type and date partition keys); dictionary encoded unless listed in PLAIN_COLUMNS
+SCAN_COLUMNS = ["scan_id", "target", "branch", "commit_sha"]
+FINDING_COLUMNS = ["scanner", "mode", "rule_id", "severity", "category", "file_path", "message",
+                   "start_line", "end_line", "carried_forward"]
+PLAIN_COLUMNS = {"file_path", "message", "start_line", "end_line", "carried_forward"}
+# Columns query_findings can filter and group on
+QUERY_COLUMNS = ["scan_type", "date", *SCAN_COLUMNS, *FINDING_COLUMNS]
+
+
+class ExportUnavailable(RuntimeError):
+    pass
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def _require():
+    if pa is None:
+        raise ExportUnavailable("pyarrow is not installed")
+
+
+def _schema() -> "pa.Schema":
+    def field(name: str) -> "pa.Field":
+        if name in ("start_line", "end_line"):
+            return pa.field(name, pa.int32())
+        if name == "carried_forward":
+            return pa.field(name, pa.bool_())
+        if name in PLAIN_COLUMNS:
+            return pa.field(name, pa.string())
+        return pa.field(name, pa.dictionary(pa.int32(), pa.string()))
+    return pa.schema([field(name) for name in SCAN_COLUMNS + FINDING_COLUMNS])
+
+
+def _partitioning() -> "ds.Partitioning":
+    # Explicit, so dates stay strings and compare lexicographically
+    return ds.partitioning(pa.schema([("scan_type", pa.string()), ("date", pa.string())]), flavor="hive")
+
+
+class FindingsExporter:
+    """Writes, removes and compacts the per-scan Parquet files under `root`."""
+
+    def __init__(self, root: str = EXPORT_DIR):
+        _require()
+        self.root = root
+
+    @classmethod
+    def from_env(cls) -> Optional["FindingsExporter"]:
+        """The exporter for FINDINGS_EXPORT_DIR, or None if pyarrow is missing or the directory is set empty."""
+        if pa is None or not EXPORT_DIR:
+            return None
+        return cls(EXPORT_DIR)
+
+    def _partition_dir(self, scan_type: str, timestamp: str) -> str:
+        return os.path.join(self.root, f"scan_type={scan_type}", f"date={timestamp[:10]}")
+
+    def _table(self, scan: Dict[str, Any], columns: Dict[str, List[Any]]) -> "pa.Table":
+        rows = len(columns["scanner"])
+        schema = _schema()
+        arrays = []
+        for field in schema:
+            if field.name in columns:
+                values = columns[field.name]
+            else:
+                # Store rows keep the scan's own id under "id"
+                values = [scan["id"] if field.name == "scan_id" else scan.get(field.name)] * rows
+            if pa.types.is_dictionary(field.type):
+                arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+            else:
+                arrays.append(pa.array(values, type=field.type))
+        return pa.Table.from_arrays(arrays, schema=schema)
+
+    @staticmethod
+    def _write(table: "pa.Table", path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Dot-prefixed, so dataset discovery skips files still being written
+        tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{os.getpid()}.tmp")
+        try:
+            pq.write_table(table, tmp_path, compression="zstd")
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def export_scan(self, store, scan_id: str) -> int:
+        """Write (or rewrite) one completed scan's findings. Returns the number of rows."""
+        scan = store.get_scan(scan_id)
+        if not scan or scan["status"] != "completed":
+            return 0
+        table = self._table(scan, store.get_findings_columns(scan_id))
+        self._write(table, os.path.join(self._partition_dir(scan["scan_type"], scan["timestamp"]), f"{scan_id}.parquet"))
+        return table.num_rows
+
+    def _exported_ids(self, partition: str) -> set:
+        ids = {os.path.basename(p)[:-len(".parquet")] for p in glob.glob(os.path.join(partition, "*.parquet"))}
+        ids.discard(COMPACTED_FILE[:-len(".parquet")])
+        compacted = os.path.join(partition, COMPACTED_FILE)
+        if os.path.exists(compacted):
+            ids.update(pq.read_table(compacted, columns=["scan_id"], partitioning=None).column("scan_id").unique().to_pylist())
+        return ids
+
+    def backfill(self, store) -> int:
+        """Export completed scans that aren't in the tree yet (e.g. from before the export existed)."""
+        exported: Dict[str, set] = {}
+        count = 0
+        cursor = None
+        while True:
+            scans, cursor = store.list_scans(limit=500, status="completed", cursor=cursor)
+            for scan in scans:
+                partition = self._partition_dir(scan["scan_type"], scan["timestamp"])
+                if partition not in exported:
+                    exported[partition] = self._exported_ids(partition)
+                if scan["id"] not in exported[partition]:
+                    self.export_scan(store, scan["id"])
+                    count += 1
+            if not cursor:
+                return count
+
+    def remove_scan(self, scan_id: str, scan_type: str, timestamp: str):
+        """Drop a deleted scan's rows."""
+        partition = self._partition_dir(scan_type, timestamp)
+        path = os.path.join(partition, f"{scan_id}.parquet")
+        if os.path.exists(path):
+            os.remove(path)
+        compacted = os.path.join(partition, COMPACTED_FILE)
+        if os.path.exists(compacted):
+            table = pq.read_table(compacted, partitioning=None)
+            mask = pc.not_equal(pc.cast(table.column("scan_id"), pa.string()), scan_id)
+            if not pc.all(mask).as_py():
+                self._write(table.filter(mask), compacted)
+
+    def compact(self, min_files: int = COMPACT_MIN_FILES) -> int:
+        """
+        Merge the per-scan files of each partition holding at least `min_files`
+        into its compacted file. Run from one process at a time (e.g. cron):
+        exports keep writing per-scan files meanwhile. Returns files merged.
+        """
+        merged = 0
+        for partition in glob.glob(os.path.join(self.root, "scan_type=*", "date=*")):
+            files = [p for p in glob.glob(os.path.join(partition, "*.parquet"))
+                     if os.path.basename(p) != COMPACTED_FILE]
+            if len(files) < min_files:
+                continue
+            compacted = os.path.join(partition, COMPACTED_FILE)
+            parts = [pq.read_table(p, partitioning=None) for p in ([compacted] if os.path.exists(compacted) else []) + files]
+            # Dictionaries differ per file; unify them so the merged file has one per column chunk
+            self._write(pa.concat_tables(parts).unify_dictionaries().combine_chunks(), compacted)
+            for path in files:
+                os.remove(path)
+            merged += len(files)
+        return merged
+
+    def clear(self):
+        """Remove the whole export (all scans were deleted)."""
+        for path in glob.glob(os.path.join(self.root, "scan_type=*", "date=*", "*.parquet")):
+            os.remove(path)
+
+
+def _filter_expression(filters: Dict[str, Any], since: Optional[str], until: Optional[str]):
+    expression = None
+
+    def combine(term):
+        nonlocal expression
+        expression = term if expression is None else expression & term
+
+    for column, value in filters.items():
+        if value is None:
+            continue
+        if column not in QUERY_COLUMNS:
+            raise ValueError(f"Unknown column: {column}")
+        if isinstance(value, (list, tuple, set)):
+            combine(ds.field(column).isin(list(value)))
+        else:
+            combine(ds.field(column) == value)
+    # Dates are partition keys: whole partitions outside the range are never opened
+    if since:
+        combine(ds.field("date") >= since[:10])
+    if until:
+        combine(ds.field("date") < until[:10])
+    return expression
+
+
+def query_findings(group_by: Sequence[str] = (), since: Optional[str] = None, until: Optional[str] = None,
+                   root: str = EXPORT_DIR, **filters: Any) -> List[Dict[str, Any]]:
+    """
+    Finding and scan counts over the exported history, grouped by `group_by`
+    columns and filtered by column=value (or column=[values]) keyword
+    arguments and a [since, until) date range. E.g. HIGH findings per
+    scanner since September across the golden repos:
+
+        query_findings(["scanner"], since="2026-09-01", severity="HIGH", target=golden_repo_urls)
+    """
+    _require()
+    for column in group_by:
+        if column not in QUERY_COLUMNS:
+            raise ValueError(f"Unknown column: {column}")
+    if not glob.glob(os.path.join(root, "scan_type=*", "date=*", "*.parquet")):
+        return [{**{column: None for column in group_by}, "findings": 0, "scans": 0}] if not group_by else []
+
+    dataset = ds.dataset(root, format="parquet", partitioning=_partitioning())
+    columns = sorted({"scan_id", *group_by})
+    table = dataset.to_table(columns=columns, filter=_filter_expression(filters, since, until))
+    # Group on plain strings: dictionaries differ between files
+    for column in group_by:
+        if pa.types.is_dictionary(table.schema.field(column).type):
+            table = table.set_column(table.schema.get_field_index(column), column,
+                                     pc.cast(table.column(column), pa.string()))
+    scan_ids = pc.cast(table.column("scan_id"), pa.string())
+
+    if not group_by:
+        return [{"findings": table.num_rows, "scans": len(pc.unique(scan_ids))}]
+    table = table.set_column(table.schema.get_field_index("scan_id"), "scan_id", scan_ids)
+    grouped = table.group_by(list(group_by)).aggregate([("scan_id", "count"), ("scan_id", "count_distinct")])
+    rows = grouped.rename_columns([
+        "findings" if name == "scan_id_count" else "scans" if name == "scan_id_count_distinct" else name
+        for name in grouped.column_names
+    ]).to_pylist()
+    return sorted(rows, key=lambda row: row["findings"], reverse=True)
+
+
+def main(argv: Optional[Iterable[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m services.findings_export", description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("backfill", help="export completed scans missing from the tree")
+    compact = commands.add_parser("compact", help="merge each partition's per-scan files")
+    compact.add_argument("--min-files", type=int, default=COMPACT_MIN_FILES)
+    query = commands.add_parser("query", help="grouped finding counts, as JSON")
+    query.add_argument("--group-by", default="", help="comma-separated columns")
+    query.add_argument("--since")
+    query.add_argument("--until")
+    query.add_argument("--where", action="append", default=[], metavar="COLUMN=VALUE[,VALUE...]")
+    args = parser.parse_args(argv)
+
+    if args.command == "query":
+        filters = {}
+        for condition in args.where:
+            column, _, value = condition.partition("=")
+            filters[column] = value.split(",") if "," in value else value
+        group_by = [c for c in args.group_by.split(",") if c]
+        json.dump(query_findings(group_by, since=args.since, until=args.until, **filters), sys.stdout, indent=2)
+        print()
+        return
+
+    exporter = FindingsExporter()
+    if args.command == "compact":
+        print(f"Merged {exporter.compact(args.min_files)} files", flush=True)
+    else:
+        from services.scan_store import ScanStore
+        store = ScanStore(os.getenv("SCAN_STORE_DB", "scan_store.db"))
+        try:
+            print(f"Exported {exporter.backfill(store)} scans", flush=True)
+        finally:
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,63 +1,62 @@
 import os
-import shutil
-import httpx
-import zipfile
-import io
+import subprocess
+from typing import List, Optional
+
+from services.repo_cache import RepoCache, RepoCheckout
 
 class GitHubService:
-    def __init__(self, temp_dir: str = "temp_scans"):
+    def __init__(self, temp_dir: str = "temp_scans", cache: Optional[RepoCache] = None):
         self.temp_dir = temp_dir
-        if not os.path.exists(self.temp_dir):
-            os.makedirs(self.temp_dir)
+        self.cache = cache or RepoCache(
+            root=os.getenv("REPO_CACHE_DIR", "repo_cache"),
+            worktree_dir=temp_dir,
+            quota_bytes=int(os.getenv("REPO_CACHE_QUOTA_MB", "5120")) * 1024 * 1024,
+        )
 
-    def clone_repo(self, url: str, branch: str, scan_id: str) -> str:
+    def checkout(self, url: str, branch: str, scan_id: str, patterns: Optional[List[str]] = None) -> RepoCheckout:
         """
-        Downloads a GitHub repository as a ZIP archive and extracts it.
-        Or handles local:// paths for direct directory access.
-        Returns the absolute path to the directory.
+        Makes the repository available for a scan.
+        local:// paths are used in place; anything git can fetch (https, file://)
+        is checked out from the shared repo cache into a private worktree,
+        limited to `patterns` when given (None = full checkout).
         """
         if url.startswith("local://"):
             local_path = url.replace("local://", "")
             if not os.path.exists(local_path):
                 raise Exception(f"Local path does not exist: {local_path}")
-            return os.path.abspath(local_path)
+            return RepoCheckout(os.path.abspath(local_path), url, None)
 
-        target_dir = os.path.join(self.temp_dir, scan_id)
-        
-        # Clean up if exists
-        if os.path.exists(target_dir):
-            shutil.rmtree(target_dir)
-
-        print(f"Cloning {url} to {target_dir}...", flush=True)
-        
         try:
-            import subprocess
-            # Ensure url ends with .git for consistency, though not strictly required
-            if not url.endswith(".git"):
-                clone_url = f"{url}.git"
-            else:
-                clone_url = url
-            
-            # Try specified branch first
-            try:
-                subprocess.run(
-                    ["git", "clone", "--depth", "1", "--branch", branch, clone_url, target_dir],
-                    check=True, capture_output=True, text=True
-                )
-            except subprocess.CalledProcessError:
-                # Fallback to default branch if 'main' was requested but failed
-                if branch == "main":
-                    print(f"Clone with branch 'main' failed. Retrying with default branch...", flush=True)
-                    subprocess.run(
-                        ["git", "clone", "--depth", "1", clone_url, target_dir],
-                        check=True, capture_output=True, text=True
-                    )
-                else:
-                    raise
-
-            return os.path.abspath(target_dir)
-
+            return self.cache.checkout(self._clone_url(url), branch, scan_id, patterns)
         except subprocess.CalledProcessError as e:
             raise Exception(f"Failed to clone repository: {e.stderr}")
         except Exception as e:
             raise Exception(f"Failed to clone repository: {str(e)}")
+
+    @staticmethod
+    def _clone_url(url: str) -> str:
+        # Ensure url ends with .git for consistency, though not strictly required
+        if url.startswith(("http://", "https://")) and not url.endswith(".git"):
+            return f"{url}.git"
+        return url
+
+    def changed_paths(self, url: str, base: str, commit: str) -> Optional[List[str]]:
+        """Paths changed between two scanned commits of `url`, or None if that can't be told (e.g. local:// paths)."""
+        if url.startswith("local://"):
+            return None
+        try:
+            return self.cache.changed_paths(self._clone_url(url), base, commit)
+        except subprocess.CalledProcessError as e:
+            print(f"Failed to diff {base[:12]}..{commit[:12]} of {url}: {e.stderr}", flush=True)
+            return None
+
+    def clone_repo(self, url: str, branch: str, scan_id: str) -> str:
+        """Returns the absolute path to the scan's copy of the repository."""
+        return self.checkout(url, branch, scan_id).path
+
+    def release_repo(self, scan_id: str):
+        """Drops the scan's worktree once scanning is done (local:// paths are left alone)."""
+        try:
+            self.cache.release(scan_id)
+        except Exception as e:
+            print(f"Failed to release checkout for {scan_id}: {e}", flush=True)
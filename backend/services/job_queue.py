@@ -0,0 +1,192 @@
+import os
+import socket
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+from services.scan_store import ScanStore
+
+JobHandler = Callable[[str, str, str, str, bool], None]
+CancelHandler = Callable[[str], None]
+
+logger = logging.getLogger(__name__)
+
+
+def scan_type_limits_from_env() -> Dict[str, int]:
+    """Per scan-type concurrency caps, e.g. MAX_CONCURRENT_DYNAMIC_SCANS=1 (0 or unset = no cap)."""
+    limits = {}
+    for scan_type in ("static", "dynamic"):
+        value = os.getenv(f"MAX_CONCURRENT_{scan_type.upper()}_SCANS")
+        if value:
+            limits[scan_type] = int(value)
+    return limits
+
+
+def scan_types_from_env() -> Optional[List[str]]:
+    """Scan types this process takes jobs for, e.g. WORKER_SCAN_TYPES=static (unset = all)."""
+    value = os.getenv("WORKER_SCAN_TYPES")
+    if not value:
+        return None
+    return [t.strip() for t in value.split(",") if t.strip()]
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    """
+    Bounded pool of benchmark workers fed from the durable `jobs` table.
+
+    Jobs are claimed highest priority first, oldest first, subject to the
+    per scan-type caps, so at most `workers` scans run at once in this
+    process no matter how many are submitted. Any number of processes (the
+    API server and `python -m worker` instances, on one node or several
+    sharing the database) can run a JobQueue against the same store: each
+    claim is a lease kept alive by a heartbeat thread, and jobs whose worker
+    stops heartbeating are re-claimed by someone else once the lease lapses.
+    The heartbeat also picks up cancel requests for this worker's jobs and
+    passes them to `on_cancel`; jobs whose lease was lost (taken over after
+    a missed heartbeat, or released by stop()) go to `on_lease_lost`. With `scan_types` only jobs of those types
+    are claimed (e.g. static-only workers that never load the dynamic
+    scanners).
+    """
+
+    def __init__(self, store: ScanStore, handler: JobHandler, workers: int = 2,
+                 type_limits: Optional[Dict[str, int]] = None, poll_interval: float = 2.0,
+                 lease_seconds: float = 60.0, worker_id: Optional[str] = None,
+                 on_cancel: Optional[CancelHandler] = None, scan_types: Optional[List[str]] = None,
+                 on_lease_lost: Optional[CancelHandler] = None):
+        self.store = store
+        self.handler = handler
+        self.on_cancel = on_cancel
+        self.on_lease_lost = on_lease_lost
+        self.workers = max(0, workers)
+        self.type_limits = type_limits or {}
+        self.scan_types = scan_types
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.worker_id = worker_id or default_worker_id()
+        self._wakeup = threading.Condition()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._in_flight: Set[str] = set()
+        self._cancelling: Set[str] = set()
+        self._in_flight_lock = threading.Lock()
+
+    def start(self):
+        orphaned = self.store.enqueue_orphaned_scans()
+        if orphaned:
+            print(f"Enqueued {orphaned} scans that had no benchmark job", flush=True)
+        if not self.workers:
+            print("No embedded benchmark workers; scans run in standalone worker processes", flush=True)
+            return
+
+        self._stopping.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"benchmark-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        heartbeat = threading.Thread(target=self._heartbeat, name="benchmark-heartbeat", daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+        print(f"Started {self.workers} benchmark workers as {self.worker_id} (limits: {self.type_limits or 'none'}, "
+              f"scan types: {', '.join(self.scan_types) if self.scan_types is not None else 'all'})", flush=True)
+
+    def stop(self, wait: Optional[float] = None):
+        """
+        Stop claiming new jobs and wait up to `wait` seconds for running ones.
+        Jobs still running after that are released back to the queue so
+        another worker picks them up without waiting for the lease to expire.
+        """
+        self._stopping.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        if wait:
+            # One deadline for all threads, not `wait` each
+            deadline = time.monotonic() + wait
+            for thread in self._threads:
+                thread.join(max(0.0, deadline - time.monotonic()))
+        if self.in_flight():
+            released = self.store.release_jobs(self.worker_id)
+            print(f"Released {released} unfinished benchmark jobs held by {self.worker_id}", flush=True)
+            # Another worker may claim them right away; stop the local runs from writing over it
+            for scan_id in self.in_flight():
+                self.cancel(scan_id, lease_lost=True)
+
+    def in_flight(self) -> List[str]:
+        with self._in_flight_lock:
+            return list(self._in_flight)
+
+    def submit(self, scan_id: str, repo_url: str, branch: str, scan_type: str, priority: int = 0,
+               force_rescan: bool = False):
+        self.store.enqueue_job(scan_id, repo_url, branch, scan_type, priority, force_rescan)
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def cancel(self, scan_id: str, lease_lost: bool = False) -> bool:
+        """
+        Cancel a job if it is running in this process. Returns False if it isn't.
+        With `lease_lost` the job is no longer ours and goes to on_lease_lost
+        (falling back to on_cancel) instead.
+        """
+        with self._in_flight_lock:
+            if scan_id not in self._in_flight or (scan_id in self._cancelling and not lease_lost):
+                return scan_id in self._cancelling
+            self._cancelling.add(scan_id)
+        print(f"Cancelling benchmark job {scan_id}", flush=True)
+        handler = (self.on_lease_lost or self.on_cancel) if lease_lost else self.on_cancel
+        if handler:
+            handler(scan_id)
+        return True
+
+    def _heartbeat(self):
+        # Cancel requests are polled every tick; leases only need renewing every third of their lifetime
+        tick = min(self.poll_interval, self.lease_seconds / 3)
+        last_renewal = time.monotonic()
+        while not self._stopping.wait(tick):
+            try:
+                for scan_id in self.store.cancel_requests(self.in_flight()):
+                    self.cancel(scan_id)
+                if time.monotonic() - last_renewal < self.lease_seconds / 3:
+                    continue
+                last_renewal = time.monotonic()
+                lost = self.store.renew_leases(self.worker_id, self.in_flight(), self.lease_seconds)
+            except Exception as e:
+                logger.warning("Lease heartbeat failed: %s", e)
+                continue
+            for scan_id in lost:
+                logger.warning("Lost lease on job %s; another worker may be running it", scan_id)
+                self.cancel(scan_id, lease_lost=True)
+
+    def _work(self):
+        while not self._stopping.is_set():
+            try:
+                job = self.store.claim_job(self.worker_id, self.lease_seconds, self.type_limits,
+                                           scan_types=self.scan_types)
+            except Exception as e:
+                print(f"Failed to claim benchmark job: {e}", flush=True)
+                job = None
+
+            if not job:
+                # Woken early by submit(); the timeout picks up jobs from other processes and freed slots
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+                continue
+
+            scan_id = job["scan_id"]
+            with self._in_flight_lock:
+                self._in_flight.add(scan_id)
+            try:
+                self.handler(scan_id, job["repo_url"], job["branch"], job["scan_type"], bool(job.get("force_rescan")))
+            except Exception as e:
+                print(f"Benchmark job {scan_id} crashed: {e}", flush=True)
+            finally:
+                with self._in_flight_lock:
+                    self._in_flight.discard(scan_id)
+                    self._cancelling.discard(scan_id)
+                self.store.finish_job(scan_id, self.worker_id)
+                # A finished job may unblock a capped scan type for another worker
+                with self._wakeup:
+                    self._wakeup.notify_all()
@@ -0,0 +1,226 @@
+import os
+import time
+import fcntl
+import shutil
+import hashlib
+import threading
+import subprocess
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+class RepoCheckout(NamedTuple):
+    path: str
+    url: str
+    commit: Optional[str]
+    # Git tree SHA of the commit: identifies the content independent of history
+    tree: Optional[str] = None
+
+
+class RepoCache:
+    """
+    Shared git object store for scanned repositories.
+
+    Each repository URL gets one bare mirror under `root/mirrors`; a scan
+    gets a throwaway `git worktree` of the resolved commit in
+    `worktree_dir/<scan_id>`, so repeat scans (static and dynamic runs of the
+    same golden repo, re-scans of a branch) only fetch what changed and never
+    copy objects. Concurrent requests for the same (URL, branch) are folded
+    into one fetch: within a process by sharing the in-flight fetch, across
+    worker processes by a per-mirror file lock plus `fetch_ttl`. Mirrors are
+    evicted least recently used first once they exceed `quota_bytes`.
+
+    Mirrors are partial clones (`--filter=blob:none`): file contents are only
+    downloaded when a worktree checks them out, and a worktree can be sparse,
+    limited to the file patterns the scan's scanners declared.
+    """
+
+    def __init__(self, root: str = "repo_cache", worktree_dir: str = "temp_scans",
+                 quota_bytes: int = 5 * 1024 ** 3, fetch_ttl: float = 60.0):
+        self.root = root
+        self.mirror_dir = os.path.join(root, "mirrors")
+        self.worktree_dir = worktree_dir
+        self.quota_bytes = quota_bytes
+        self.fetch_ttl = fetch_ttl
+        self._lock = threading.Lock()
+        self._inflight: Dict[Tuple[str, str], Future] = {}
+        os.makedirs(self.mirror_dir, exist_ok=True)
+        os.makedirs(self.worktree_dir, exist_ok=True)
+
+    def _git(self, *args: str) -> str:
+        result = subprocess.run(["git", *args], check=True, capture_output=True, text=True)
+        return result.stdout.strip()
+
+    def mirror_path(self, url: str) -> str:
+        return os.path.abspath(os.path.join(self.mirror_dir, hashlib.sha256(url.encode()).hexdigest()[:24] + ".git"))
+
+    @contextmanager
+    def _mirror_lock(self, mirror: str):
+        # Serializes fetches, worktree bookkeeping and eviction of one mirror across worker processes
+        with open(mirror + ".lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # --- Fetching ---
+
+    def resolve(self, url: str, branch: str) -> Tuple[str, str]:
+        """Bring `branch` of `url` into its mirror and return (mirror path, commit SHA)."""
+        key = (url, branch)
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+        if not owner:
+            return future.result()
+
+        try:
+            resolved = self._fetch(url, branch)
+            future.set_result(resolved)
+            return resolved
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _fetch(self, url: str, branch: str) -> Tuple[str, str]:
+        mirror = self.mirror_path(url)
+        with self._mirror_lock(mirror):
+            if not os.path.exists(os.path.join(mirror, "HEAD")):
+                print(f"Creating mirror for {url}...", flush=True)
+                self._git("init", "--bare", "--quiet", mirror)
+                self._git("-C", mirror, "remote", "add", "origin", url)
+
+            stamp = os.path.join(mirror, "fetch-stamps", hashlib.sha1(branch.encode()).hexdigest())
+            if os.path.exists(stamp) and time.time() - os.path.getmtime(stamp) < self.fetch_ttl:
+                # Another worker fetched this branch moments ago
+                with open(stamp) as f:
+                    ref = f.read().strip()
+                return mirror, self._git("-C", mirror, "rev-parse", f"{ref}^{{commit}}")
+
+            ref = f"refs/heads/{branch}"
+            print(f"Fetching {url} ({branch})...", flush=True)
+            try:
+                self._git("-C", mirror, "fetch", "--quiet", "--depth", "1", "--filter=blob:none", "origin", f"+{ref}:{ref}")
+            except subprocess.CalledProcessError:
+                # Fallback to default branch if 'main' was requested but failed
+                if branch != "main":
+                    raise
+                print(f"Fetch of branch 'main' failed. Retrying with default branch...", flush=True)
+                ref = "refs/remotes/origin/HEAD"
+                self._git("-C", mirror, "fetch", "--quiet", "--depth", "1", "--filter=blob:none", "origin", f"+HEAD:{ref}")
+
+            commit = self._git("-C", mirror, "rev-parse", f"{ref}^{{commit}}")
+            os.makedirs(os.path.dirname(stamp), exist_ok=True)
+            with open(stamp, "w") as f:
+                f.write(ref)
+            return mirror, commit
+
+    # --- Worktrees ---
+
+    def checkout(self, url: str, branch: str, scan_id: str, patterns: Optional[List[str]] = None) -> RepoCheckout:
+        """
+        Check the current commit of `branch` out into a private worktree for
+        `scan_id`. With `patterns` (gitignore-style, e.g. "*.json") only
+        matching files are checked out, and only their blobs are fetched.
+        """
+        mirror, commit = self.resolve(url, branch)
+        path = os.path.abspath(os.path.join(self.worktree_dir, scan_id))
+        self.release(scan_id)
+
+        with self._mirror_lock(mirror):
+            if patterns:
+                self._git("-C", mirror, "worktree", "add", "--no-checkout", "--detach", "--force", path, commit)
+            else:
+                self._git("-C", mirror, "worktree", "add", "--detach", "--force", path, commit)
+            # LRU clock for eviction
+            os.utime(mirror)
+
+        if patterns:
+            # Sparse settings are per worktree, so full checkouts of the same mirror are unaffected
+            self._git("-C", path, "sparse-checkout", "set", "--no-cone", *patterns)
+            self._git("-C", path, "checkout", "--quiet", "--detach", commit)
+        print(f"Checked out {url}@{commit[:12]} to {path}{' (sparse)' if patterns else ''}", flush=True)
+        return RepoCheckout(path, url, commit, self._git("-C", mirror, "rev-parse", f"{commit}^{{tree}}"))
+
+    def changed_paths(self, url: str, base: str, commit: str) -> Optional[List[str]]:
+        """
+        Repository-relative paths that differ between two commits (added,
+        modified, deleted; a rename counts as both paths). Only trees are
+        compared, so no file contents are fetched. None if `base` is no longer
+        in the mirror (evicted, or never fetched here).
+        """
+        mirror = self.mirror_path(url)
+        try:
+            self._git("-C", mirror, "cat-file", "-e", f"{base}^{{commit}}")
+        except subprocess.CalledProcessError:
+            return None
+        output = self._git("-C", mirror, "diff", "--name-only", "--no-renames", "-z", base, commit)
+        return [path for path in output.split("\0") if path]
+
+    def release(self, scan_id: str):
+        """Remove a scan's worktree; its objects stay in the mirror for the next scan."""
+        path = os.path.abspath(os.path.join(self.worktree_dir, scan_id))
+        if not os.path.exists(path):
+            return
+
+        mirror = self._worktree_mirror(path)
+        shutil.rmtree(path, ignore_errors=True)
+        if mirror and os.path.exists(mirror):
+            with self._mirror_lock(mirror):
+                self._git("-C", mirror, "worktree", "prune")
+        self.evict()
+
+    def _worktree_mirror(self, path: str) -> Optional[str]:
+        # A worktree's .git file reads "gitdir: <mirror>/worktrees/<name>"
+        try:
+            with open(os.path.join(path, ".git")) as f:
+                gitdir = f.read().strip().removeprefix("gitdir:").strip()
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            return None
+        return os.path.dirname(os.path.dirname(gitdir))
+
+    # --- Eviction ---
+
+    @staticmethod
+    def _dir_size(path: str) -> int:
+        total = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.lstat(os.path.join(root, name)).st_size
+                except FileNotFoundError:
+                    pass
+        return total
+
+    def _mirrors(self) -> List[str]:
+        return [
+            os.path.join(self.mirror_dir, name)
+            for name in os.listdir(self.mirror_dir)
+            if name.endswith(".git") and os.path.isdir(os.path.join(self.mirror_dir, name))
+        ]
+
+    def evict(self) -> int:
+        """Drop least recently used mirrors until the cache fits its quota. Mirrors with live worktrees are kept."""
+        mirrors = sorted(((os.path.getmtime(m), m, self._dir_size(m)) for m in self._mirrors()))
+        total = sum(size for _, _, size in mirrors)
+        removed = 0
+        for _, mirror, size in mirrors:
+            if total <= self.quota_bytes:
+                break
+            with self._mirror_lock(mirror):
+                worktrees = os.path.join(mirror, "worktrees")
+                if os.path.isdir(worktrees) and os.listdir(worktrees):
+                    continue
+                print(f"Evicting repo mirror {mirror} ({size // (1024 * 1024)} MiB)", flush=True)
+                shutil.rmtree(mirror, ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
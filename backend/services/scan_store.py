@@ -0,0 +1,969 @@
+import os
+import gzip
+import json
+import base64
+import hashlib
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Optional, List, Dict, Any, Callable
+
+from models.findings import Findings
+from services.blob_store import BlobStore
+from services.store_writer import GroupCommitWriter
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip variants are stored
+    brotli = None
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id TEXT PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    target TEXT NOT NULL,
+    branch TEXT NOT NULL,
+    scan_type TEXT NOT NULL DEFAULT 'static',
+    status TEXT NOT NULL DEFAULT 'pending',
+    evaluation TEXT,
+    error TEXT,
+    commit_sha TEXT,
+    repo_index TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_scans_timestamp ON scans(timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_scans_type_ts ON scans(scan_type, timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_scans_status_ts ON scans(status, timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_scans_target_ts ON scans(target, timestamp DESC, id DESC);
+
+-- Per (scan_type, status) counters, kept exact by triggers so totals never scan the table
+CREATE TABLE IF NOT EXISTS scan_counts (
+    scan_type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    n INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (scan_type, status)
+);
+CREATE TRIGGER IF NOT EXISTS trg_scans_count_insert AFTER INSERT ON scans BEGIN
+    INSERT INTO scan_counts (scan_type, status, n) VALUES (NEW.scan_type, NEW.status, 1)
+        ON CONFLICT(scan_type, status) DO UPDATE SET n = n + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_scans_count_delete AFTER DELETE ON scans BEGIN
+    UPDATE scan_counts SET n = n - 1 WHERE scan_type = OLD.scan_type AND status = OLD.status;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_scans_count_update AFTER UPDATE OF scan_type, status ON scans
+WHEN OLD.scan_type IS NOT NEW.scan_type OR OLD.status IS NOT NEW.status BEGIN
+    UPDATE scan_counts SET n = n - 1 WHERE scan_type = OLD.scan_type AND status = OLD.status;
+    INSERT INTO scan_counts (scan_type, status, n) VALUES (NEW.scan_type, NEW.status, 1)
+        ON CONFLICT(scan_type, status) DO UPDATE SET n = n + 1;
+END;
+
+CREATE TABLE IF NOT EXISTS scanner_results (
+    scan_id TEXT NOT NULL REFERENCES scans(id) ON DELETE CASCADE,
+    scanner TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    scanner_name TEXT,
+    raw_output_ref TEXT,
+    raw_output_size INTEGER,
+    error TEXT,
+    duration REAL,
+    kill_reason TEXT,
+    cache_hit INTEGER NOT NULL DEFAULT 0,
+    base_scan_id TEXT,
+    -- BaseScanner.cache_identity() of the run: findings are only carried forward between equal identities
+    scanner_identity TEXT,
+    tool_version TEXT,
+    -- JSON: the tool's own timing/profiling summary (ScannerOutput.profile)
+    profile TEXT,
+    PRIMARY KEY (scan_id, scanner, mode)
+);
+CREATE INDEX IF NOT EXISTS idx_scanner_results_blob ON scanner_results(raw_output_ref);
+
+CREATE TABLE IF NOT EXISTS findings (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    scan_id TEXT NOT NULL REFERENCES scans(id) ON DELETE CASCADE,
+    scanner TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    id TEXT NOT NULL,
+    rule_id TEXT,
+    message TEXT,
+    severity TEXT,
+    file_path TEXT,
+    start_line INTEGER,
+    end_line INTEGER,
+    code_snippet TEXT,
+    scanner_name TEXT,
+    category TEXT,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_findings_scan ON findings(scan_id, scanner, mode);
+CREATE INDEX IF NOT EXISTS idx_findings_severity ON findings(scan_id, severity);
+CREATE INDEX IF NOT EXISTS idx_findings_rule ON findings(scan_id, rule_id);
+CREATE INDEX IF NOT EXISTS idx_findings_category ON findings(scan_id, category);
+CREATE INDEX IF NOT EXISTS idx_findings_path ON findings(scan_id, file_path);
+
+-- Pre-serialized response bodies of finished scans. Any change to the scan or
+-- its scanner results drops the document so it is rebuilt on the next read.
+CREATE TABLE IF NOT EXISTS scan_documents (
+    scan_id TEXT PRIMARY KEY REFERENCES scans(id) ON DELETE CASCADE,
+    etag TEXT NOT NULL,
+    last_modified TEXT NOT NULL,
+    body BLOB NOT NULL,
+    body_gzip BLOB NOT NULL,
+    body_br BLOB
+);
+CREATE TRIGGER IF NOT EXISTS trg_scan_documents_scan AFTER UPDATE ON scans BEGIN
+    DELETE FROM scan_documents WHERE scan_id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_scan_documents_results_insert AFTER INSERT ON scanner_results BEGIN
+    DELETE FROM scan_documents WHERE scan_id = NEW.scan_id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_scan_documents_results_delete AFTER DELETE ON scanner_results BEGIN
+    DELETE FROM scan_documents WHERE scan_id = OLD.scan_id;
+END;
+
+-- Cross-scanner clusters of a scan's findings (services/consensus.py), as JSON
+CREATE TABLE IF NOT EXISTS scan_consensus (
+    scan_id TEXT PRIMARY KEY REFERENCES scans(id) ON DELETE CASCADE,
+    data TEXT NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS trg_scan_documents_consensus AFTER INSERT ON scan_consensus BEGIN
+    DELETE FROM scan_documents WHERE scan_id = NEW.scan_id;
+END;
+
+-- Durable benchmark job queue; a row lives from enqueue until its run finishes
+CREATE TABLE IF NOT EXISTS jobs (
+    scan_id TEXT PRIMARY KEY REFERENCES scans(id) ON DELETE CASCADE,
+    repo_url TEXT NOT NULL,
+    branch TEXT NOT NULL,
+    scan_type TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'queued',
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    force_rescan INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(state, priority DESC, enqueued_at);
+
+-- Scanner outputs keyed by (scanner, mode, tool version, config hash, repo tree hash),
+-- reused across scans while none of those change
+CREATE TABLE IF NOT EXISTS result_cache (
+    key TEXT PRIMARY KEY,
+    scanner TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    output TEXT NOT NULL,
+    raw_output_ref TEXT,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_result_cache_lru ON result_cache(last_used);
+CREATE INDEX IF NOT EXISTS idx_result_cache_blob ON result_cache(raw_output_ref);
+
+CREATE TABLE IF NOT EXISTS leaderboard (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    data TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# Columns added after their table first shipped; CREATE TABLE IF NOT EXISTS won't add them to existing databases
+ADDED_COLUMNS = [
+    ("jobs", "lease_owner", "TEXT"),
+    ("jobs", "lease_expires", "REAL"),
+    ("jobs", "cancel_requested", "INTEGER NOT NULL DEFAULT 0"),
+    ("scanner_results", "duration", "REAL"),
+    ("scanner_results", "kill_reason", "TEXT"),
+    ("scanner_results", "cache_hit", "INTEGER NOT NULL DEFAULT 0"),
+    ("jobs", "force_rescan", "INTEGER NOT NULL DEFAULT 0"),
+    ("scans", "commit_sha", "TEXT"),
+    ("scanner_results", "base_scan_id", "TEXT"),
+    ("scanner_results", "scanner_identity", "TEXT"),
+    ("scanner_results", "tool_version", "TEXT"),
+    ("scanner_results", "profile", "TEXT"),
+    ("scans", "repo_index", "TEXT"),
+]
+
+FINAL_STATUSES = ("completed", "error", "cancelled")
+SCAN_COLUMNS = ["id", "timestamp", "target", "branch", "scan_type", "status", "evaluation", "error", "commit_sha",
+                "repo_index"]
+JSON_SCAN_COLUMNS = {"evaluation", "repo_index"}
+DEFAULT_LEADERBOARD = {"static": {}, "dynamic": {}}
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(timestamp: str, scan_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([timestamp, scan_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        timestamp, scan_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(timestamp), str(scan_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+class ScanStore:
+    """
+    SQLite-backed persistence for scans, per-scanner results and findings.
+
+    Every write is a small transaction against the rows it touches, so status
+    changes no longer rewrite the whole scan history. Writes are funnelled
+    through a single GroupCommitWriter; reads use per-thread connections and
+    see every write whose call has returned. Scanner raw output is kept out
+    of line in a content-addressed BlobStore and referenced by ID.
+    """
+
+    def __init__(self, db_path: str = "scan_store.db", blob_store: Optional[BlobStore] = None):
+        self.db_path = db_path
+        self.blobs = blob_store or BlobStore(os.path.join(os.path.dirname(os.path.abspath(db_path)), "scan_blobs"))
+        self._local = threading.local()
+        # executescript manages its own transaction
+        self._connect().executescript(SCHEMA)
+        self._add_missing_columns()
+        self._writer = GroupCommitWriter(db_path)
+        self._write(self._backfill_counts)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def _add_missing_columns(self):
+        conn = self._connect()
+        for table, column, ddl in ADDED_COLUMNS:
+            existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+    def _write(self, op: Callable[[sqlite3.Connection], Any]) -> Any:
+        return self._writer.write(op)
+
+    def close(self):
+        self._writer.close()
+
+    # --- Scans ---
+
+    def _row_to_scan(self, row: sqlite3.Row) -> Dict[str, Any]:
+        scan = dict(row)
+        for col in JSON_SCAN_COLUMNS:
+            if scan.get(col) is not None:
+                scan[col] = json.loads(scan[col])
+        return scan
+
+    def _scan_values(self, scan: Dict[str, Any]) -> List[Any]:
+        values = []
+        for col in SCAN_COLUMNS:
+            value = scan.get(col)
+            if col == "scan_type" and not value:
+                value = "static"
+            elif col == "status" and not value:
+                value = "pending"
+            elif col in JSON_SCAN_COLUMNS and value is not None:
+                value = json.dumps(value)
+            values.append(value)
+        return values
+
+    def _backfill_counts(self, conn: sqlite3.Connection):
+        # Databases created before the counters existed start with an empty table
+        if conn.execute("SELECT 1 FROM scan_counts LIMIT 1").fetchone():
+            return
+        conn.execute("INSERT INTO scan_counts (scan_type, status, n) SELECT scan_type, status, COUNT(*) FROM scans GROUP BY scan_type, status")
+
+    def _insert_scan(self, conn: sqlite3.Connection, scan: Dict[str, Any]):
+        # Upsert rather than INSERT OR REPLACE: REPLACE deletes without firing the counter triggers
+        placeholders = ", ".join("?" for _ in SCAN_COLUMNS)
+        updates = ", ".join(f"{col} = excluded.{col}" for col in SCAN_COLUMNS if col != "id")
+        conn.execute(
+            f"INSERT INTO scans ({', '.join(SCAN_COLUMNS)}) VALUES ({placeholders}) ON CONFLICT(id) DO UPDATE SET {updates}",
+            self._scan_values(scan)
+        )
+
+    def create_scan(self, scan: Dict[str, Any]):
+        self._write(lambda conn: self._insert_scan(conn, scan))
+
+    def update_scan(self, scan_id: str, **fields) -> bool:
+        """
+        Update columns of a scan. Returns False if it is gone, or if `status`
+        is among the fields and the scan was cancelled: a worker whose lease
+        lapsed may still be running a scan request_cancel already cancelled,
+        and must not overwrite that with its own outcome.
+        """
+        unknown = set(fields) - set(SCAN_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown scan fields: {sorted(unknown)}")
+        if not fields:
+            return False
+
+        assignments = ", ".join(f"{col} = ?" for col in fields)
+        values = [json.dumps(v) if col in JSON_SCAN_COLUMNS and v is not None else v for col, v in fields.items()]
+        guard = " AND status != 'cancelled'" if "status" in fields else ""
+        return self._write(
+            lambda conn: conn.execute(f"UPDATE scans SET {assignments} WHERE id = ?{guard}", [*values, scan_id]).rowcount > 0
+        )
+
+    def get_scan(self, scan_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT * FROM scans WHERE id = ?", (scan_id,)).fetchone()
+        return self._row_to_scan(row) if row else None
+
+    def _scan_filters(self, scan_type: Optional[str] = None, status: Optional[str] = None, target: Optional[str] = None,
+                      since: Optional[str] = None, until: Optional[str] = None):
+        clauses: List[str] = []
+        params: List[Any] = []
+        for col, value in (("scan_type", scan_type), ("status", status), ("target", target)):
+            if value:
+                clauses.append(f"{col} = ?")
+                params.append(value)
+        # Timestamps are ISO-8601 strings, so lexicographic order is chronological
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        return clauses, params
+
+    def list_scans(self, limit: int = 20, offset: int = 0, scan_type: Optional[str] = None, status: Optional[str] = None,
+                   target: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None,
+                   cursor: Optional[str] = None):
+        """
+        Newest-first page of scans. Returns (scans, next_cursor).
+
+        With a cursor this is keyset pagination on (timestamp, id), which stays
+        an index range scan no matter how deep the page is. `offset` is kept
+        for older clients and only applies when no cursor is given.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        clauses, params = self._scan_filters(scan_type, status, target, since, until)
+        if cursor:
+            clauses.append("(timestamp, id) < (?, ?)")
+            params.extend(decode_cursor(cursor))
+            offset = 0
+
+        query = "SELECT * FROM scans"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?"
+        params.extend([limit + 1, offset])
+
+        rows = self._connect().execute(query, params).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["timestamp"], rows[-1]["id"])
+        return [self._row_to_scan(r) for r in rows], next_cursor
+
+    def count_scans(self, scan_type: Optional[str] = None, status: Optional[str] = None, target: Optional[str] = None,
+                    since: Optional[str] = None, until: Optional[str] = None) -> int:
+        conn = self._connect()
+        if not (target or since or until):
+            # Served from the maintained counters
+            clauses, params = self._scan_filters(scan_type, status)
+            query = "SELECT COALESCE(SUM(n), 0) FROM scan_counts"
+        else:
+            clauses, params = self._scan_filters(scan_type, status, target, since, until)
+            query = "SELECT COUNT(*) FROM scans"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        return conn.execute(query, params).fetchone()[0]
+
+    def delete_scan(self, scan_id: str) -> bool:
+        def op(conn: sqlite3.Connection):
+            refs = [r[0] for r in conn.execute(
+                "SELECT DISTINCT raw_output_ref FROM scanner_results WHERE scan_id = ? AND raw_output_ref IS NOT NULL", (scan_id,)
+            )]
+            return conn.execute("DELETE FROM scans WHERE id = ?", (scan_id,)).rowcount > 0, refs
+
+        deleted, refs = self._write(op)
+        self._collect_blobs(refs)
+        return deleted
+
+    def delete_all(self):
+        def op(conn: sqlite3.Connection):
+            conn.execute("DELETE FROM jobs")
+            conn.execute("DELETE FROM scan_documents")
+            conn.execute("DELETE FROM scan_consensus")
+            conn.execute("DELETE FROM findings")
+            conn.execute("DELETE FROM scanner_results")
+            conn.execute("DELETE FROM scans")
+            conn.execute("DELETE FROM scan_counts")
+            conn.execute("DELETE FROM leaderboard")
+            # Cached outputs point into the blob store being cleared
+            conn.execute("DELETE FROM result_cache")
+        self._write(op)
+        self.blobs.clear()
+
+    # --- Scanner results & findings ---
+
+    def _blob_referenced(self, conn: sqlite3.Connection, ref: str) -> bool:
+        return conn.execute(
+            "SELECT 1 FROM scanner_results WHERE raw_output_ref = ? UNION ALL SELECT 1 FROM result_cache WHERE raw_output_ref = ? LIMIT 1",
+            (ref, ref)
+        ).fetchone() is not None
+
+    def _externalize_raw_output(self, s_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Move each mode's raw_output into the blob store. Runs on the caller's thread, not the writer's."""
+        externalized = {}
+        for mode, output in s_result.items():
+            if isinstance(output, dict) and output.get("raw_output_file") is not None:
+                path = output["raw_output_file"]
+                output = {k: v for k, v in output.items() if k not in ("raw_output", "raw_output_file")}
+                # Streamed from the spill file without reading it into memory; the file is ours to remove
+                output["raw_output_ref"] = self.blobs.put_file(path)
+                output["raw_output_size"] = os.path.getsize(path)
+                os.remove(path)
+            elif isinstance(output, dict) and output.get("raw_output") is not None:
+                raw = output["raw_output"].encode("utf-8", errors="replace")
+                output = {k: v for k, v in output.items() if k != "raw_output"}
+                output["raw_output_ref"] = self.blobs.put(raw)
+                output["raw_output_size"] = len(raw)
+            externalized[mode] = output
+        return externalized
+
+    def _collect_blobs(self, refs: List[str]):
+        """Drop blobs that no scanner result references any more."""
+        conn = self._connect()
+        for ref in refs:
+            if not self._blob_referenced(conn, ref):
+                # Blobs re-put in the last minute may be about to be referenced; gc_blobs() sweeps them later
+                self.blobs.delete_if_stale(ref)
+
+    def gc_blobs(self, grace_seconds: float = 300.0) -> int:
+        """Sweep blobs left unreferenced (e.g. by a crash between put and commit)."""
+        conn = self._connect()
+        removed = 0
+        for ref in list(self.blobs.list_ids()):
+            if self._blob_referenced(conn, ref):
+                continue
+            if self.blobs.delete_if_stale(ref, grace_seconds=grace_seconds):
+                removed += 1
+        return removed
+
+    def _insert_scanner_result(self, conn: sqlite3.Connection, scan_id: str, scanner: str, s_result: Dict[str, Any],
+                               identity: Optional[str] = None):
+        conn.execute("DELETE FROM findings WHERE scan_id = ? AND scanner = ?", (scan_id, scanner))
+        conn.execute("DELETE FROM scanner_results WHERE scan_id = ? AND scanner = ?", (scan_id, scanner))
+
+        for mode, output in s_result.items():
+            if not isinstance(output, dict):
+                continue
+            conn.execute(
+                """INSERT INTO scanner_results (scan_id, scanner, mode, scanner_name, raw_output_ref, raw_output_size,
+                                               error, duration, kill_reason, cache_hit, base_scan_id, scanner_identity,
+                                               tool_version, profile)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (scan_id, scanner, mode, output.get("scanner_name"), output.get("raw_output_ref"),
+                 output.get("raw_output_size"), output.get("error"), output.get("duration"), output.get("kill_reason"),
+                 int(bool(output.get("cache_hit"))), output.get("base_scan_id"), identity, output.get("tool_version"),
+                 json.dumps(output["profile"]) if output.get("profile") is not None else None)
+            )
+            conn.executemany(
+                """INSERT INTO findings (scan_id, scanner, mode, id, rule_id, message, severity, file_path,
+                                         start_line, end_line, code_snippet, scanner_name, category, metadata)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                [(scan_id, scanner, mode, *row) for row in Findings.coerce(output.get("vulnerabilities")).storage_rows()]
+            )
+
+    def save_scanner_result(self, scan_id: str, scanner: str, s_result: Dict[str, Any], identity: Optional[str] = None):
+        """Replace the stored output of one scanner (all modes) for a scan."""
+        s_result = self._externalize_raw_output(s_result)
+        self._write(lambda conn: self._insert_scanner_result(conn, scan_id, scanner, s_result, identity))
+
+    def get_scanner_identities(self, scan_id: str) -> Dict[str, Dict[str, str]]:
+        """scanner -> mode -> the scanner's cache identity when it produced the scan's result."""
+        identities: Dict[str, Dict[str, str]] = {}
+        for row in self._connect().execute(
+            "SELECT scanner, mode, scanner_identity FROM scanner_results WHERE scan_id = ? AND scanner_identity IS NOT NULL",
+            (scan_id,)
+        ):
+            identities.setdefault(row["scanner"], {})[row["mode"]] = row["scanner_identity"]
+        return identities
+
+    def get_scanner_results(self, scan_id: str) -> Dict[str, Any]:
+        conn = self._connect()
+        results: Dict[str, Any] = {}
+        for row in conn.execute("SELECT * FROM scanner_results WHERE scan_id = ? ORDER BY rowid", (scan_id,)):
+            output = {"scanner_name": row["scanner_name"] or row["scanner"], "vulnerabilities": []}
+            if row["raw_output_ref"] is not None:
+                output["raw_output_ref"] = row["raw_output_ref"]
+                output["raw_output_size"] = row["raw_output_size"]
+            for col in ("error", "duration", "kill_reason", "base_scan_id", "tool_version"):
+                if row[col] is not None:
+                    output[col] = row[col]
+            if row["cache_hit"]:
+                output["cache_hit"] = True
+            if row["profile"] is not None:
+                output["profile"] = json.loads(row["profile"])
+            results.setdefault(row["scanner"], {})[row["mode"]] = output
+
+        for row in conn.execute("SELECT * FROM findings WHERE scan_id = ? ORDER BY seq", (scan_id,)):
+            output = results.get(row["scanner"], {}).get(row["mode"])
+            if output is None:
+                continue
+            output["vulnerabilities"].append(self._row_to_vulnerability(row))
+        return results
+
+    # --- Result cache ---
+
+    def get_cached_result(self, key: str) -> Optional[Dict[str, Any]]:
+        """A cached scanner output (raw output by blob reference), or None. Hits refresh the LRU clock."""
+        row = self._connect().execute("SELECT output, raw_output_ref FROM result_cache WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return None
+        if row["raw_output_ref"] and not self.blobs.exists(row["raw_output_ref"]):
+            return None
+        self._writer.submit(lambda conn: conn.execute("UPDATE result_cache SET last_used = ? WHERE key = ?", (time.time(), key)))
+        output = json.loads(row["output"])
+        vulns = output.get("vulnerabilities")
+        # Columnar since the findings container; older entries hold a list of dicts
+        output["vulnerabilities"] = Findings.from_columns(vulns) if isinstance(vulns, dict) else Findings.from_dicts(vulns or [])
+        return output
+
+    def put_cached_result(self, key: str, scanner: str, mode: str, output: Dict[str, Any],
+                          max_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Cache one scanner output and return it with its raw output moved to the
+        blob store (so the caller can save that instead of compressing twice).
+        Least recently used entries are evicted beyond `max_bytes`.
+        """
+        output = self._externalize_raw_output({mode: output})[mode]
+        body = json.dumps({k: Findings.coerce(v).to_columns() if k == "vulnerabilities" else v
+                           for k, v in output.items() if k not in ("duration", "cache_hit")})
+        size = len(body) + (output.get("raw_output_size") or 0)
+
+        def op(conn: sqlite3.Connection) -> List[str]:
+            now = time.time()
+            conn.execute(
+                """INSERT INTO result_cache (key, scanner, mode, output, raw_output_ref, size, created_at, last_used)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(key) DO UPDATE SET output = excluded.output, raw_output_ref = excluded.raw_output_ref,
+                                                  size = excluded.size, last_used = excluded.last_used""",
+                (key, scanner, mode, body, output.get("raw_output_ref"), size, now, now)
+            )
+            if max_bytes is None:
+                return []
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM result_cache").fetchone()[0]
+            evicted = []
+            for row in conn.execute("SELECT key, size, raw_output_ref FROM result_cache ORDER BY last_used").fetchall():
+                if total <= max_bytes:
+                    break
+                conn.execute("DELETE FROM result_cache WHERE key = ?", (row["key"],))
+                total -= row["size"]
+                if row["raw_output_ref"]:
+                    evicted.append(row["raw_output_ref"])
+            return evicted
+
+        self._collect_blobs(self._write(op))
+        return output
+
+    def get_raw_output_ref(self, scan_id: str, scanner: str, mode: str) -> Optional[str]:
+        row = self._connect().execute(
+            "SELECT raw_output_ref FROM scanner_results WHERE scan_id = ? AND scanner = ? AND mode = ?",
+            (scan_id, scanner, mode)
+        ).fetchone()
+        return row["raw_output_ref"] if row else None
+
+    def _row_to_vulnerability(self, row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "rule_id": row["rule_id"],
+            "message": row["message"],
+            "severity": row["severity"],
+            "file_path": row["file_path"],
+            "start_line": row["start_line"],
+            "end_line": row["end_line"],
+            "code_snippet": row["code_snippet"],
+            "scanner": row["scanner_name"],
+            "metadata": json.loads(row["metadata"]) if row["metadata"] else {}
+        }
+
+    def list_findings(self, scan_id: str, scanner: Optional[str] = None, mode: Optional[str] = None,
+                      severity: Optional[str] = None, rule_id: Optional[str] = None, category: Optional[str] = None,
+                      path_prefix: Optional[str] = None, limit: int = 100, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        One page of a scan's findings from the per-scan findings index.
+        Returns {"items", "total", "next_cursor"}; `total` counts every match, not just this page.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        clauses = ["scan_id = ?"]
+        params: List[Any] = [scan_id]
+        for col, value in (("scanner", scanner), ("mode", mode), ("rule_id", rule_id), ("category", category)):
+            if value:
+                clauses.append(f"{col} = ?")
+                params.append(value)
+        if severity:
+            clauses.append("severity = ?")
+            params.append(severity.upper())
+        if path_prefix:
+            # Range form of a prefix match so the (scan_id, file_path) index is used
+            clauses.append("file_path >= ? AND file_path < ?")
+            params.extend([path_prefix, path_prefix + "\U0010ffff"])
+
+        conn = self._connect()
+        where = " AND ".join(clauses)
+        total = conn.execute(f"SELECT COUNT(*) FROM findings WHERE {where}", params).fetchone()[0]
+
+        if cursor:
+            try:
+                after = int(cursor)
+            except ValueError:
+                raise ValueError("Invalid cursor")
+            where += " AND seq > ?"
+            params.append(after)
+
+        rows = conn.execute(f"SELECT * FROM findings WHERE {where} ORDER BY seq LIMIT ?", [*params, limit + 1]).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = str(rows[-1]["seq"])
+
+        items = [
+            {**self._row_to_vulnerability(r), "mode": r["mode"], "category": r["category"]}
+            for r in rows
+        ]
+        return {"items": items, "total": total, "next_cursor": next_cursor}
+
+    def get_findings_columns(self, scan_id: str) -> Dict[str, List[Any]]:
+        """A scan's findings as one list per column, for the columnar export (services/findings_export.py)."""
+        columns: Dict[str, List[Any]] = {name: [] for name in (
+            "scanner", "mode", "rule_id", "severity", "category", "file_path", "message",
+            "start_line", "end_line", "carried_forward")}
+        for row in self._connect().execute(
+            """SELECT scanner, mode, rule_id, severity, category, file_path, message, start_line, end_line,
+                      json_extract(metadata, '$.carried_forward_from') IS NOT NULL AS carried_forward
+               FROM findings WHERE scan_id = ? ORDER BY seq""",
+            (scan_id,)
+        ):
+            for name, values in columns.items():
+                values.append(bool(row[name]) if name == "carried_forward" else row[name])
+        return columns
+
+    def find_base_scan(self, target: str, branch: str, scan_type: str, exclude_id: str) -> Optional[Dict[str, Any]]:
+        """The latest completed scan of the same target with a known commit, to scan incrementally against."""
+        row = self._connect().execute(
+            """SELECT * FROM scans
+               WHERE target = ? AND branch = ? AND scan_type = ? AND status = 'completed'
+                 AND commit_sha IS NOT NULL AND id != ?
+               ORDER BY timestamp DESC, id DESC LIMIT 1""",
+            (target, branch, scan_type, exclude_id)
+        ).fetchone()
+        return self._row_to_scan(row) if row else None
+
+    def get_scan_result(self, scan_id: str) -> Optional[Dict[str, Any]]:
+        scan = self.get_scan(scan_id)
+        if not scan:
+            return None
+        return {**scan, "scanner_results": self.get_scanner_results(scan_id), "consensus": self.get_consensus(scan_id)}
+
+    # --- Consensus ---
+
+    def save_consensus(self, scan_id: str, consensus: Dict[str, Any]):
+        data = json.dumps(consensus)
+        self._write(lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO scan_consensus (scan_id, data) VALUES (?, ?)", (scan_id, data)
+        ))
+
+    def get_consensus(self, scan_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT data FROM scan_consensus WHERE scan_id = ?", (scan_id,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    # --- Pre-serialized documents ---
+
+    def save_document(self, scan_id: str, body: bytes) -> bool:
+        """
+        Store the serialized response body of a finished scan together with
+        its compressed variants. Returns False if the scan is gone or no longer
+        in a final state by the time the write is applied.
+        """
+        body_gzip = gzip.compress(body, compresslevel=6, mtime=0)
+        body_br = brotli.compress(body) if brotli else None
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        last_modified = format_datetime(datetime.now(timezone.utc), usegmt=True)
+
+        def op(conn: sqlite3.Connection) -> bool:
+            row = conn.execute("SELECT status FROM scans WHERE id = ?", (scan_id,)).fetchone()
+            if not row or row["status"] not in FINAL_STATUSES:
+                return False
+            conn.execute(
+                """INSERT OR REPLACE INTO scan_documents (scan_id, etag, last_modified, body, body_gzip, body_br)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (scan_id, etag, last_modified, body, body_gzip, body_br)
+            )
+            return True
+        return self._write(op)
+
+    def get_document(self, scan_id: str, encoding: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Fetch a stored document with only the requested variant loaded.
+        `encoding` is "br", "gzip" or None; "br" falls back to gzip if no brotli variant was stored.
+        """
+        column = {"br": "COALESCE(body_br, body_gzip)", "gzip": "body_gzip"}.get(encoding or "", "body")
+        extra = ", body_br IS NOT NULL AS has_br" if encoding == "br" else ""
+        row = self._connect().execute(
+            f"SELECT etag, last_modified, {column} AS content{extra} FROM scan_documents WHERE scan_id = ?", (scan_id,)
+        ).fetchone()
+        if not row:
+            return None
+        if encoding == "br" and not row["has_br"]:
+            encoding = "gzip"
+        return {"etag": row["etag"], "last_modified": row["last_modified"], "encoding": encoding, "body": row["content"]}
+
+    def get_document_meta(self, scan_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT etag, last_modified FROM scan_documents WHERE scan_id = ?", (scan_id,)).fetchone()
+        return dict(row) if row else None
+
+    # --- Job queue ---
+    #
+    # A claimed job is held under a time-limited lease renewed by heartbeats.
+    # If the worker holding it dies, the lease expires and any worker process
+    # sharing this database can claim the job again.
+
+    def enqueue_job(self, scan_id: str, repo_url: str, branch: str, scan_type: str, priority: int = 0,
+                    force_rescan: bool = False):
+        self._write(lambda conn: conn.execute(
+            """INSERT OR IGNORE INTO jobs (scan_id, repo_url, branch, scan_type, priority, enqueued_at, force_rescan)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (scan_id, repo_url, branch, scan_type, priority, time.time(), int(force_rescan))
+        ))
+
+    def claim_job(self, worker_id: str, lease_seconds: float = 60.0, type_limits: Optional[Dict[str, int]] = None,
+                  max_attempts: int = 3, scan_types: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Atomically lease the highest-priority, oldest claimable job to `worker_id`.
+        Claimable means queued, or running under an expired lease, and of one of
+        `scan_types` (None = any). Scan types that already have
+        `type_limits[scan_type]` live leases are skipped, and jobs that have
+        already lost `max_attempts` workers are failed instead of being retried
+        forever.
+        """
+        def op(conn: sqlite3.Connection) -> Optional[Dict[str, Any]]:
+            now = time.time()
+
+            exhausted = conn.execute(
+                "SELECT scan_id, attempts FROM jobs WHERE state = 'running' AND lease_expires < ? AND attempts >= ?",
+                (now, max_attempts)
+            ).fetchall()
+            for row in exhausted:
+                conn.execute("DELETE FROM jobs WHERE scan_id = ?", (row["scan_id"],))
+                conn.execute(
+                    "UPDATE scans SET status = 'error', error = ? WHERE id = ?",
+                    (f"Benchmark worker lost {row['attempts']} times; giving up", row["scan_id"])
+                )
+
+            # Cancelled while their worker was gone: nobody is left to acknowledge it
+            abandoned = conn.execute(
+                "SELECT scan_id FROM jobs WHERE cancel_requested = 1 AND state = 'running' AND lease_expires < ?", (now,)
+            ).fetchall()
+            for row in abandoned:
+                self._mark_cancelled(conn, row["scan_id"])
+
+            saturated = []
+            if type_limits:
+                running = dict(conn.execute(
+                    "SELECT scan_type, COUNT(*) FROM jobs WHERE state = 'running' AND lease_expires >= ? GROUP BY scan_type", (now,)
+                ).fetchall())
+                saturated = [t for t, limit in type_limits.items() if limit and running.get(t, 0) >= limit]
+
+            query = "SELECT * FROM jobs WHERE cancel_requested = 0 AND (state = 'queued' OR (state = 'running' AND lease_expires < ?))"
+            params: List[Any] = [now]
+            if saturated:
+                query += f" AND scan_type NOT IN ({', '.join('?' for _ in saturated)})"
+                params.extend(saturated)
+            if scan_types is not None:
+                query += f" AND scan_type IN ({', '.join('?' for _ in scan_types)})"
+                params.extend(scan_types)
+            query += " ORDER BY priority DESC, enqueued_at LIMIT 1"
+            row = conn.execute(query, params).fetchone()
+            if not row:
+                return None
+            if row["state"] == "running":
+                print(f"Reclaiming job {row['scan_id']} from expired lease of {row['lease_owner']}", flush=True)
+            conn.execute(
+                """UPDATE jobs SET state = 'running', started_at = ?, attempts = attempts + 1,
+                                  lease_owner = ?, lease_expires = ?
+                   WHERE scan_id = ?""",
+                (now, worker_id, now + lease_seconds, row["scan_id"])
+            )
+            return dict(row)
+        return self._write(op)
+
+    def renew_leases(self, worker_id: str, scan_ids: List[str], lease_seconds: float = 60.0) -> List[str]:
+        """Heartbeat: extend this worker's leases. Returns the scan IDs it no longer holds."""
+        if not scan_ids:
+            return []
+
+        def op(conn: sqlite3.Connection) -> List[str]:
+            lost = []
+            expires = time.time() + lease_seconds
+            for scan_id in scan_ids:
+                cur = conn.execute(
+                    "UPDATE jobs SET lease_expires = ? WHERE scan_id = ? AND lease_owner = ? AND state = 'running'",
+                    (expires, scan_id, worker_id)
+                )
+                if cur.rowcount == 0:
+                    lost.append(scan_id)
+            return lost
+        return self._write(op)
+
+    def finish_job(self, scan_id: str, worker_id: str):
+        # Only the current lease holder may retire the job; a worker whose lease was taken over leaves it alone
+        self._write(lambda conn: conn.execute("DELETE FROM jobs WHERE scan_id = ? AND lease_owner = ?", (scan_id, worker_id)))
+
+    def release_jobs(self, worker_id: str) -> int:
+        """Hand a stopping worker's jobs straight back to the queue instead of waiting for the lease to lapse."""
+        return self._write(lambda conn: conn.execute(
+            "UPDATE jobs SET state = 'queued', lease_owner = NULL, lease_expires = NULL WHERE lease_owner = ? AND state = 'running'",
+            (worker_id,)
+        ).rowcount)
+
+    def enqueue_orphaned_scans(self) -> int:
+        """
+        Startup recovery for scans that are pending/running but have no job row
+        (e.g. created before the queue existed). Jobs still held by other live
+        workers are left alone; dead workers' jobs come back via lease expiry.
+        """
+        return self._write(lambda conn: conn.execute(
+            """INSERT INTO jobs (scan_id, repo_url, branch, scan_type, priority, enqueued_at)
+               SELECT id, target, branch, scan_type, 0, ? FROM scans
+               WHERE status IN ('pending', 'running') AND id NOT IN (SELECT scan_id FROM jobs)""",
+            (time.time(),)
+        ).rowcount)
+
+    def _mark_cancelled(self, conn: sqlite3.Connection, scan_id: str):
+        conn.execute("DELETE FROM jobs WHERE scan_id = ?", (scan_id,))
+        conn.execute("UPDATE scans SET status = 'cancelled', error = 'Cancelled by user' WHERE id = ?", (scan_id,))
+
+    def request_cancel(self, scan_id: str) -> Optional[str]:
+        """
+        Cancel a scan. Queued scans are cancelled on the spot ("cancelled");
+        running ones are flagged for their worker to stop ("cancelling").
+        Returns None if the scan is missing or already finished.
+        """
+        def op(conn: sqlite3.Connection) -> Optional[str]:
+            scan = conn.execute("SELECT status FROM scans WHERE id = ?", (scan_id,)).fetchone()
+            if not scan or scan["status"] in FINAL_STATUSES:
+                return None
+            job = conn.execute("SELECT state, lease_expires FROM jobs WHERE scan_id = ?", (scan_id,)).fetchone()
+            if job and job["state"] == "running" and job["lease_expires"] >= time.time():
+                conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE scan_id = ?", (scan_id,))
+                return "cancelling"
+            self._mark_cancelled(conn, scan_id)
+            return "cancelled"
+        return self._write(op)
+
+    def cancel_requests(self, scan_ids: List[str]) -> List[str]:
+        """Which of these running jobs have been asked to stop."""
+        if not scan_ids:
+            return []
+        rows = self._connect().execute(
+            f"SELECT scan_id FROM jobs WHERE cancel_requested = 1 AND scan_id IN ({', '.join('?' for _ in scan_ids)})",
+            scan_ids
+        ).fetchall()
+        return [row["scan_id"] for row in rows]
+
+    def count_jobs(self) -> Dict[str, int]:
+        return dict(self._connect().execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+
+    # --- Leaderboard ---
+
+    def get_leaderboard(self) -> Dict[str, Any]:
+        return self.get_leaderboard_versioned()[0]
+
+    def get_leaderboard_versioned(self):
+        """Returns (leaderboard, version) for use with set_leaderboard(expected_version=...)."""
+        row = self._connect().execute("SELECT data, version FROM leaderboard WHERE id = 1").fetchone()
+        if not row:
+            return dict(DEFAULT_LEADERBOARD), 0
+        return json.loads(row["data"]), row["version"]
+
+    def set_leaderboard(self, leaderboard: Dict[str, Any], expected_version: Optional[int] = None) -> bool:
+        """
+        Store the leaderboard. With expected_version this is a compare-and-set:
+        it returns False (and writes nothing) if another scan updated it first.
+        """
+        def op(conn: sqlite3.Connection) -> bool:
+            row = conn.execute("SELECT version FROM leaderboard WHERE id = 1").fetchone()
+            current = row["version"] if row else 0
+            if expected_version is not None and current != expected_version:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO leaderboard (id, data, version) VALUES (1, ?, ?)",
+                (json.dumps(leaderboard), current + 1)
+            )
+            return True
+        return self._write(op)
+
+    def update_leaderboard(self, update: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Read-modify-write of the leaderboard in one writer transaction, so
+        concurrent updates apply in turn without retries. `update` must be
+        cheap: it runs on the writer thread. Returns the stored leaderboard.
+        """
+        def op(conn: sqlite3.Connection) -> Dict[str, Any]:
+            row = conn.execute("SELECT data, version FROM leaderboard WHERE id = 1").fetchone()
+            current = json.loads(row["data"]) if row else dict(DEFAULT_LEADERBOARD)
+            updated = update(current)
+            conn.execute(
+                "INSERT OR REPLACE INTO leaderboard (id, data, version) VALUES (1, ?, ?)",
+                (json.dumps(updated), (row["version"] if row else 0) + 1)
+            )
+            return updated
+        return self._write(op)
+
+    # --- Migration ---
+
+    def migrate_from_json(self, data_file: str, results_dir: str) -> int:
+        """
+        One-shot import of the legacy scan_index.json + scan_results/*.json layout.
+        The index file is renamed afterwards so the import never runs twice.
+        Returns the number of migrated scans.
+        """
+        if not os.path.exists(data_file):
+            return 0
+
+        with open(data_file, "r") as f:
+            data = json.load(f)
+
+        scans = data.get("scans", [])
+        full_results = {}
+        for scan in scans:
+            result_path = os.path.join(results_dir, f"{scan['id']}.json")
+            if os.path.exists(result_path):
+                try:
+                    with open(result_path, "r") as f:
+                        full = json.load(f)
+                    full["scanner_results"] = {
+                        scanner: self._externalize_raw_output(s_result) if isinstance(s_result, dict) else s_result
+                        for scanner, s_result in (full.get("scanner_results") or {}).items()
+                    }
+                    full_results[scan["id"]] = full
+                except (OSError, json.JSONDecodeError) as e:
+                    print(f"Skipping unreadable result file {result_path}: {e}", flush=True)
+
+        def op(conn: sqlite3.Connection):
+            for scan in scans:
+                full = full_results.get(scan["id"]) or {}
+                self._insert_scan(conn, {**full, **scan})
+                for scanner, s_result in (full.get("scanner_results") or {}).items():
+                    if isinstance(s_result, dict):
+                        self._insert_scanner_result(conn, scan["id"], scanner, s_result)
+
+            if "leaderboard" in data:
+                conn.execute("INSERT OR REPLACE INTO leaderboard (id, data) VALUES (1, ?)", (json.dumps(data["leaderboard"]),))
+
+        self._write(op)
+
+        os.replace(data_file, f"{data_file}.migrated")
+        print(f"Migrated {len(scans)} scans from {data_file} into {self.db_path}", flush=True)
+        return len(scans)
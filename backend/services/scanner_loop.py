@@ -0,0 +1,44 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Coroutine, Optional
+
+
+class ScannerLoop:
+    """
+    One asyncio event loop, on its own thread, shared by every benchmark in
+    the process. Benchmark worker threads hand their scanner coroutines to
+    it and block on the result, so all scanner subprocesses of all
+    concurrent scans are awaited by a single thread instead of one thread
+    each. Legacy blocking scanners go through the loop's default executor,
+    which is bounded by `legacy_threads`.
+    """
+
+    def __init__(self, legacy_threads: int = 8):
+        self._loop = asyncio.new_event_loop()
+        self._loop.set_default_executor(ThreadPoolExecutor(max_workers=legacy_threads, thread_name_prefix="legacy-scanner"))
+        self._thread = threading.Thread(target=self._run, name="scanner-loop", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def run(self, coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Any:
+        """Run `coro` on the shared loop and block the calling thread until it finishes."""
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            # Timed out (or the caller was interrupted): don't leave the scanners running
+            future.cancel()
+            raise
+
+    def call_soon(self, callback: Callable[..., Any], *args: Any):
+        """Schedule a callback on the loop from any thread (e.g. cancelling one of its tasks)."""
+        self._loop.call_soon_threadsafe(callback, *args)
+
+    def close(self):
+        if self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(5)
@@ -0,0 +1,153 @@
+import queue
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+WriteOp = Callable[[sqlite3.Connection], Any]
+
+_STOP = object()
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitWriter:
+    """
+    Single writer thread for the scan store.
+
+    Mutations from every request handler and benchmark thread are queued and
+    applied by this thread only, so concurrent scans can no longer overwrite
+    each other's state. Everything that arrives within `commit_interval`
+    seconds is applied in one transaction (group commit); each mutation runs
+    in its own savepoint so a failing one only rolls back itself.
+
+    The SQLite WAL is the append-only journal. Once enough commits have
+    accumulated and the queue is idle, the WAL is checkpointed back into the
+    main database file, which swaps in the compacted snapshot atomically.
+    """
+
+    def __init__(self, db_path: str, commit_interval: float = 0.005, max_batch: int = 500, checkpoint_every: int = 200):
+        self.db_path = db_path
+        self.commit_interval = commit_interval
+        self.max_batch = max_batch
+        self.checkpoint_every = checkpoint_every
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        # Set by close(); checked with _STOP's enqueueing under one lock so nothing is queued behind it
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="scan-store-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, op: WriteOp) -> Future:
+        """Queue a mutation. The future resolves once its batch is committed."""
+        future: Future = Future()
+        with self._close_lock:
+            if self._closed or not self._thread.is_alive():
+                future.set_exception(RuntimeError("Scan store writer is closed"))
+                return future
+            self._queue.put((op, future))
+        return future
+
+    def write(self, op: WriteOp) -> Any:
+        """Queue a mutation and block until it is durable."""
+        return self.submit(op).result()
+
+    def close(self, timeout: Optional[float] = 10.0):
+        """Flush pending mutations and stop the writer thread."""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        # One fsync per batch is cheap enough to keep full durability
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        # Checkpoints are issued explicitly when the writer is idle
+        conn.execute("PRAGMA wal_autocheckpoint=0")
+        return conn
+
+    def _next_batch(self) -> Tuple[List[Tuple[WriteOp, Future]], bool]:
+        item = self._queue.get()
+        if item is _STOP:
+            return [], True
+
+        batch = [item]
+        deadline = time.monotonic() + self.commit_interval
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _commit(self, conn: sqlite3.Connection, batch: List[Tuple[WriteOp, Future]]):
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for op, future in batch:
+                conn.execute("SAVEPOINT op")
+                try:
+                    result = op(conn)
+                    conn.execute("RELEASE op")
+                    outcomes.append((future, result, None))
+                except Exception as e:
+                    conn.execute("ROLLBACK TO op")
+                    conn.execute("RELEASE op")
+                    outcomes.append((future, None, e))
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def _run(self):
+        conn = self._connect()
+        commits_since_checkpoint = 0
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if batch:
+                self._commit(conn, batch)
+                commits_since_checkpoint += 1
+
+            if commits_since_checkpoint and (stopping or (commits_since_checkpoint >= self.checkpoint_every and self._queue.empty())):
+                try:
+                    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                    commits_since_checkpoint = 0
+                except sqlite3.Error as e:
+                    # Readers can hold the WAL open; retry after the next batch
+                    logger.debug("WAL checkpoint deferred: %s", e)
+        conn.close()
+        self._fail_pending()
+
+    def _fail_pending(self):
+        # Anything still queued behind _STOP would otherwise leave write() blocked forever
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP:
+                item[1].set_exception(RuntimeError("Scan store writer is closed"))
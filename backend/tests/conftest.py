@@ -0,0 +1,18 @@
+import pytest
+
+from services.scan_store import ScanStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ScanStore(str(tmp_path / "scan_store.db"))
+    yield store
+    store.close()
+
+
+def add_scan(store: ScanStore, scan_id: str, timestamp: str = "2026-09-01T12:00:00", scan_type: str = "static",
+             status: str = "pending", target: str = "https://github.com/o/r"):
+    store.create_scan({
+        "id": scan_id, "timestamp": timestamp, "target": target, "branch": "main",
+        "scan_type": scan_type, "status": status,
+    })
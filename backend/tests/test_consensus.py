@@ -0,0 +1,160 @@
+import pytest
+
+from models.common import Vulnerability
+from services.consensus import LINE_WINDOW, build_consensus, category_key, fingerprint, normalize_path, overview
+
+EXEC = "mcp-eval-exec"          # Tool Execution Abuse
+SECRET = "mcp-hardcoded-secret"  # Context Leakage
+
+
+def _results(findings, errors=(), scan_type="static"):
+    """scanner -> [(rule_id, file_path, line)] into the runner's results shape."""
+    results = {}
+    for scanner, rows in findings.items():
+        vulns = [
+            {"id": f"{scanner}-{i}", "rule_id": rule, "message": "m", "severity": "HIGH", "file_path": path,
+             "start_line": line, "end_line": line, "code_snippet": "", "scanner": scanner}
+            for i, (rule, path, line) in enumerate(rows)
+        ]
+        results[scanner] = {scan_type: {"scanner_name": scanner, "vulnerabilities": vulns}}
+    for scanner in errors:
+        results[scanner] = {scan_type: {"scanner_name": scanner, "vulnerabilities": [], "error": "not installed"}}
+    return results
+
+
+def _clusters(consensus):
+    return sorted((c["file_path"], c["start_line"], c["category"], tuple(c["scanners"]), tuple(c["missed_by"]))
+                  for c in consensus["clusters"])
+
+
+@pytest.mark.parametrize("findings, expected", [
+    pytest.param(
+        {"a": [(EXEC, "s.py", 10)], "b": [(EXEC, "s.py", 10 + LINE_WINDOW)]},
+        [("s.py", 10, "Tool Execution Abuse", ("a", "b"), ())],
+        id="window-edge-joins",
+    ),
+    pytest.param(
+        {"a": [(EXEC, "s.py", 10)], "b": [(EXEC, "s.py", 11 + LINE_WINDOW)]},
+        [("s.py", 10, "Tool Execution Abuse", ("a",), ("b",)),
+         ("s.py", 16, "Tool Execution Abuse", ("b",), ("a",))],
+        id="past-window-splits",
+    ),
+    pytest.param(
+        # Matched against the cluster's anchor, so overlapping windows do not chain
+        {"a": [(EXEC, "s.py", 1)], "b": [(EXEC, "s.py", 6)], "c": [(EXEC, "s.py", 11)]},
+        [("s.py", 1, "Tool Execution Abuse", ("a", "b"), ("c",)),
+         ("s.py", 11, "Tool Execution Abuse", ("c",), ("a", "b"))],
+        id="anchored-not-chained",
+    ),
+    pytest.param(
+        # Anchored at 8 (window 1); 4 (window 0) and 12 (window 2) are found in the neighbouring windows
+        {"a": [(EXEC, "s.py", 8)], "b": [(EXEC, "s.py", 4)], "c": [(EXEC, "s.py", 12)]},
+        [("s.py", 4, "Tool Execution Abuse", ("a", "b", "c"), ())],
+        id="neighbour-windows",
+    ),
+    pytest.param(
+        {"a": [(EXEC, "s.py", 10)], "b": [(SECRET, "s.py", 10)]},
+        [("s.py", 10, "Context Leakage", ("b",), ("a",)),
+         ("s.py", 10, "Tool Execution Abuse", ("a",), ("b",))],
+        id="categories-kept-apart",
+    ),
+    pytest.param(
+        {"a": [(EXEC, "./src/s.py", 10)], "b": [(EXEC, "src\\s.py", 12)]},
+        [("src/s.py", 10, "Tool Execution Abuse", ("a", "b"), ())],
+        id="paths-normalized",
+    ),
+    pytest.param(
+        {"a": [("rules.custom-check", "s.py", 3)], "b": [("custom-check", "s.py", 3), ("other-check", "s.py", 3)]},
+        [("s.py", 3, "rule:custom-check", ("a", "b"), ()),
+         ("s.py", 3, "rule:other-check", ("b",), ("a",))],
+        id="uncategorized-by-rule",
+    ),
+    pytest.param(
+        {"a": [(EXEC, "s.py", 0)], "b": [(EXEC, "s.py", 0), (EXEC, "s.py", 2)]},
+        [("s.py", 0, "Tool Execution Abuse", ("a", "b"), ()),
+         ("s.py", 2, "Tool Execution Abuse", ("b",), ("a",))],
+        id="lineless-only-match-lineless",
+    ),
+])
+def test_clustering(findings, expected):
+    assert _clusters(build_consensus(_results(findings), "static")) == sorted(expected)
+
+
+@pytest.mark.parametrize("findings, errors, scanners, skipped, stats", [
+    pytest.param(
+        {"solo": [(EXEC, "s.py", 1), (EXEC, "s.py", 3), (SECRET, "t.py", 9)]}, (),
+        ["solo"], [],
+        {"solo": {"findings": 3, "clusters": 2, "agreed": 0, "unique": 2, "missed": 0}},
+        id="single-scanner",
+    ),
+    pytest.param(
+        {"a": [(EXEC, "s.py", 1)], "b": [(EXEC, "s.py", 2)]}, ("broken",),
+        ["a", "b"], ["broken"],
+        {"a": {"findings": 1, "clusters": 1, "agreed": 1, "unique": 0, "missed": 0},
+         "b": {"findings": 1, "clusters": 1, "agreed": 1, "unique": 0, "missed": 0}},
+        id="skipped-scanner-misses-nothing",
+    ),
+    pytest.param(
+        {"a": [(EXEC, "s.py", 1), (SECRET, "t.py", 1)], "b": [(EXEC, "s.py", 2)], "c": []}, (),
+        ["a", "b", "c"], [],
+        # The cluster only a found does not count as missed by b or c
+        {"a": {"findings": 2, "clusters": 2, "agreed": 1, "unique": 1, "missed": 0},
+         "b": {"findings": 1, "clusters": 1, "agreed": 1, "unique": 0, "missed": 0},
+         "c": {"findings": 0, "clusters": 0, "agreed": 0, "unique": 0, "missed": 1}},
+        id="missed-needs-agreement",
+    ),
+    pytest.param(
+        {}, ("x", "y"), [], ["x", "y"], {},
+        id="all-skipped",
+    ),
+])
+def test_summary(findings, errors, scanners, skipped, stats):
+    consensus = build_consensus(_results(findings, errors), "static")
+    assert consensus["scanners"] == scanners
+    assert consensus["skipped"] == skipped
+    assert consensus["summary"]["by_scanner"] == stats
+    assert consensus["summary"]["findings"] == sum(len(rows) for rows in findings.values())
+    for cluster in consensus["clusters"]:
+        assert not set(cluster["missed_by"]) & set(skipped)
+
+
+def test_other_scan_type_is_ignored():
+    results = _results({"a": [(EXEC, "s.py", 1)]})
+    results.update(_results({"fuzzer": [(EXEC, "s.py", 1)]}, scan_type="dynamic"))
+    consensus = build_consensus(results, "static")
+    assert consensus["scanners"] == ["a"]
+    assert consensus["clusters"][0]["missed_by"] == []
+
+
+def test_cluster_details_and_order():
+    results = _results({"a": [(SECRET, "t.py", 30), (EXEC, "s.py", 7)], "b": [(EXEC, "s.py", 4)]})
+    results["b"]["static"]["vulnerabilities"][0].update(severity="CRITICAL", end_line=9)
+    # Vulnerability models are accepted as well as dicts
+    results["a"]["static"]["vulnerabilities"] = [Vulnerability(**v) for v in results["a"]["static"]["vulnerabilities"]]
+    consensus = build_consensus(results, "static")
+
+    first, second = consensus["clusters"]
+    assert first["scanners"] == ["a", "b"]
+    assert (first["start_line"], first["end_line"], first["severity"]) == (4, 9, "CRITICAL")
+    assert first["finding_ids"] == {"a": ["a-1"], "b": ["b-0"]}
+    # The fingerprint follows the anchor, the first finding of the first scanner
+    assert first["fingerprint"] == fingerprint("s.py", "Tool Execution Abuse", 7)
+    assert second["scanners"] == ["a"]
+    assert consensus["summary"] | {"by_scanner": None} == {
+        "findings": 3, "clusters": 2, "agreed": 1, "by_scanner": None}
+    assert all("finding_ids" not in c for c in overview(consensus)["clusters"])
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("./src/a.py", "src/a.py"), ("src\\a.py", "src/a.py"), ("src//x/../a.py", "src/a.py"), (".", ""), ("", ""),
+])
+def test_normalize_path(path, expected):
+    assert normalize_path(path) == expected
+
+
+def test_keys():
+    assert category_key("Prompt Injection", "anything") == "Prompt Injection"
+    assert category_key("Uncategorized", "rules.ns.check") == "rule:check"
+    assert fingerprint("a.py", "c", 1) == fingerprint("a.py", "c", LINE_WINDOW - 1)
+    assert fingerprint("a.py", "c", 1) != fingerprint("a.py", "c", LINE_WINDOW)
+    assert fingerprint("a.py", "c", 0) != fingerprint("a.py", "c", 1)
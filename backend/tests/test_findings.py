@@ -0,0 +1,114 @@
+import json
+import uuid
+
+from models.common import Vulnerability
+from models.findings import Findings
+
+
+def _vulns():
+    return [
+        Vulnerability(id=str(uuid.uuid4()), rule_id="rules.mcp-eval-exec", message="eval of input", severity="HIGH",
+                      file_path="src/server.py", start_line=12, end_line=14, code_snippet="eval(x)",
+                      scanner="semgrep", metadata={"cwe": ["CWE-95"], "nested": {"a": 1}}),
+        Vulnerability(id="mcp-scan-7", rule_id="mcp-toxic-flow", message="toxic flow", severity="MEDIUM",
+                      file_path="mcp.json", start_line=0, end_line=0, code_snippet="", scanner="mcp-scan"),
+        # Not canonical UUIDs: kept verbatim rather than packed
+        Vulnerability(id=str(uuid.uuid4()).upper(), rule_id="rules.mcp-eval-exec", message="eval of input",
+                      severity="HIGH", file_path="src/server.py", start_line=40, end_line=40, code_snippet="eval(y)",
+                      scanner="semgrep", metadata={"category": "Prompt Injection"}),
+        Vulnerability(id=str(uuid.uuid4()).replace("-", ""), rule_id="x", message="ü ✓", severity="LOW",
+                      file_path="docs/ü.md", start_line=1, end_line=2, code_snippet="", scanner="semgrep"),
+    ]
+
+
+def test_round_trip_with_vulnerabilities():
+    vulns = _vulns()
+    findings = Findings.from_vulnerabilities(vulns)
+    assert len(findings) == len(vulns)
+    assert findings.to_vulnerabilities() == vulns
+    assert findings.to_dicts() == [v.model_dump() for v in vulns]
+    assert list(findings) == [v.model_dump() for v in vulns]
+    assert [findings.row(i) for i in range(len(findings))] == [v.model_dump() for v in vulns]
+    assert Findings.from_dicts(v.model_dump() for v in vulns).to_vulnerabilities() == vulns
+
+    # Accessors agree with the models
+    for i, v in enumerate(vulns):
+        assert (findings.id(i), findings.rule_id(i), findings.file_path(i), findings.severity(i)) == (
+            v.id, v.rule_id, v.file_path, v.severity)
+        assert findings.lines(i) == (v.start_line, v.end_line)
+
+
+def test_append_one_at_a_time():
+    vulns = _vulns()
+    findings = Findings()
+    for n, v in enumerate(vulns, 1):
+        findings.add(**v.model_dump())
+        assert len(findings) == n
+        assert findings.to_vulnerabilities() == vulns[:n]
+    # Repeated strings are stored once
+    assert findings.names.strings.count("src/server.py") == 1
+    assert findings.texts.strings.count("eval of input") == 1
+
+
+def test_missing_fields_get_defaults():
+    findings = Findings()
+    findings.add(None, None, None, None, None, None, None, None, None)
+    row = findings.row(0)
+    assert uuid.UUID(row["id"])
+    assert row | {"id": None} == {
+        "id": None, "rule_id": "", "message": "", "severity": "", "file_path": "", "start_line": 0,
+        "end_line": 0, "code_snippet": "", "scanner": "", "metadata": {}}
+    assert Findings.from_dicts([{}]).to_vulnerabilities()[0].start_line == 0
+
+
+def test_coerce():
+    vulns = _vulns()
+    findings = Findings.from_vulnerabilities(vulns)
+    assert Findings.coerce(findings) is findings
+    assert Findings.coerce(vulns).to_vulnerabilities() == vulns
+    assert Findings.coerce([v.model_dump() for v in vulns]).to_vulnerabilities() == vulns
+    assert len(Findings.coerce(None)) == len(Findings.coerce([])) == 0
+
+
+def test_columns_round_trip_through_json():
+    vulns = _vulns()
+    data = json.loads(json.dumps(Findings.from_vulnerabilities(vulns).to_columns()))
+    restored = Findings.from_columns(data)
+    assert restored.to_vulnerabilities() == vulns
+    # Still appendable after a round trip
+    restored.add(None, "r", "m", "LOW", "a.py", 1, 1, "", "semgrep")
+    assert restored.to_vulnerabilities()[:len(vulns)] == vulns
+
+
+def test_storage_rows_and_categories():
+    vulns = _vulns()
+    findings = Findings.from_vulnerabilities(vulns)
+    assert findings.categories() == ["Tool Execution Abuse", "Context Leakage", "Prompt Injection", "Uncategorized"]
+    rows = list(findings.storage_rows())
+    assert [(r[0], r[9], json.loads(r[10])) for r in rows] == [
+        (v.id, c, v.metadata) for v, c in zip(vulns, findings.categories())]
+
+
+def test_column_operations():
+    vulns = _vulns()
+    findings = Findings.from_vulnerabilities(vulns)
+
+    calls = []
+    findings.map_paths(lambda p: calls.append(p) or "repo/" + p)
+    assert sorted(calls) == sorted({v.file_path for v in vulns})
+    findings.set_metadata("base", "scan-1")
+    # Existing values are kept unless overwrite is set
+    findings.set_metadata("cwe", ["CWE-0"])
+    expected = [
+        v.model_copy(update={"file_path": "repo/" + v.file_path,
+                             "metadata": {**v.metadata, "base": "scan-1", "cwe": v.metadata.get("cwe", ["CWE-0"])}})
+        for v in vulns
+    ]
+    assert findings.to_vulnerabilities() == expected
+
+    assert findings.select([3, 0]).to_vulnerabilities() == [expected[3], expected[0]]
+    assert findings.without_paths(["repo/src/server.py", "not/there"]).to_vulnerabilities() == [expected[1], expected[3]]
+
+    combined = Findings.from_vulnerabilities(vulns[:1])
+    combined.extend(findings)
+    assert combined.to_vulnerabilities() == vulns[:1] + expected
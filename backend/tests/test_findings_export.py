@@ -0,0 +1,71 @@
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from models.findings import Findings
+from services import findings_export
+from services.findings_export import FindingsExporter, query_findings
+from services.scan_store import ScanStore
+
+
+def _add_scan(store: ScanStore, scan_id: str, day: int, scanners=("semgrep", "mcp-scan")):
+    store.create_scan({
+        "id": scan_id, "timestamp": f"2026-09-{day:02d}T12:00:00", "target": "https://github.com/o/r",
+        "branch": "main", "scan_type": "static", "status": "completed",
+    })
+    for scanner in scanners:
+        findings = Findings()
+        findings.add(None, "mcp-eval-exec", "eval", "HIGH", "src/a.py", 3, 3, "", scanner)
+        findings.add(None, "mcp-hardcoded-secret", "secret", "LOW", "src/b.py", 9, 9, "", scanner)
+        store.save_scanner_result(scan_id, scanner, {"static": {"scanner_name": scanner, "vulnerabilities": findings}}, None)
+
+
+def test_export_query_backfill_remove(store, tmp_path):
+    root = str(tmp_path / "export")
+    exporter = FindingsExporter(root)
+    scan_ids = [f"scan-{i}" for i in range(20)]
+    for i, scan_id in enumerate(scan_ids):
+        _add_scan(store, scan_id, 1 + i % 3)
+
+    assert exporter.backfill(store) == 20
+    assert query_findings(root=root) == [{"findings": 80, "scans": 20}]
+    by_scanner = query_findings(["scanner"], root=root)
+    assert sorted((row["scanner"], row["findings"], row["scans"]) for row in by_scanner) == [
+        ("mcp-scan", 40, 20), ("semgrep", 40, 20)]
+    assert query_findings(["severity"], root=root, severity="HIGH") == [{"severity": "HIGH", "findings": 40, "scans": 20}]
+    assert query_findings(root=root, since="2026-09-02", until="2026-09-03")[0]["scans"] == 7
+
+    # Compacted scans are known to backfill and removable
+    assert exporter.compact(min_files=2) == 20
+    assert exporter.backfill(store) == 0
+    assert query_findings(root=root) == [{"findings": 80, "scans": 20}]
+
+    removed = store.get_scan(scan_ids[0])
+    store.delete_scan(removed["id"])
+    exporter.remove_scan(removed["id"], removed["scan_type"], removed["timestamp"])
+    assert query_findings(root=root) == [{"findings": 76, "scans": 19}]
+
+    # A per-scan file next to the compacted one
+    _add_scan(store, "late", 1)
+    assert exporter.backfill(store) == 1
+    assert query_findings(["scan_id"], root=root, scan_id="late") == [{"scan_id": "late", "findings": 4, "scans": 1}]
+    store.delete_scan("late")
+    exporter.remove_scan("late", "static", "2026-09-01T12:00:00")
+    assert query_findings(root=root) == [{"findings": 76, "scans": 19}]
+
+    exporter.clear()
+    assert query_findings(root=root) == [{"findings": 0, "scans": 0}]
+
+
+def test_export_skips_unfinished_scans(store, tmp_path):
+    exporter = FindingsExporter(str(tmp_path / "export"))
+    _add_scan(store, "running", 1)
+    store.update_scan("running", status="running")
+    assert exporter.export_scan(store, "running") == 0
+    assert exporter.backfill(store) == 0
+
+
+def test_unknown_column(tmp_path):
+    with pytest.raises(ValueError):
+        query_findings(["nope"], root=str(tmp_path))
+    assert findings_export.available()
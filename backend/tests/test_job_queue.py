@@ -0,0 +1,153 @@
+import time
+import threading
+
+from conftest import add_scan
+from services.job_queue import JobQueue
+
+
+def _enqueue(store, scan_id, scan_type="static", priority=0):
+    add_scan(store, scan_id, scan_type=scan_type)
+    store.enqueue_job(scan_id, "https://github.com/o/r", "main", scan_type, priority)
+
+
+def test_claim_order_and_type_caps(store):
+    _enqueue(store, "d1", "dynamic")
+    _enqueue(store, "d2", "dynamic")
+    _enqueue(store, "s1", "static")
+    _enqueue(store, "urgent", "static", priority=5)
+    limits = {"dynamic": 1}
+
+    assert store.claim_job("w", type_limits=limits)["scan_id"] == "urgent"
+    assert store.claim_job("w", type_limits=limits)["scan_id"] == "d1"
+    # The dynamic cap is reached: the older d2 waits, static work goes ahead
+    assert store.claim_job("w", type_limits=limits)["scan_id"] == "s1"
+    assert store.claim_job("w", type_limits=limits) is None
+
+    store.finish_job("d1", "w")
+    assert store.claim_job("w", type_limits=limits)["scan_id"] == "d2"
+
+
+def test_scan_types_filter(store):
+    _enqueue(store, "d1", "dynamic")
+    assert store.claim_job("w", scan_types=["static"]) is None
+    assert store.claim_job("w", scan_types=["dynamic"])["scan_id"] == "d1"
+
+
+def test_lapsed_lease_is_reclaimed(store):
+    _enqueue(store, "s1")
+    assert store.claim_job("dead", lease_seconds=0.01)["scan_id"] == "s1"
+    time.sleep(0.05)
+    assert store.claim_job("other")["scan_id"] == "s1"
+    # The first worker may not retire the job it lost
+    store.finish_job("s1", "dead")
+    assert store.count_jobs() == {"running": 1}
+    store.finish_job("s1", "other")
+    assert store.count_jobs() == {}
+
+
+def test_live_lease_is_not_reclaimed(store):
+    _enqueue(store, "s1")
+    store.claim_job("w1", lease_seconds=60)
+    assert store.claim_job("w2") is None
+
+
+def test_exhausted_attempts_fail_the_scan(store):
+    _enqueue(store, "s1")
+    for worker in ("a", "b", "c"):
+        assert store.claim_job(worker, lease_seconds=0.01)["scan_id"] == "s1"
+        time.sleep(0.02)
+    assert store.claim_job("d") is None
+    assert store.get_scan("s1")["status"] == "error"
+
+
+def test_renew_leases_reports_lost(store):
+    _enqueue(store, "mine")
+    _enqueue(store, "taken")
+    store.claim_job("w", lease_seconds=0.01)
+    store.claim_job("w", lease_seconds=0.01)
+    time.sleep(0.02)
+    assert store.claim_job("other")["scan_id"] == "mine"
+
+    assert store.renew_leases("w", ["mine", "taken"]) == ["mine"]
+    assert store.renew_leases("w", []) == []
+
+
+def test_release_jobs_requeues(store):
+    _enqueue(store, "s1")
+    store.claim_job("w")
+    assert store.release_jobs("w") == 1
+    assert store.claim_job("other")["scan_id"] == "s1"
+
+
+def test_cancel_pending_job(store):
+    _enqueue(store, "s1")
+    assert store.request_cancel("s1") == "cancelled"
+    assert store.get_scan("s1")["status"] == "cancelled"
+    assert store.claim_job("w") is None
+    # Already final
+    assert store.request_cancel("s1") is None
+    assert store.request_cancel("missing") is None
+
+
+def test_cancel_running_job_is_flagged(store):
+    _enqueue(store, "s1")
+    store.claim_job("w")
+    assert store.request_cancel("s1") == "cancelling"
+    assert store.cancel_requests(["s1", "other"]) == ["s1"]
+    assert store.get_scan("s1")["status"] == "pending"
+
+
+def test_update_scan_keeps_cancelled(store):
+    _enqueue(store, "s1")
+    store.claim_job("w", lease_seconds=0.01)
+    time.sleep(0.02)
+    # Lease lapsed: cancelled on the spot although the worker may still be running
+    assert store.request_cancel("s1") == "cancelled"
+    assert store.update_scan("s1", status="completed") is False
+    assert store.get_scan("s1")["status"] == "cancelled"
+    # Other fields can still be written
+    assert store.update_scan("s1", commit_sha="abc") is True
+
+
+def test_lost_lease_stops_local_run(store):
+    _enqueue(store, "s1")
+    started, release = threading.Event(), threading.Event()
+    lost = []
+
+    def handler(scan_id, *_):
+        started.set()
+        release.wait(5)
+
+    queue = JobQueue(store, handler, workers=1, poll_interval=0.05, lease_seconds=0.3, worker_id="w",
+                     on_lease_lost=lambda scan_id: (lost.append(scan_id), release.set()))
+    queue.start()
+    try:
+        assert started.wait(5)
+        # Another worker takes the job over
+        store._write(lambda conn: conn.execute("UPDATE jobs SET lease_owner = 'other' WHERE scan_id = 's1'"))
+        assert release.wait(5)
+        assert lost == ["s1"]
+    finally:
+        queue.stop(wait=5)
+    # The job stays with its new owner
+    assert store.count_jobs() == {"running": 1}
+
+
+def test_stop_releases_unfinished_jobs(store):
+    _enqueue(store, "s1")
+    started, release = threading.Event(), threading.Event()
+    lost = []
+
+    def handler(scan_id, *_):
+        started.set()
+        release.wait(5)
+
+    queue = JobQueue(store, handler, workers=1, poll_interval=0.05, worker_id="w",
+                     on_lease_lost=lambda scan_id: (lost.append(scan_id), release.set()))
+    queue.start()
+    assert started.wait(5)
+    began = time.monotonic()
+    queue.stop(wait=0.2)
+    assert time.monotonic() - began < 1
+    assert lost == ["s1"]
+    assert store.claim_job("other")["scan_id"] == "s1"
@@ -0,0 +1,148 @@
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services.repo_cache import RepoCache
+
+if not shutil.which("git"):
+    pytest.skip("git is not installed", allow_module_level=True)
+
+
+def _git(*args: str) -> str:
+    return subprocess.run(["git", *args], check=True, capture_output=True, text=True).stdout.strip()
+
+
+class Origin:
+    """A bare repository served over file://, with a working clone to commit from."""
+
+    def __init__(self, root, name: str = "origin", branch: str = "main"):
+        self.bare = str(root / f"{name}.git")
+        self.work = str(root / f"{name}-work")
+        self.url = f"file://{self.bare}"
+        _git("init", "--quiet", "--bare", f"--initial-branch={branch}", self.bare)
+        _git("init", "--quiet", f"--initial-branch={branch}", self.work)
+        _git("-C", self.work, "remote", "add", "origin", self.bare)
+        self.branch = branch
+
+    def commit(self, files, message: str = "change") -> str:
+        for path, content in files.items():
+            full = os.path.join(self.work, path)
+            if content is None:
+                os.remove(full)
+                continue
+            os.makedirs(os.path.dirname(full), exist_ok=True)
+            with open(full, "w") as f:
+                f.write(content)
+        _git("-C", self.work, "add", "-A")
+        _git("-C", self.work, "commit", "--quiet", "-m", message)
+        _git("-C", self.work, "push", "--quiet", "origin", f"HEAD:refs/heads/{self.branch}")
+        return _git("-C", self.work, "rev-parse", "HEAD")
+
+
+@pytest.fixture(autouse=True)
+def git_identity(monkeypatch):
+    for var in ("GIT_AUTHOR_NAME", "GIT_COMMITTER_NAME"):
+        monkeypatch.setenv(var, "test")
+    for var in ("GIT_AUTHOR_EMAIL", "GIT_COMMITTER_EMAIL"):
+        monkeypatch.setenv(var, "test@example.com")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return RepoCache(str(tmp_path / "cache"), str(tmp_path / "worktrees"), fetch_ttl=0)
+
+
+def test_checkout_refetch_and_changed_paths(tmp_path, cache):
+    origin = Origin(tmp_path)
+    first = origin.commit({"server.py": "print(1)\n", "mcp.json": "{}\n", "docs/readme.md": "hi\n"})
+
+    checkout = cache.checkout(origin.url, "main", "scan-1")
+    assert checkout.commit == first
+    assert checkout.tree == _git("-C", origin.bare, "rev-parse", f"{first}^{{tree}}")
+    assert sorted(os.listdir(checkout.path)) == [".git", "docs", "mcp.json", "server.py"]
+    mirror = cache.mirror_path(origin.url)
+    assert os.path.isdir(mirror)
+
+    second = origin.commit({"server.py": "print(2)\n", "docs/readme.md": None, "new.json": "[]\n"})
+    again = cache.checkout(origin.url, "main", "scan-2")
+    assert again.commit == second
+    # Same mirror, only the new commit fetched
+    assert cache.mirror_path(origin.url) == mirror
+    assert len(os.listdir(cache.mirror_dir)) == 2  # the mirror and its lock file
+
+    assert cache.changed_paths(origin.url, first, second) == ["docs/readme.md", "new.json", "server.py"]
+    assert cache.changed_paths(origin.url, second, second) == []
+    assert cache.changed_paths(origin.url, "0" * 40, second) is None
+
+    cache.release("scan-1")
+    cache.release("scan-2")
+    assert not os.path.exists(checkout.path) and not os.path.exists(again.path)
+    assert _git("-C", mirror, "worktree", "list").count("\n") == 0
+
+
+def test_fetch_ttl_reuses_recent_fetch(tmp_path):
+    origin = Origin(tmp_path)
+    first = origin.commit({"a.py": "1\n"})
+    cache = RepoCache(str(tmp_path / "cache"), str(tmp_path / "worktrees"), fetch_ttl=3600)
+    assert cache.resolve(origin.url, "main")[1] == first
+    origin.commit({"a.py": "2\n"})
+    assert cache.resolve(origin.url, "main")[1] == first
+
+
+def test_concurrent_resolves_share_a_mirror(tmp_path, cache):
+    origin = Origin(tmp_path)
+    head = origin.commit({"a.py": "1\n"})
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda _: cache.resolve(origin.url, "main"), range(4)))
+    assert results == [(cache.mirror_path(origin.url), head)] * 4
+
+
+def test_main_falls_back_to_default_branch(tmp_path, cache):
+    origin = Origin(tmp_path, branch="trunk")
+    head = origin.commit({"a.py": "1\n"})
+    _git("-C", origin.bare, "symbolic-ref", "HEAD", "refs/heads/trunk")
+    assert cache.checkout(origin.url, "main", "scan-1").commit == head
+    with pytest.raises(subprocess.CalledProcessError):
+        cache.checkout(origin.url, "dev", "scan-2")
+
+
+def test_sparse_checkout(tmp_path, cache):
+    origin = Origin(tmp_path)
+    origin.commit({"server.py": "x\n", "mcp.json": "{}\n", "config/claude.json": "{}\n", "README.md": "r\n"})
+
+    sparse = cache.checkout(origin.url, "main", "sparse", patterns=["*.json"])
+    files = sorted(os.path.relpath(os.path.join(root, name), sparse.path)
+                   for root, dirs, names in os.walk(sparse.path) if ".git" not in root for name in names)
+    assert files == [".git", "config/claude.json", "mcp.json"]
+
+    # Sparse settings stay with their worktree
+    full = cache.checkout(origin.url, "main", "full")
+    assert os.path.exists(os.path.join(full.path, "server.py"))
+    assert full.tree == sparse.tree
+
+
+def test_evicts_least_recently_used(tmp_path, cache):
+    old, new = Origin(tmp_path, "old"), Origin(tmp_path, "new")
+    old.commit({"a.py": "1\n"})
+    new.commit({"a.py": "1\n"})
+    cache.resolve(old.url, "main")
+    cache.resolve(new.url, "main")
+    old_mirror, new_mirror = cache.mirror_path(old.url), cache.mirror_path(new.url)
+    os.utime(old_mirror, (1, 1))
+
+    cache.quota_bytes = cache._dir_size(new_mirror)
+    assert cache.evict() == 1
+    assert not os.path.exists(old_mirror) and os.path.exists(new_mirror)
+
+    # A mirror with a live worktree is kept over quota, and evicted once released
+    cache.checkout(new.url, "main", "scan-1")
+    cache.quota_bytes = 0
+    assert cache.evict() == 0
+    cache.release("scan-1")
+    assert not os.path.exists(new_mirror)
+
+    # An evicted mirror is rebuilt on the next scan
+    assert cache.checkout(old.url, "main", "scan-2").commit == _git("-C", old.bare, "rev-parse", "main")
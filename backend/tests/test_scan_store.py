@@ -0,0 +1,119 @@
+import pytest
+
+from conftest import add_scan
+from models.findings import Findings
+
+
+def _page_all(store, limit, **filters):
+    pages, cursor = [], None
+    while True:
+        scans, cursor = store.list_scans(limit=limit, cursor=cursor, **filters)
+        pages.append([s["id"] for s in scans])
+        if cursor is None:
+            return pages
+
+
+def test_list_scans_keyset_pages(store):
+    # Three scans share each timestamp, so page boundaries fall inside a tie
+    ids = []
+    for i in range(10):
+        scan_id = f"scan-{i:02d}"
+        add_scan(store, scan_id, timestamp=f"2026-09-{1 + i // 3:02d}T12:00:00",
+                 scan_type="dynamic" if i % 2 else "static")
+        ids.append(scan_id)
+    newest_first = sorted(ids, key=lambda s: (store.get_scan(s)["timestamp"], s), reverse=True)
+
+    pages = _page_all(store, limit=4)
+    assert [len(p) for p in pages] == [4, 4, 2]
+    assert [s for p in pages for s in p] == newest_first
+    # Offset paging (older clients) agrees on the first pages
+    assert [s["id"] for s in store.list_scans(limit=4, offset=4)[0]] == pages[1]
+
+    static = [s for p in _page_all(store, limit=2, scan_type="static") for s in p]
+    assert static == [s for s in newest_first if int(s[-2:]) % 2 == 0]
+
+    # A scan added while paging lands before the cursor and does not shift later pages
+    first, cursor = store.list_scans(limit=4)
+    add_scan(store, "scan-new", timestamp="2026-09-30T12:00:00")
+    second, _ = store.list_scans(limit=4, cursor=cursor)
+    assert [s["id"] for s in second] == pages[1]
+
+
+def test_list_scans_exact_page_has_no_cursor(store):
+    for i in range(4):
+        add_scan(store, f"scan-{i}", timestamp="2026-09-01T12:00:00")
+    scans, cursor = store.list_scans(limit=4)
+    assert len(scans) == 4 and cursor is None
+
+
+def test_list_scans_rejects_bad_cursor(store):
+    with pytest.raises(ValueError):
+        store.list_scans(cursor="not-a-cursor")
+
+
+def _counts_match(store):
+    for scan_type in (None, "static", "dynamic"):
+        for status in (None, "pending", "completed", "cancelled"):
+            expected = len(store.list_scans(limit=500, scan_type=scan_type, status=status)[0])
+            assert store.count_scans(scan_type=scan_type, status=status) == expected, (scan_type, status)
+
+
+def test_scan_counts_follow_inserts_updates_deletes(store):
+    for i in range(6):
+        add_scan(store, f"scan-{i}", scan_type="dynamic" if i % 3 == 0 else "static")
+    _counts_match(store)
+    assert store.count_scans() == 6
+    assert store.count_scans(scan_type="dynamic") == 2
+
+    store.update_scan("scan-1", status="completed")
+    store.update_scan("scan-2", status="completed")
+    store.request_cancel("scan-3")
+    _counts_match(store)
+    assert store.count_scans(status="completed") == 2
+
+    assert store.delete_scan("scan-1")
+    assert not store.delete_scan("scan-1")
+    store.delete_scan("scan-3")
+    _counts_match(store)
+    assert store.count_scans() == 4
+    assert store.count_scans(status="cancelled") == 0
+
+    # Filters the counters cannot answer fall back to the table
+    assert store.count_scans(target="https://github.com/o/r") == 4
+    assert store.count_scans(since="2027-01-01") == 0
+
+    store.delete_all()
+    assert store.count_scans() == 0
+    add_scan(store, "after")
+    _counts_match(store)
+
+
+def test_list_findings_pages(store):
+    add_scan(store, "s1", status="completed")
+    for scanner in ("semgrep", "mcp-scan"):
+        findings = Findings()
+        for line in range(1, 8):
+            severity = "HIGH" if line % 2 else "LOW"
+            findings.add(None, "mcp-eval-exec", "eval", severity, f"src/{scanner}/a.py", line, line, "", scanner)
+        store.save_scanner_result("s1", scanner, {"static": {"scanner_name": scanner, "vulnerabilities": findings}})
+
+    seen, cursor = [], None
+    while True:
+        page = store.list_findings("s1", limit=5, cursor=cursor)
+        assert page["total"] == 14
+        assert len(page["items"]) <= 5
+        seen.extend((f["scanner"], f["start_line"]) for f in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 14
+
+    high = store.list_findings("s1", severity="high", scanner="semgrep", limit=3)
+    assert high["total"] == 4
+    rest = store.list_findings("s1", severity="high", scanner="semgrep", limit=3, cursor=high["next_cursor"])
+    assert [f["start_line"] for f in high["items"] + rest["items"]] == [1, 3, 5, 7]
+    assert rest["next_cursor"] is None
+
+    assert store.list_findings("s1", path_prefix="src/mcp-scan/")["total"] == 7
+    with pytest.raises(ValueError):
+        store.list_findings("s1", cursor="x")
@@ -0,0 +1,65 @@
+import sys
+import json
+import asyncio
+
+from scanners.json_stream import JsonStreamParser
+from scanners.semgrep_scan import STREAMED_PATHS, SemgrepProfile, SemgrepScanner
+
+
+def _result(path: str, line: int, message: str = "m") -> dict:
+    return {"check_id": "rules.mcp-eval-exec", "path": path, "start": {"line": line}, "end": {"line": line},
+            "extra": {"message": message, "severity": "ERROR", "lines": "eval(x)"}}
+
+
+def _document(target: str) -> str:
+    # The last result is large enough that the parser holds it back until close()
+    return json.dumps({
+        "results": [_result(f"{target}/a.py", 1), _result(f"{target}/a.py", 7, "x" * 3000)],
+        "errors": [],
+        "time": {"rules": [{"id": "rules.mcp-eval-exec"}], "total_time": 0.5,
+                 "targets": [{"path": f"{target}/a.py", "num_bytes": 10, "match_times": [0.1],
+                              "parse_times": [0.01], "run_time": 0.2}]},
+    })
+
+
+def test_result_decoded_in_close(tmp_path):
+    doc = _document(str(tmp_path)).encode()
+    split = doc.index(b'"x') + 2000
+    parser = JsonStreamParser(STREAMED_PATHS)
+    scanner = SemgrepScanner()
+    vulns, profile = [], SemgrepProfile(str(tmp_path))
+    profile.start_run()
+
+    scanner._collect(parser.feed(doc[:split]), vulns, profile)
+    scanner._collect(parser.feed(doc[split:]), vulns, profile)
+    close_events = parser.close()
+    assert close_events[0][0] == ("results", None)
+    scanner._collect(close_events, vulns, profile)
+
+    assert [(v.start_line, len(v.message)) for v in vulns] == [(1, 1), (7, 3000)]
+    summary = profile.summary(1, 1, {})
+    assert len(summary["slowest_files"]) == 1
+
+
+def test_scan_keeps_result_from_close(tmp_path, monkeypatch):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "a.py").write_text("eval(x)\n")
+    doc = _document(str(repo))
+    split = doc.index('"x') + 2000
+    fake = tmp_path / "semgrep"
+    fake.write_text(
+        f"#!{sys.executable}\n"
+        "import sys, time\n"
+        f"doc = {doc!r}\n"
+        f"sys.stdout.write(doc[:{split}]); sys.stdout.flush(); time.sleep(0.3)\n"
+        f"sys.stdout.write(doc[{split}:])\n"
+    )
+    fake.chmod(0o755)
+    monkeypatch.setattr(SemgrepScanner, "executable", lambda self, name: str(fake))
+
+    output = asyncio.run(SemgrepScanner().scan_static_async(str(repo)))
+
+    assert output.error is None
+    assert [v.start_line for v in output.vulnerabilities] == [1, 7]
+    assert len(output.profile["slowest_files"]) == 1
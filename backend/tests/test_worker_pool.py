@@ -0,0 +1,129 @@
+import os
+import sys
+import asyncio
+
+import pytest
+
+from scanners.worker_pool import NdjsonWorkerPool, WorkerCrashed
+
+# Stands in for `node main.js serve`: answers each request line with its id and the process id
+ECHO_WORKER = """
+import os, sys, json, time
+for line in sys.stdin:
+    request = json.loads(line)
+    action = request.get("action")
+    if action == "crash" or (action == "crash-once" and not os.path.exists(request["marker"])):
+        if action == "crash-once":
+            open(request["marker"], "w").close()
+        sys.stderr.write("boom\\n")
+        sys.exit(3)
+    if action == "sleep":
+        time.sleep(request["seconds"])
+    print(json.dumps({"id": request["id"], "pid": os.getpid()}), flush=True)
+    if action == "exit-after":
+        sys.exit(0)
+"""
+
+
+@pytest.fixture
+def pool(tmp_path):
+    script = tmp_path / "echo_worker.py"
+    script.write_text(ECHO_WORKER)
+    return NdjsonWorkerPool("echo", [sys.executable, str(script)], size=2)
+
+
+def _run(pool, coro_fn):
+    async def main():
+        try:
+            return await coro_fn()
+        finally:
+            await pool.close()
+    return asyncio.run(main())
+
+
+def test_worker_is_reused(pool):
+    async def scenario():
+        first = await pool.request({}, timeout=5)
+        second = await pool.request({}, timeout=5)
+        return first, second
+
+    first, second = _run(pool, scenario)
+    assert first["pid"] == second["pid"]
+    assert second["id"] == first["id"] + 1
+    assert pool.started == 1
+
+
+def test_crashed_worker_is_replaced(pool):
+    async def scenario():
+        before = await pool.request({}, timeout=5)
+        with pytest.raises(WorkerCrashed):
+            await pool.request({"action": "crash"}, timeout=5)
+        after = await pool.request({}, timeout=5)
+        return before, after
+
+    before, after = _run(pool, scenario)
+    assert before["pid"] != after["pid"]
+    # The crashing request took the idle worker and one fresh one, then another started for the next request
+    assert pool.started == 3
+
+
+def test_crash_is_retried_on_a_new_worker(pool, tmp_path):
+    async def scenario():
+        before = await pool.request({}, timeout=5)
+        retried = await pool.request({"action": "crash-once", "marker": str(tmp_path / "crashed")}, timeout=5)
+        return before, retried
+
+    before, retried = _run(pool, scenario)
+    assert before["pid"] != retried["pid"]
+    assert pool.started == 2
+
+
+def test_timed_out_worker_is_replaced(pool):
+    async def scenario():
+        before = await pool.request({}, timeout=5)
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.request({"action": "sleep", "seconds": 30}, timeout=0.2)
+        # The slow worker's late answer must not reach this request
+        after = await pool.request({}, timeout=5)
+        return before, after
+
+    before, after = _run(pool, scenario)
+    assert before["pid"] != after["pid"]
+    assert pool.started == 2
+    with pytest.raises(ProcessLookupError):
+        os.kill(before["pid"], 0)
+
+
+def test_cancelled_request_replaces_worker(pool):
+    async def scenario():
+        task = asyncio.ensure_future(pool.request({"action": "sleep", "seconds": 30}, timeout=60))
+        await asyncio.sleep(0.5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return await pool.request({}, timeout=5)
+
+    _run(pool, scenario)
+    assert pool.started == 2
+
+
+def test_worker_exited_while_idle_is_replaced(pool):
+    async def scenario():
+        first = await pool.request({"action": "exit-after"}, timeout=5)
+        await asyncio.sleep(0.3)
+        second = await pool.request({}, timeout=5)
+        return first, second
+
+    first, second = _run(pool, scenario)
+    assert first["pid"] != second["pid"]
+    assert pool.started == 2
+
+
+def test_concurrency_is_bounded_by_size(pool):
+    async def scenario():
+        return await asyncio.gather(*(pool.request({"action": "sleep", "seconds": 0.2}, timeout=5) for _ in range(6)))
+
+    responses = _run(pool, scenario)
+    assert len({r["id"] for r in responses}) == 6
+    assert len({r["pid"] for r in responses}) == pool.started == 2
+
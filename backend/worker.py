@@ -0,0 +1,62 @@
+"""
+Standalone benchmark worker.
+
+Runs scans from the shared job queue outside the API process, so scanning
+scales across processes (and nodes sharing the database) independently of
+the web server:
+
+    SCAN_STORE_DB=/data/scan_store.db WORKER_CONCURRENCY=4 python -m worker
+
+WORKER_SCAN_TYPES=static limits a worker to static scans; it then never
+imports the dynamic-only scanners. Set BENCHMARK_WORKERS=0 on the API server to leave all scans to workers.
+"""
+import os
+import signal
+import threading
+
+from services.github_service import GitHubService
+from services.scan_store import ScanStore
+from services.job_queue import JobQueue, scan_type_limits_from_env, scan_types_from_env
+from services.benchmark import BenchmarkRunner
+from scanners.registry import ScannerRegistry
+
+
+def main():
+    store = ScanStore(os.getenv("SCAN_STORE_DB", "scan_store.db"))
+    scan_types = scan_types_from_env()
+    # Load the scanners this worker will run and resolve their toolchains once, up front
+    for scan_type in scan_types or ["static", "dynamic"]:
+        ScannerRegistry.get_scanners(scan_type)
+    runner = BenchmarkRunner(store, GitHubService())
+    job_queue = JobQueue(
+        store,
+        runner.run,
+        workers=int(os.getenv("WORKER_CONCURRENCY", "2")),
+        type_limits=scan_type_limits_from_env(),
+        lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", "60")),
+        on_cancel=runner.cancel,
+        scan_types=scan_types,
+        on_lease_lost=runner.abandon,
+    )
+
+    stopping = threading.Event()
+
+    def handle_signal(signum, _frame):
+        print(f"Received signal {signum}, finishing running scans...", flush=True)
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    job_queue.start()
+    stopping.wait()
+
+    # Anything still running after the grace period is handed back to the queue
+    job_queue.stop(wait=float(os.getenv("WORKER_SHUTDOWN_GRACE", "30")))
+    runner.close()
+    store.close()
+    print(f"Worker {job_queue.worker_id} stopped", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -276,7 +276,8 @@ export default function Home() {
                             <h3 className="font-black text-slate-800 text-lg">{scan.target.split('/').slice(-2).join('/')}</h3>
                             <span className={`px-2.5 py-0.5 rounded-full text-[10px] uppercase tracking-wider font-black ${scan.status === 'completed' ? 'bg-green-100 text-green-700' :
                               scan.status === 'error' ? 'bg-red-100 text-red-700' :
-                                'bg-yellow-100 text-yellow-700'
+                                scan.status === 'cancelled' ? 'bg-slate-100 text-slate-600' :
+                                  'bg-yellow-100 text-yellow-700'
                               }`}>
                               {scan.status}
                             </span>
@@ -1,7 +1,7 @@
 "use client";
 import { Suspense, useEffect, useState } from 'react';
 import { useSearchParams } from 'next/navigation';
-import { getScan, ScanResult, ScannerOutput, Vulnerability, CategoryEvaluation } from '@/lib/api';
+import { getScan, cancelScan, getRawOutputUrl, ScanResult, ScannerOutput, Vulnerability, CategoryEvaluation } from '@/lib/api';
 import { Card, CardHeader, CardTitle, CardDescription, CardContent } from "@/components/ui/card";
 import { CheckCircle2, AlertOctagon, Trophy, Code, Activity, ServerCrash, Loader2, Search } from "lucide-react";
 import { Button } from '@/components/ui/button';
@@ -23,8 +23,8 @@ function ScanPageContent() {
                 const data = await getScan(id as string);
                 setScan(data);
 
-                // If completed or error, stop polling
-                if (data.status === 'completed' || data.status === 'error') {
+                // If finished, stop polling
+                if (data.status === 'completed' || data.status === 'error' || data.status === 'cancelled') {
                     if (intervalId) clearInterval(intervalId);
                 }
             } catch (error) {
@@ -39,7 +39,7 @@ function ScanPageContent() {
 
         // Poll every 3 seconds if status is pending
         intervalId = setInterval(() => {
-            if (scan && (scan.status === 'completed' || scan.status === 'error')) {
+            if (scan && (scan.status === 'completed' || scan.status === 'error' || scan.status === 'cancelled')) {
                 clearInterval(intervalId);
                 return;
             }
@@ -124,10 +124,16 @@ function ScanPageContent() {
                         </h1>
                         <span className={`px-3 py-1 rounded-full text-sm font-medium ${scan.status === 'completed' ? 'bg-green-100 text-green-700' :
                             scan.status === 'error' ? 'bg-red-100 text-red-700' :
-                                'bg-yellow-100 text-yellow-700'
+                                scan.status === 'cancelled' ? 'bg-slate-100 text-slate-600' :
+                                    'bg-yellow-100 text-yellow-700'
                             }`}>
                             {scan.status.toUpperCase()}
                         </span>
+                        {(scan.status === 'pending' || scan.status === 'running') && (
+                            <Button variant="outline" size="sm" onClick={() => cancelScan(scan.id).catch(console.error)}>
+                                Cancel
+                            </Button>
+                        )}
                     </div>
                     <p className="text-slate-500 font-mono text-sm mt-1">
                         {scan.target} @ {scan.branch}
@@ -196,6 +202,7 @@ function ScanPageContent() {
                     <ScannerDetailResult
                         result={scan.scanner_results[selectedScanner][reportType]}
                         scannerName={selectedScanner}
+                        rawOutputUrl={getRawOutputUrl(scan.id, selectedScanner, reportType)}
                         repoUrl={scan.target}
                         branch={scan.branch}
                     />
@@ -206,6 +213,7 @@ function ScanPageContent() {
                             <ScannerDetailResult
                                 result={scan.scanner_results[firstScanner][reportType]}
                                 scannerName={firstScanner}
+                                rawOutputUrl={getRawOutputUrl(scan.id, firstScanner, reportType)}
                                 repoUrl={scan.target}
                                 branch={scan.branch}
                             />
@@ -336,7 +344,7 @@ function EvaluationSection({ result }: { result: CategoryEvaluation }) {
     );
 }
 
-function ScannerDetailResult({ result, scannerName, repoUrl, branch }: { result: ScannerOutput | undefined, scannerName: string, repoUrl: string, branch: string }) {
+function ScannerDetailResult({ result, scannerName, rawOutputUrl, repoUrl, branch }: { result: ScannerOutput | undefined, scannerName: string, rawOutputUrl: string, repoUrl: string, branch: string }) {
     if (!result) return <div>No data for {scannerName}</div>;
 
     if (result.error) {
@@ -397,6 +405,11 @@ function ScannerDetailResult({ result, scannerName, repoUrl, branch }: { result:
                                 </pre>
                             </details>
                         )}
+                        {!result.raw_output && result.raw_output_ref && (
+                            <a href={rawOutputUrl} target="_blank" rel="noreferrer" className="mt-4 inline-block text-xs text-indigo-600">
+                                View Raw Output
+                            </a>
+                        )}
                     </div>
                 ) : (
                     <div className="space-y-4 text-left">
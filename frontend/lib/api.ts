@@ -16,7 +16,15 @@ export interface ScannerOutput {
     scanner_name: string;
     vulnerabilities: Vulnerability[];
     raw_output?: string;
+    raw_output_ref?: string;
+    raw_output_size?: number;
     error?: string;
+    duration?: number;
+    kill_reason?: 'timeout' | 'scan_timeout' | 'cancelled';
+    cache_hit?: boolean;
+    base_scan_id?: string;
+    tool_version?: string;
+    profile?: Record<string, any>;
 }
 
 export interface Ranking {
@@ -49,12 +57,55 @@ export interface ScanSummary {
     branch: string;
     scan_type: 'static' | 'dynamic';
     evaluation?: EvaluationResult;
-    status: 'pending' | 'running' | 'completed' | 'error';
+    status: 'pending' | 'running' | 'completed' | 'error' | 'cancelled';
     error?: string;
 }
 
+export interface ConsensusCluster {
+    fingerprint: string;
+    file_path: string;
+    start_line: number;
+    end_line: number;
+    category: string;
+    severity: string;
+    scanners: string[];
+    missed_by: string[];
+    finding_ids: Record<string, string[]>;
+}
+
+export interface ScannerAgreement {
+    findings: number;
+    clusters: number;
+    agreed: number;
+    unique: number;
+    missed: number;
+}
+
+export interface Consensus {
+    line_window: number;
+    scanners: string[];
+    skipped: string[];
+    summary: {
+        findings: number;
+        clusters: number;
+        agreed: number;
+        by_scanner: Record<string, ScannerAgreement>;
+    };
+    clusters: ConsensusCluster[];
+}
+
 export interface ScanResult extends ScanSummary {
+    commit_sha?: string;
+    repo_index?: {
+        files: number;
+        build_seconds: number;
+        pruned_dirs: number;
+        json_files: number;
+        mcp_configs: number | null;
+        mcp_config_skipped: Record<string, number> | null;
+    };
     scanner_results: Record<string, { static?: ScannerOutput, dynamic?: ScannerOutput }>;
+    consensus?: Consensus;
 }
 
 export async function getScans(limit: number = 20, offset: number = 0, scanType?: string): Promise<ScanSummary[]> {
@@ -73,6 +124,43 @@ export async function getScan(id: string): Promise<ScanResult> {
     return res.json();
 }
 
+export interface Finding extends Vulnerability {
+    scanner: string;
+    mode: 'static' | 'dynamic';
+    category: string;
+}
+
+export interface FindingsPage {
+    items: Finding[];
+    total: number;
+    next_cursor?: string;
+}
+
+export interface FindingsFilter {
+    scanner?: string;
+    mode?: 'static' | 'dynamic';
+    severity?: string;
+    rule_id?: string;
+    category?: string;
+    path_prefix?: string;
+    limit?: number;
+    cursor?: string;
+}
+
+export async function getFindings(id: string, filter: FindingsFilter = {}): Promise<FindingsPage> {
+    const params = new URLSearchParams();
+    Object.entries(filter).forEach(([key, value]) => {
+        if (value !== undefined && value !== '') params.set(key, String(value));
+    });
+    const res = await fetch(`${API_URL}/scans/${id}/findings?${params.toString()}`);
+    if (!res.ok) throw new Error('Failed to fetch findings');
+    return res.json();
+}
+
+export function getRawOutputUrl(id: string, scanner: string, mode: 'static' | 'dynamic'): string {
+    return `${API_URL}/scans/${id}/raw/${encodeURIComponent(scanner)}?mode=${mode}`;
+}
+
 export async function triggerScan(repo_url: string, branch: string, scan_type: 'static' | 'dynamic' = 'static'): Promise<ScanResult> {
     const res = await fetch(`${API_URL}/scan`, {
         method: 'POST',
@@ -94,6 +182,12 @@ export async function deleteScan(id: string): Promise<void> {
     if (!res.ok) throw new Error('Failed to delete scan');
 }
 
+export async function cancelScan(id: string): Promise<{ status: 'cancelled' | 'cancelling', id: string }> {
+    const res = await fetch(`${API_URL}/scans/${id}/cancel`, { method: 'POST' });
+    if (!res.ok) throw new Error('Failed to cancel scan');
+    return res.json();
+}
+
 export async function deleteAllScans(): Promise<void> {
     const res = await fetch(`${API_URL}/scans`, { method: 'DELETE' });
     if (!res.ok) throw new Error('Failed to delete all scans');